@@ -0,0 +1,64 @@
+# Gunicorn server hooks for OpenSentry (read automatically from the working directory).
+#
+# With OPENSENTRY_FRAME_BUS set, the master process also runs the capture
+# daemon (`python server.py --capture-daemon`) and, if OPENSENTRY_STREAM_PORT
+# is set, the asyncio stream server (`python server.py --stream-server`),
+# restarting either if it dies. The daemon owns the cameras, so any number
+# of workers can stream from the shared-memory frame bus.
+import os
+import subprocess
+import sys
+import threading
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_procs: dict[str, subprocess.Popen] = {}
+_stopping = False
+
+
+def _helpers() -> list[str]:
+    """Flags of the helper processes this configuration needs."""
+    if not os.environ.get('OPENSENTRY_FRAME_BUS', '').strip():
+        return []
+    flags = ['--capture-daemon']
+    if int(os.environ.get('OPENSENTRY_STREAM_PORT', '0') or 0):
+        flags.append('--stream-server')
+    return flags
+
+
+def _start(server, flag):
+    proc = subprocess.Popen([sys.executable, os.path.join(_HERE, 'server.py'), flag], cwd=_HERE)
+    _procs[flag] = proc
+    server.log.info('Started %s (pid %s)', flag.lstrip('-'), proc.pid)
+
+
+def _supervise(server):
+    while not _stopping:
+        time.sleep(2.0)
+        for flag, proc in list(_procs.items()):
+            if not _stopping and proc.poll() is not None:
+                server.log.warning('%s exited with %s; restarting', flag.lstrip('-'), proc.returncode)
+                _start(server, flag)
+
+
+def on_starting(server):
+    for flag in _helpers():
+        _start(server, flag)
+
+
+def when_ready(server):
+    if _procs:
+        threading.Thread(target=_supervise, args=(server,), name='HelperSupervisor', daemon=True).start()
+
+
+def on_exit(server):
+    global _stopping
+    _stopping = True
+    for proc in _procs.values():
+        if proc.poll() is None:
+            proc.terminate()
+    for proc in _procs.values():
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
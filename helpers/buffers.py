@@ -0,0 +1,43 @@
+import numpy as np
+
+
+class ScratchBuffers:
+    """Named scratch arrays reused across iterations of one processing loop.
+
+    get() hands back the same array for a name as long as shape and dtype are
+    unchanged, so OpenCV calls can write through `dst=` without allocating
+    per frame; a resolution change reallocates once. Not thread-safe: each
+    loop (worker thread) owns its own instance, and any array it returns is
+    overwritten on the next iteration.
+    """
+
+    def __init__(self):
+        self._bufs: dict[str, np.ndarray] = {}
+
+    def get(self, name: str, shape: tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        buf = self._bufs.get(name)
+        if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._bufs[name] = buf
+        return buf
+
+    def like(self, name: str, arr: np.ndarray) -> np.ndarray:
+        return self.get(name, arr.shape, arr.dtype)
+
+
+class ScratchRing:
+    """A fixed number of ScratchBuffers handed out round-robin.
+
+    For a loop that keeps up to `count` jobs in flight (see EncoderPool):
+    each job gets its own set, which is not handed out again until `count`
+    more jobs have been started.
+    """
+
+    def __init__(self, count: int):
+        self._sets = [ScratchBuffers() for _ in range(max(1, int(count)))]
+        self._n = 0
+
+    def next(self) -> ScratchBuffers:
+        bufs = self._sets[self._n % len(self._sets)]
+        self._n += 1
+        return bufs
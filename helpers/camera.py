@@ -5,18 +5,134 @@ import logging
 import glob
 import cv2
 
+from helpers.buffers import ScratchBuffers
+from helpers.frame_hub import pin_current_thread
+from helpers.encoders import jpeg_dimensions
+from helpers.hotplug import get_device_watcher
+from helpers.sources import is_source_uri, open_source
+from helpers.yuv import is_yuyv
+
 logger = logging.getLogger('opensentry.camera')
 
+# Marks a probe that has not finished yet
+_PENDING = object()
+# Seconds higher-priority probes may still take once some candidate works
+_PROBE_GRACE = 0.3
+# Safety-net rescan while waiting for a device, in case a hotplug event is missed
+_RESCAN_INTERVAL = 30.0
+
+
+class _FrameSlot:
+    """One entry of the capture ring: a reusable buffer plus its sequence number.
+
+    buf holds BGR pixels, the compressed JPEG bytes (1xN uint8) in MJPEG
+    passthrough mode, or packed YUYV (HxWx2) in YUV mode; for the latter two
+    `decoded` caches the BGR image for `seq`. `derived` caches the products
+    of CameraStream.derive() for `derived_seq`, built in per-product
+    `scratch` buffers that are reused by the next capture in this slot.
+    """
+    __slots__ = ('seq', 'buf', 'ts', 'jpeg', 'yuyv', 'decoded', 'decoded_seq', 'decode_lock',
+                 'derived', 'derived_seq', 'derive_lock', 'scratch')
+
+    def __init__(self):
+        self.seq = 0
+        self.buf = None
+        self.ts = 0.0
+        self.jpeg = False
+        self.yuyv = False
+        self.decoded = None
+        self.decoded_seq = 0
+        self.decode_lock = threading.Lock()
+        self.derived = {}
+        self.derived_seq = 0
+        # Reentrant: a product may be built from another product of the frame
+        self.derive_lock = threading.RLock()
+        self.scratch: dict = {}
+
 
 class CameraStream:
-    """Threaded camera capture with a simple frame buffer.
+    """Threaded camera capture into a sequenced ring of frame slots.
 
     Respects OPENSENTRY_CAMERA_INDEX if set, otherwise uses device_index.
-    Auto-probes indices 0..5 if initial open fails.
+    Auto-probes /dev/video* and indices 0..5 if initial open fails.
+
+    Frames are read straight into preallocated ring slots and published with a
+    monotonically increasing sequence number. Consumers receive read-only views
+    (never copies) and must not hold a frame for longer than roughly
+    ``ring_size - 1`` capture periods; copy it if it has to live longer.
+    Ring size is tunable via OPENSENTRY_FRAME_RING (default 4, minimum 2).
+
+    Consumers block on wait_frame()/wait_seq() for the next capture
+    instead of polling, so every downstream stage runs in phase with the camera.
+
+    With OPENSENTRY_CAMERA_MJPEG=1 and OPENSENTRY_CAMERA_PASSTHROUGH=1 the
+    device's JPEG buffers are kept as-is (CAP_PROP_CONVERT_RGB=0). get_jpeg()
+    then serves them without any decode, and BGR pixels are decoded lazily,
+    at most once per frame, only when a consumer asks for them.
+
+    With OPENSENTRY_CAMERA_YUV=1 (and MJPEG off) raw YUYV buffers are kept
+    instead of converted to BGR: motion analysis reads the Y plane and the
+    encoders take I420 straight from it (see helpers/yuv.py). yuyv_at()
+    exposes the packed frame; BGR is again produced lazily on demand.
+
+    Multi-camera setups pass explicit settings instead of relying on env:
+    - device: '/dev/videoN' path or index; only that device is opened
+    - video: dict with width/height/fps/mjpeg/passthrough/yuv, read on every open
+    - exclude: device paths never probed (claimed by other cameras)
+    - cpus: optional CPU set the capture thread is pinned to
+
+    A watchdog replaces fixed read-failure counting: the open device is
+    dropped as soon as its /dev node disappears, or when no frame arrived for
+    OPENSENTRY_CAMERA_STALL_TIMEOUT seconds (default 2). With no device open
+    the capture thread sleeps until the DeviceWatcher reports a /dev change.
+    health() reports frame age and reconnect counts.
+
+    Instead of a device, `source` (or OPENSENTRY_CAMERA_SOURCE) may name a
+    file:, images: or synthetic: URI (see helpers/sources.py) for
+    reproducible load without a physical camera.
+
+    Opening tries the last-good device (`hint`: kind/target/api/format) first,
+    then probes every remaining candidate concurrently. Whenever a different
+    device ends up open, `on_open(hint)` is called so the caller can persist it.
+
+    derive() caches products of a frame (downscaled copies, gray analysis
+    input, encoded JPEGs) in its ring slot, so consumers asking for the
+    same product of the same capture share one computation.
     """
-    def __init__(self, device_index: int = 0, fps: int = 30):
-        self.frame = None
+    def __init__(
+        self,
+        device_index: int = 0,
+        fps: int = 30,
+        ring_size: int = 4,
+        *,
+        device: str | int | None = None,
+        video: dict | None = None,
+        exclude: tuple[str, ...] = (),
+        name: str = '',
+        cpus: set[int] | None = None,
+        hint: dict | None = None,
+        on_open=None,
+        source: str | None = None,
+    ):
+        self.name = name
+        self.source = source
+        self.hint = dict(hint) if isinstance(hint, dict) else None
+        self.on_open = on_open
+        self.device = device
+        self.video = video
+        self.exclude = tuple(exclude)
+        self.cpus = cpus
         self.lock = threading.Lock()
+        self._start_lock = threading.Lock()  # concurrent first requests may all call start()
+        self._cv = threading.Condition(self.lock)
+        try:
+            env_ring = int(os.environ.get('OPENSENTRY_FRAME_RING', '').strip() or '0')
+            if env_ring > 0:
+                ring_size = env_ring
+        except Exception:
+            pass
+        self._ring = [_FrameSlot() for _ in range(max(2, int(ring_size)))]
+        self._seq = 0
         self.camera = None  # defer open until start()
         self.running = False
         # Allow env override for capture FPS
@@ -28,10 +144,34 @@ class CameraStream:
             pass
         self._sleep = 1.0 / max(1, fps)
         self._requested_index = device_index
+        self.passthrough = False  # True while the open device yields JPEG buffers
+        self.yuyv = False  # True while the open device yields packed YUYV
+        self.frame_size: tuple[int, int] | None = None  # (width, height) of the latest frame
+        try:
+            self._stall_timeout = float(os.environ.get('OPENSENTRY_CAMERA_STALL_TIMEOUT', '2') or '2')
+        except Exception:
+            self._stall_timeout = 2.0
+        self._watcher = None
+        self._watch_gen = 0
+        self._reopen = False
+        self._opened_at = 0.0
+        self._last_frame_ts = 0.0
+        self.reconnects = 0  # successful reopens after a disconnect or stall
+        self.disconnects = 0  # devices dropped because they vanished or stalled
+        self.derive_computed = 0  # derive() products built
+        self.derive_shared = 0  # derive() calls answered from the cache
 
     def start(self) -> None:
+        with self._start_lock:
+            self._start()
+
+    def _start(self) -> None:
         if self.running:
             return
+        # Subscribe before the first probe so no hotplug event is missed
+        self._watcher = get_device_watcher()
+        self._watch_gen = self._watcher.generation
+        self._reopen = False  # the open below already applies current settings
         # Ensure camera is opened before starting the capture thread
         self._open_camera()
         if self.camera is None:
@@ -40,7 +180,13 @@ class CameraStream:
             except Exception:
                 pass
         self.running = True
-        threading.Thread(target=self._capture_frames, daemon=True).start()
+        thread_name = f'CameraStream-{self.name}' if self.name else 'CameraStream'
+        threading.Thread(target=self._capture_frames, name=thread_name, daemon=True).start()
+
+    def _video_setting(self, key: str, env: str, default):
+        if self.video is not None:
+            return self.video.get(key, default)
+        return os.environ.get(env, default)
 
     def _open_camera(self) -> None:
         # Decide initial index
@@ -52,141 +198,570 @@ class CameraStream:
             except Exception:
                 pass
 
-        # Optional tuning via env
-        mjpeg = (os.environ.get('OPENSENTRY_CAMERA_MJPEG', '0') in ('1', 'true', 'TRUE'))
+        # Optional tuning via explicit video settings or env
+        mjpeg = str(self._video_setting('mjpeg', 'OPENSENTRY_CAMERA_MJPEG', '0')) in ('1', 'true', 'TRUE', 'True')
+        passthrough = mjpeg and str(self._video_setting('passthrough', 'OPENSENTRY_CAMERA_PASSTHROUGH', '0')) in ('1', 'true', 'TRUE', 'True')
+        yuv = not mjpeg and str(self._video_setting('yuv', 'OPENSENTRY_CAMERA_YUV', '0')) in ('1', 'true', 'TRUE', 'True')
         try:
-            req_w = int(os.environ.get('OPENSENTRY_CAMERA_WIDTH', '0') or '0')
-            req_h = int(os.environ.get('OPENSENTRY_CAMERA_HEIGHT', '0') or '0')
-            req_fps = int(os.environ.get('OPENSENTRY_CAMERA_FPS', '0') or '0')
+            req_w = int(self._video_setting('width', 'OPENSENTRY_CAMERA_WIDTH', '0') or '0')
+            req_h = int(self._video_setting('height', 'OPENSENTRY_CAMERA_HEIGHT', '0') or '0')
+            req_fps = int(self._video_setting('fps', 'OPENSENTRY_CAMERA_FPS', '0') or '0')
         except Exception:
             req_w = 0
             req_h = 0
             req_fps = 0
+        settings = (mjpeg, passthrough, yuv, req_w, req_h, req_fps)
 
-        # Build candidate list: specific device path -> indexed path -> all paths -> indices
         candidates: list[tuple[str, str | int]] = []
-        env_dev = os.environ.get('OPENSENTRY_CAMERA_DEVICE')
-        if env_dev and os.path.exists(env_dev):
-            candidates.append(('path', env_dev))
-        # Index-specific path
-        dev_path = f"/dev/video{idx}"
-        if os.path.exists(dev_path):
-            candidates.append(('path', dev_path))
-        # All /dev/video* paths
-        for p in sorted(glob.glob('/dev/video*')):
-            if ('path', p) not in candidates:
-                candidates.append(('path', p))
-        # Index probing 0..5
-        idx_candidates = [idx] + [i for i in range(0, 6) if i != idx]
-        for i in idx_candidates:
-            candidates.append(('index', i))
-
-        # Try to open each candidate
-        for kind, target in candidates:
-            # Prefer V4L2 backend, then fallback
-            apis = [getattr(cv2, 'CAP_V4L2', 200), None]
-            for api in apis:
-                try:
-                    if kind == 'path':
-                        cap = cv2.VideoCapture(str(target), api) if api is not None else cv2.VideoCapture(str(target))
-                    else:
-                        cap = cv2.VideoCapture(int(target), api) if api is not None else cv2.VideoCapture(int(target))
-                except Exception:
+        source = self._source_uri()
+        if source is not None:
+            opened = self._probe_candidate('source', source, [None], settings, warmup=1)
+            if opened is not None:
+                self._adopt('source', source, *opened, passthrough, yuv)
+            return
+        if self.device is not None:
+            # Dedicated device: never wander onto another camera's node
+            dev = str(self.device)
+            if dev.isdigit():
+                candidates.append(('index', int(dev)))
+            else:
+                candidates.append(('path', dev))
+        else:
+            # Build candidate list: specific device path -> indexed path -> all paths -> indices
+            env_dev = os.environ.get('OPENSENTRY_CAMERA_DEVICE')
+            if env_dev and os.path.exists(env_dev):
+                candidates.append(('path', env_dev))
+            # Index-specific path
+            dev_path = f"/dev/video{idx}"
+            if os.path.exists(dev_path) and dev_path not in self.exclude:
+                candidates.append(('path', dev_path))
+            # All /dev/video* paths
+            for p in sorted(glob.glob('/dev/video*')):
+                if ('path', p) not in candidates and p not in self.exclude:
+                    candidates.append(('path', p))
+            # Index probing 0..5 (skipped when other cameras claim devices).
+            # Index N is /dev/videoN on V4L2, so only probe indices whose node
+            # is not already a candidate; opening one device twice at once fails.
+            if not self.exclude:
+                idx_candidates = [idx] + [i for i in range(0, 6) if i != idx]
+                for i in idx_candidates:
+                    if ('path', f'/dev/video{i}') not in candidates:
+                        candidates.append(('index', i))
+
+        # Last-good device first, on its own: a reopen usually needs nothing else
+        tried = list(candidates)
+        hint = self._hint_candidate(candidates)
+        if hint is not None:
+            opened = self._probe_candidate(hint[0], hint[1], [hint[2]], settings, warmup=3)
+            if opened is not None:
+                self._adopt(hint[0], hint[1], *opened, passthrough, yuv)
+                return
+            candidates = [c for c in candidates if c != (hint[0], hint[1])]
+
+        opened_any = self._probe_parallel(candidates, settings)
+        if opened_any is not None:
+            kind, target, cap, api, frame = opened_any
+            self._adopt(kind, target, cap, api, frame, passthrough, yuv)
+            return
+        try:
+            logger.error('Failed to open any camera (idx requested=%s). Paths tried: %s', idx, ','.join([str(t) for k,t in tried if k=='path']))
+        except Exception:
+            pass
+
+    def _hint_candidate(self, candidates: list[tuple[str, str | int]]):
+        """Return (kind, target, api) for the persisted hint if it is still a candidate."""
+        hint = self.hint if isinstance(self.hint, dict) else None
+        if not hint:
+            return None
+        kind = hint.get('kind')
+        target = hint.get('target')
+        if kind == 'index':
+            try:
+                target = int(target)
+            except Exception:
+                return None
+        if (kind, target) not in candidates:
+            return None
+        api = hint.get('api')
+        return kind, target, (int(api) if api is not None else None)
+
+    @staticmethod
+    def _probe_candidate(kind: str, target, apis: list, settings: tuple, warmup: int = 6, cancelled=None):
+        """Open one device with each backend in turn; return (cap, api, frame) or None."""
+        mjpeg, passthrough, yuv, req_w, req_h, req_fps = settings
+        for api in apis:
+            if cancelled is not None and cancelled.is_set():
+                return None
+            try:
+                if kind == 'source':
+                    cap = open_source(str(target))
+                elif kind == 'path':
+                    cap = cv2.VideoCapture(str(target), api) if api is not None else cv2.VideoCapture(str(target))
+                else:
+                    cap = cv2.VideoCapture(int(target), api) if api is not None else cv2.VideoCapture(int(target))
+            except ValueError as e:
+                logger.error('Cannot open source: %s', e)
+                continue
+            except Exception:
+                continue
+            try:
+                if not cap.isOpened():
+                    cap.release()
                     continue
+            except Exception:
+                pass
 
-                # Optional format/size and latency reduction
-                try:
-                    if mjpeg:
-                        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
-                    if req_w > 0:
-                        cap.set(cv2.CAP_PROP_FRAME_WIDTH, float(req_w))
-                    if req_h > 0:
-                        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, float(req_h))
-                    if req_fps > 0:
-                        cap.set(cv2.CAP_PROP_FPS, float(req_fps))
-                    # Reduce internal buffering to minimize latency (best-effort)
-                    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                except Exception:
-                    pass
-
-                # Warm-up a few frames
-                ok = False
-                frame = None
-                for _ in range(6):
-                    ok, frame = cap.read()
-                    if ok and frame is not None:
-                        break
-                    time.sleep(0.06)
+            # Optional format/size and latency reduction
+            try:
+                if mjpeg:
+                    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+                if yuv:
+                    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'YUYV'))
+                if passthrough or yuv:
+                    # Keep the device buffer instead of converting to BGR
+                    cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+                if req_w > 0:
+                    cap.set(cv2.CAP_PROP_FRAME_WIDTH, float(req_w))
+                if req_h > 0:
+                    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, float(req_h))
+                if req_fps > 0:
+                    cap.set(cv2.CAP_PROP_FPS, float(req_fps))
+                # Reduce internal buffering to minimize latency (best-effort)
+                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            except Exception:
+                pass
+
+            # Warm-up a few frames
+            ok = False
+            frame = None
+            for _ in range(warmup):
+                ok, frame = cap.read()
                 if ok and frame is not None:
-                    # Found working camera
+                    break
+                if cancelled is not None and cancelled.is_set():
+                    break
+                time.sleep(0.06)
+            if ok and frame is not None:
+                return cap, api, frame
+            try:
+                cap.release()
+            except Exception:
+                pass
+        return None
+
+    def _probe_parallel(self, candidates: list[tuple[str, str | int]], settings: tuple):
+        """Probe all candidates concurrently and return the best one that opened.
+
+        Candidates keep their priority: a success is only taken once every
+        higher-priority candidate has failed or a short grace period has
+        passed; nothing is waited for beyond the probe deadline
+        (OPENSENTRY_CAMERA_PROBE_TIMEOUT seconds, default 3).
+        Returns (kind, target, cap, api, frame) or None.
+        """
+        if not candidates:
+            return None
+        try:
+            deadline = float(os.environ.get('OPENSENTRY_CAMERA_PROBE_TIMEOUT', '3') or '3')
+        except Exception:
+            deadline = 3.0
+        # Prefer V4L2 backend, then fallback
+        apis = [getattr(cv2, 'CAP_V4L2', 200), None]
+        cancelled = threading.Event()
+        done = threading.Condition()
+        results: list = [_PENDING] * len(candidates)
+
+        def probe(i: int, kind: str, target) -> None:
+            try:
+                res = self._probe_candidate(kind, target, apis, settings, cancelled=cancelled)
+            except Exception:
+                res = None
+            with done:
+                if cancelled.is_set() and res is not None:
+                    # Nobody is waiting for this one any more
                     try:
-                        if self.camera is not None:
-                            self.camera.release()
+                        res[0].release()
                     except Exception:
                         pass
-                    self.camera = cap
+                    res = None
+                results[i] = res
+                done.notify_all()
+
+        for i, (kind, target) in enumerate(candidates):
+            threading.Thread(target=probe, args=(i, kind, target), name=f'CameraProbe-{target}', daemon=True).start()
+
+        end = time.time() + max(0.1, deadline)
+        winner = None
+        with done:
+            while True:
+                for i, res in enumerate(results):
+                    if res is _PENDING:
+                        break
+                    if res is not None:
+                        winner = i
+                        break
+                if winner is not None:
+                    break
+                best = next((i for i, r in enumerate(results) if r not in (None, _PENDING)), None)
+                if best is not None:
+                    # Something works; give better candidates only a short grace
+                    end = min(end, time.time() + _PROBE_GRACE)
+                timeout = end - time.time()
+                if timeout <= 0 or all(r is not _PENDING for r in results):
+                    winner = best
+                    break
+                done.wait(timeout)
+            cancelled.set()
+            for i, res in enumerate(results):
+                if i != winner and res not in (None, _PENDING):
                     try:
-                        if kind == 'path':
-                            logger.info('Opened camera device=%s using api=%s', str(target), str(api))
-                        else:
-                            logger.info('Opened camera index=%s using api=%s', str(target), str(api))
+                        res[0].release()
                     except Exception:
                         pass
-                    return
+        if winner is None:
+            return None
+        kind, target = candidates[winner]
+        cap, api, frame = results[winner]
+        return kind, target, cap, api, frame
+
+    def _adopt(self, kind: str, target, cap, api, frame, passthrough: bool, yuv: bool = False) -> None:
+        """Install a freshly opened capture and remember it for the next open."""
+        try:
+            if self.camera is not None:
+                self.camera.release()
+        except Exception:
+            pass
+        self.camera = cap
+        self._opened_at = time.time()
+        # Backends that ignore CONVERT_RGB=0 still hand back BGR
+        self.passthrough = bool(passthrough and frame.ndim == 2 and frame.shape[0] == 1)
+        if passthrough and not self.passthrough:
+            logger.info('MJPEG passthrough unavailable on this backend; decoding to BGR')
+        self.yuyv = bool(yuv and is_yuyv(frame))
+        if yuv and not self.yuyv:
+            logger.info('Raw YUYV capture unavailable on this device; using BGR')
+        fourcc = ''
+        try:
+            code = int(cap.get(cv2.CAP_PROP_FOURCC))
+            fourcc = ''.join(chr((code >> (8 * k)) & 0xFF) for k in range(4)).strip('\x00 ')
+        except Exception:
+            pass
+        try:
+            if kind == 'source':
+                logger.info('Opened source %s passthrough=%s yuyv=%s', str(target), self.passthrough, self.yuyv)
+            elif kind == 'path':
+                logger.info('Opened camera device=%s using api=%s format=%s passthrough=%s', str(target), str(api), fourcc or '?', self.passthrough)
+            else:
+                logger.info('Opened camera index=%s using api=%s format=%s passthrough=%s', str(target), str(api), fourcc or '?', self.passthrough)
+        except Exception:
+            pass
+        if kind == 'source':
+            return
+        hint = {'kind': kind, 'target': target, 'api': api, 'format': fourcc}
+        if hint != self.hint:
+            self.hint = hint
+            if self.on_open is not None:
                 try:
-                    cap.release()
+                    self.on_open(dict(hint))
                 except Exception:
-                    pass
+                    logger.debug('Camera hint callback failed', exc_info=True)
+
+    def _source_uri(self) -> str | None:
+        if self.source:
+            return self.source
+        if self.device is None and os.environ.get('OPENSENTRY_CAMERA_SOURCE'):
+            return os.environ['OPENSENTRY_CAMERA_SOURCE']
+        return str(self.device) if is_source_uri(self.device) else None
+
+    def _device_path(self) -> str | None:
+        """/dev node of the open camera, when known."""
+        if self._source_uri() is not None:
+            return None
+        hint = self.hint or {}
+        if hint.get('kind') == 'path':
+            return str(hint.get('target'))
+        if hint.get('kind') == 'index':
+            return f"/dev/video{hint.get('target')}"
+        return None
+
+    def _drop_camera(self) -> None:
         try:
-            logger.error('Failed to open any camera (idx requested=%s). Paths tried: %s', idx, ','.join([str(t) for k,t in candidates if k=='path']))
+            if self.camera is not None:
+                self.camera.release()
         except Exception:
             pass
+        self.camera = None
+
+    def _reconnect(self) -> None:
+        self._watch_gen = self._watcher.generation
+        self._open_camera()
+        if self.camera is not None:
+            self.reconnects += 1
+
+    def request_reopen(self) -> None:
+        """Reopen the device from the capture thread, e.g. to apply new settings."""
+        self._reopen = True
+        if self._watcher is not None:
+            self._watcher.notify()
 
     def _capture_frames(self) -> None:
-        failures = 0
+        pin_current_thread(self.cpus)
+        watcher = self._watcher or get_device_watcher()
+        self._watcher = watcher
         while self.running:
-            if self.camera is None:
-                time.sleep(0.2)
-                # Try to reopen periodically
+            if self._reopen:
+                self._reopen = False
+                self._drop_camera()
+                self._watch_gen = watcher.generation
                 self._open_camera()
                 continue
+            if self.camera is None:
+                # Idle until a video node appears (or a reopen is requested)
+                gen = watcher.wait_change(self._watch_gen, _RESCAN_INTERVAL, wake=lambda: self._reopen or not self.running)
+                if not self.running or self._reopen:
+                    continue
+                self._watch_gen = gen
+                self._reconnect()
+                continue
+            # Read into the slot after the latest one. It still holds the
+            # oldest published frame, so retire it first: *_at() and derive()
+            # then miss it instead of returning a half-written frame.
+            slot = self._ring[(self._seq + 1) % len(self._ring)]
+            with self.lock:
+                slot.seq = 0
             success, frame = False, None
             try:
-                success, frame = self.camera.read()
+                if slot.buf is not None:
+                    success, frame = self.camera.read(slot.buf)
+                else:
+                    success, frame = self.camera.read()
             except Exception:
                 success, frame = False, None
+            size = None
             if success and frame is not None:
-                failures = 0
+                # Passthrough buffers must at least carry a JPEG frame header
+                size = jpeg_dimensions(frame) if self.passthrough else (frame.shape[1], frame.shape[0])
+            if size is not None:
+                # OpenCV returns a new array when the resolution changed
+                slot.buf = frame
+                slot.jpeg = self.passthrough
+                slot.yuyv = self.yuyv
+                self.frame_size = size
+                now = time.time()
+                self._last_frame_ts = now
                 with self.lock:
-                    self.frame = frame.copy()
+                    prev_ts = self._ring[self._seq % len(self._ring)].ts
+                    self._seq += 1
+                    slot.seq = self._seq
+                    slot.ts = now
+                    self._cv.notify_all()
+                # Device reads block until the next frame, so no sleep is
+                # needed; only pace backends that return early. Sources pace
+                # themselves (and may deliberately run unthrottled).
+                early = self._sleep - (now - prev_ts)
+                if early > self._sleep * 0.5 and not getattr(self.camera, 'self_paced', False):
+                    time.sleep(early)
             else:
-                failures += 1
-                if failures >= 30:
-                    # Reopen the camera after sustained failures
-                    try:
-                        logger.warning('Camera read failures detected; attempting reopen.')
-                    except Exception:
-                        pass
+                if getattr(self.camera, 'ended', False):
+                    # Non-looping source finished; keep the last frame up
+                    time.sleep(0.2)
+                    continue
+                dev = self._device_path()
+                gone = dev is not None and os.path.isabs(dev) and not os.path.exists(dev)
+                age = time.time() - max(self._last_frame_ts, self._opened_at)
+                if gone or age > self._stall_timeout:
                     try:
-                        if self.camera is not None:
-                            self.camera.release()
+                        logger.warning('Camera %s %s; dropping it.', dev or '?', 'disconnected' if gone else f'stalled for {age:.1f}s')
                     except Exception:
                         pass
-                    self.camera = None
-                    self._open_camera()
-                    failures = 0
+                    self.disconnects += 1
+                    self._drop_camera()
+                    if gone:
+                        # The removal itself must not count as a new device
+                        self._watch_gen = watcher.generation
+                    else:
+                        # Node still there: a stuck stream often recovers on reopen
+                        self._reconnect()
+                    continue
                 time.sleep(0.05)
-                continue
-            time.sleep(self._sleep)
 
-    def get_frame(self):
+    def health(self) -> dict:
+        """Watchdog view of the capture: state, frame age and reconnect counts."""
+        now = time.time()
+        last = self._last_frame_ts
         with self.lock:
-            if self.frame is None:
+            derived = {'computed': self.derive_computed, 'shared': self.derive_shared}
+        if not self.running:
+            state = 'stopped'
+        elif self.camera is None:
+            state = 'waiting'
+        elif getattr(self.camera, 'ended', False):
+            state = 'ended'
+        elif last and now - last <= self._stall_timeout:
+            state = 'streaming'
+        else:
+            state = 'starting' if not last or last < self._opened_at else 'stalled'
+        return {
+            'state': state,
+            'device': self._device_path() or self._source_uri(),
+            'frame_age': round(now - last, 3) if last else None,
+            'reconnects': self.reconnects,
+            'disconnects': self.disconnects,
+            'derived': derived,
+        }
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the latest published frame (0 before the first)."""
+        return self._seq
+
+    def _latest_locked(self):
+        seq = self._seq
+        if seq == 0:
+            return 0, None, None
+        slot = self._ring[seq % len(self._ring)]
+        return seq, slot, slot.buf
+
+    def _pixels(self, seq, slot, buf):
+        """Read-only BGR view for a published slot, decoding JPEG/YUYV lazily once."""
+        if buf is None:
+            return seq, None
+        if slot.jpeg or slot.yuyv:
+            with slot.decode_lock:
+                if slot.decoded_seq != seq:
+                    if slot.jpeg:
+                        slot.decoded = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+                    else:
+                        # Same lifetime contract as buf, so convert in place
+                        prev = slot.decoded
+                        reuse = prev is not None and prev.shape == buf.shape[:2] + (3,)
+                        slot.decoded = cv2.cvtColor(buf, cv2.COLOR_YUV2BGR_YUYV, dst=prev if reuse else None)
+                    slot.decoded_seq = seq
+                buf = slot.decoded
+            if buf is None:
+                return seq, None
+        view = buf.view()
+        view.flags.writeable = False
+        return seq, view
+
+    def get_frame_seq(self):
+        """Return (seq, frame) for the latest frame, or (0, None) if none yet.
+
+        The frame is a read-only view into the ring; compare seq against a
+        previously seen value to tell whether the frame is new.
+        """
+        with self.lock:
+            latest = self._latest_locked()
+        return self._pixels(*latest)
+
+    def get_jpeg(self, after_seq: int = 0):
+        """Return (seq, jpeg_bytes) for the latest passthrough frame.
+
+        jpeg_bytes is None when not in passthrough mode, when no frame exists
+        yet, or when the latest frame is not newer than after_seq.
+        """
+        with self.lock:
+            seq, slot, buf = self._latest_locked()
+            if buf is None or not slot.jpeg or seq <= after_seq:
+                return seq, None
+        return seq, buf.tobytes()
+
+    def _slot_at_locked(self, seq: int):
+        slot = self._ring[seq % len(self._ring)]
+        if seq <= 0 or slot.seq != seq:
+            return seq, None, None
+        return seq, slot, slot.buf
+
+    def frame_at(self, seq: int):
+        """Read-only BGR view of frame `seq` while it is still in the ring, else None."""
+        with self.lock:
+            found = self._slot_at_locked(seq)
+        return self._pixels(*found)[1]
+
+    def jpeg_at(self, seq: int):
+        """Passthrough JPEG bytes of frame `seq` while it is still in the ring, else None."""
+        with self.lock:
+            _, slot, buf = self._slot_at_locked(seq)
+            if buf is None or not slot.jpeg:
+                return None
+        return buf.tobytes()
+
+    def yuyv_at(self, seq: int):
+        """Read-only packed YUYV view of frame `seq` while it is still in the ring, else None."""
+        with self.lock:
+            _, slot, buf = self._slot_at_locked(seq)
+            if buf is None or not slot.yuyv:
+                return None
+        view = buf.view()
+        view.flags.writeable = False
+        return view
+
+    def derive(self, seq: int, key, make):
+        """Product `key` of frame `seq`, built by make(scratch) at most once per capture.
+
+        make() gets a ScratchBuffers owned by the slot and this key; arrays
+        built in it live as long as the frame itself (same contract as the
+        views above), so copy anything that outlives the capture period,
+        e.g. before handing it to the encoder pool. Other consumers asking
+        for the same key and seq wait for the first one and get its result.
+        Returns None once `seq` has left the ring, also when that happens
+        while make() runs (its input may have been overwritten).
+        """
+        with self.lock:
+            slot = self._ring[seq % len(self._ring)]
+            if seq <= 0 or slot.seq != seq:
                 return None
-            return self.frame.copy()
+        with slot.derive_lock:
+            if slot.derived_seq != seq:
+                slot.derived.clear()
+                slot.derived_seq = seq
+            if key in slot.derived:
+                # Counted under self.lock: derive_lock is per slot
+                with self.lock:
+                    self.derive_shared += 1
+                return slot.derived[key]
+            scratch = slot.scratch.get(key)
+            if scratch is None:
+                scratch = slot.scratch[key] = ScratchBuffers()
+            value = make(scratch)
+            with self.lock:
+                if slot.seq != seq:
+                    return None
+                self.derive_computed += 1
+            slot.derived[key] = value
+            return value
+
+    def wait_seq(self, after_seq: int = 0, timeout: float | None = None) -> int:
+        """Like wait_frame() but only returns the sequence number.
+
+        Use this when the frame itself is fetched separately, so passthrough
+        frames are not decoded needlessly.
+        """
+        with self._cv:
+            self._cv.wait_for(lambda: self._seq > after_seq or not self.running, timeout)
+            return self._seq
+
+    def wait_frame(self, after_seq: int = 0, timeout: float | None = None):
+        """Block until a frame newer than after_seq is published.
+
+        Returns (seq, frame) like get_frame_seq(). On timeout, or once the
+        stream is stopped, returns the latest (possibly already seen) frame,
+        so callers compare the returned seq with after_seq. Safe under gevent
+        monkey-patching, where the condition yields to other greenlets.
+        """
+        with self._cv:
+            self._cv.wait_for(lambda: self._seq > after_seq or not self.running, timeout)
+            latest = self._latest_locked()
+        return self._pixels(*latest)
+
+    def get_frame(self):
+        return self.get_frame_seq()[1]
 
     def stop(self) -> None:
-        self.running = False
+        with self._cv:
+            self.running = False
+            self._cv.notify_all()
+        if self._watcher is not None:
+            self._watcher.notify()
         try:
             if self.camera is not None:
                 self.camera.release()
@@ -1,7 +1,13 @@
 import json
 import os
+import tempfile
 from typing import Dict, Any
 
+try:
+    import fcntl
+except ImportError:  # not on POSIX; saves are still atomic, just not serialized
+    fcntl = None
+
 
 def load_config(path: str) -> Dict[str, Any] | None:
     try:
@@ -13,18 +19,38 @@ def load_config(path: str) -> Dict[str, Any] | None:
 
 def save_config(
     path: str,
-    motion_detection: Dict[str, Any],
+    motion_detection: Dict[str, Any] | None,
     device_id: str | None = None,
     auth_config: Dict[str, Any] | None = None,
     video_config: Dict[str, Any] | None = None,
     stream_config: Dict[str, Any] | None = None,
     snapshot_config: Dict[str, Any] | None = None,
+    camera_hints: Dict[str, Any] | None = None,
 ) -> None:
     """Save config to JSON, preserving existing top-level keys like device_id.
 
+    - Only the sections passed (not None) are replaced; everything else is
+      kept as currently on disk, so processes saving different sections
+      (web workers, the capture daemon) do not undo each other's changes.
     - If device_id is provided, it will be set; otherwise preserved when present.
     - If auth_config is provided, it will be merged into the saved config.
+    - camera_hints entries (last-good device per camera id) are merged into
+      the existing ones, so each camera only ever rewrites its own entry.
+
+    The read-merge-write runs under an exclusive lock on `path`.lock and the
+    file is replaced atomically, so readers never see it half-written.
     """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    with open(path + '.lock', 'a') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        _merge_and_write(path, directory, motion_detection, device_id, auth_config, video_config,
+                         stream_config, snapshot_config, camera_hints)
+
+
+def _merge_and_write(path, directory, motion_detection, device_id, auth_config, video_config,
+                     stream_config, snapshot_config, camera_hints) -> None:
     # Start from existing to preserve keys like device_id
     prev: Dict[str, Any] = {}
     try:
@@ -33,10 +59,9 @@ def save_config(
     except Exception:
         prev = {}
 
-    obj = {
-        **prev,
-        'motion_detection': {**motion_detection},
-    }
+    obj = {**prev}
+    if motion_detection is not None:
+        obj['motion_detection'] = {**motion_detection}
     if device_id is not None:
         obj['device_id'] = device_id
     if auth_config is not None:
@@ -48,7 +73,24 @@ def save_config(
         obj['stream'] = {**stream_config}
     if snapshot_config is not None:
         obj['snapshots'] = {**snapshot_config}
+    if camera_hints is not None:
+        prev_hints = prev.get('camera_hints') if isinstance(prev.get('camera_hints'), dict) else {}
+        obj['camera_hints'] = {**prev_hints, **camera_hints}
 
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(obj, f, indent=2)
+    fd, tmp = tempfile.mkstemp(prefix='.config-', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp, os.stat(path).st_mode & 0o777)
+        except OSError:
+            pass
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
@@ -1,14 +1,19 @@
 import os
 import ctypes.util
-from typing import Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
 
 try:
-    from turbojpeg import TurboJPEG, TJPF_BGR  # type: ignore
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJPF_GRAY, TJSAMP_420  # type: ignore
 except Exception:  # pragma: no cover - optional dep
     TurboJPEG = None  # type: ignore
     TJPF_BGR = None  # type: ignore
+    TJPF_GRAY = None  # type: ignore
+    TJSAMP_420 = None  # type: ignore
 
 import cv2
+import numpy as np
 
 _tj: Optional["TurboJPEG"] = None
 _turbo_enabled = False
@@ -135,3 +140,166 @@ def encode_jpeg_bgr(frame, quality: int = 75) -> bytes:
         # Return minimal valid JPEG if encoding fails
         return b"\xff\xd8\xff\xd9"
     return buf.tobytes()
+
+
+def encode_jpeg_i420(i420, quality: int = 75) -> Optional[bytes]:
+    """Encode a full-range I420 buffer (see helpers/yuv.py) with TurboJPEG.
+
+    Skips libjpeg's RGB->YCbCr conversion and chroma downsampling entirely.
+    Returns None when TurboJPEG is unavailable (OpenCV cannot encode YUV);
+    callers then fall back to encode_jpeg_bgr().
+    """
+    if not turbojpeg_enabled():
+        return None
+    height = i420.shape[0] * 2 // 3
+    width = i420.shape[1]
+    try:
+        return _tj.encode_from_yuv(  # type: ignore[union-attr]
+            i420, height, width, quality=int(quality), jpeg_subsample=TJSAMP_420,
+        )
+    except Exception:
+        return None
+
+
+class EncoderPool:
+    """Worker threads for JPEG encodes, so streams use more than one core.
+
+    TurboJPEG (ctypes) and cv2.imencode both release the GIL while encoding.
+    submit() returns a concurrent.futures.Future and blocks once
+    `max_inflight` jobs are queued or running, so a slow pool pushes back on
+    producers instead of growing a backlog. With workers <= 1 jobs run
+    inline on the caller's thread and come back as completed futures.
+
+    `depth` is how many frames one stream should keep in flight; producers
+    rotate through that many scratch buffers, since an image handed to
+    submit() must stay untouched until its job finishes.
+    """
+
+    def __init__(self, workers: int, max_inflight: Optional[int] = None):
+        self.workers = max(1, int(workers))
+        self.depth = self.workers
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='JpegEncoder') if self.workers > 1 else None
+        self._slots = threading.BoundedSemaphore(max(1, int(max_inflight or 2 * self.workers)))
+
+    def submit(self, fn: Callable, *args) -> Future:
+        if self._executor is None:
+            fut: Future = Future()
+            try:
+                fut.set_result(fn(*args))
+            except Exception as e:
+                fut.set_exception(e)
+            return fut
+        self._slots.acquire()
+        try:
+            fut = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _f: self._slots.release())
+        return fut
+
+
+_pool: Optional[EncoderPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_encoder_pool() -> EncoderPool:
+    """Process-wide encoder pool.
+
+    Env:
+      - OPENSENTRY_ENCODE_WORKERS: encoder threads (default: usable CPUs,
+        at most 4); 1 encodes inline on each stream's own thread
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            try:
+                cpus = len(os.sched_getaffinity(0))
+            except Exception:
+                cpus = os.cpu_count() or 1
+            try:
+                workers = int(os.environ.get("OPENSENTRY_ENCODE_WORKERS", "").strip() or min(4, cpus))
+            except ValueError:
+                workers = min(4, cpus)
+            _pool = EncoderPool(workers)
+        return _pool
+
+
+# OpenCV reduced-size decode flags by DCT scaling denominator
+_CV_REDUCED = {
+    (1, True): cv2.IMREAD_GRAYSCALE,
+    (2, True): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (4, True): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (8, True): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    (1, False): cv2.IMREAD_COLOR,
+    (2, False): cv2.IMREAD_REDUCED_COLOR_2,
+    (4, False): cv2.IMREAD_REDUCED_COLOR_4,
+    (8, False): cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def decode_jpeg_scaled(data, scale: float = 0.5, gray: bool = True):
+    """Decode JPEG bytes at reduced size using libjpeg DCT scaling.
+
+    - data: JPEG bytes (or a uint8 buffer)
+    - scale: wanted fraction of full size; the smallest of 1/1, 1/2, 1/4, 1/8
+      that is still >= scale is used, so callers may resize the remainder
+    - gray: decode only luma (single channel) instead of BGR
+    Returns a numpy ndarray ((h, w) when gray, (h, w, 3) otherwise), or None
+    if the data cannot be decoded.
+    """
+    denom = 1
+    for d in (8, 4, 2):
+        if 1.0 / d >= scale:
+            denom = d
+            break
+    if turbojpeg_enabled():
+        try:
+            img = _tj.decode(  # type: ignore[union-attr]
+                bytes(data) if not isinstance(data, (bytes, bytearray)) else data,
+                pixel_format=TJPF_GRAY if gray else TJPF_BGR,
+                scaling_factor=(1, denom),
+            )
+            # PyTurboJPEG returns gray as (h, w, 1); match cv2.imdecode
+            return img[:, :, 0] if gray and img.ndim == 3 else img
+        except Exception:
+            pass
+    buf = np.frombuffer(data, dtype=np.uint8)
+    return cv2.imdecode(buf, _CV_REDUCED[(denom, bool(gray))])
+
+
+def jpeg_dimensions(data) -> Optional[tuple[int, int]]:
+    """Return (width, height) from a JPEG's SOF header without decoding it.
+
+    Accepts bytes or a uint8 buffer (e.g. the 1xN array OpenCV returns for
+    compressed MJPEG frames). Returns None if no frame header is found.
+    """
+    buf = memoryview(data).cast('B') if not isinstance(data, (bytes, bytearray)) else data
+    n = len(buf)
+    if n < 4 or buf[0] != 0xFF or buf[1] != 0xD8:
+        return None
+    i = 2
+    while i + 4 <= n:
+        if buf[i] != 0xFF:
+            i += 1
+            continue
+        marker = buf[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        seg_len = (buf[i + 2] << 8) | buf[i + 3]
+        # SOFn markers, excluding DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if i + 9 > n:
+                return None
+            h = (buf[i + 5] << 8) | buf[i + 6]
+            w = (buf[i + 7] << 8) | buf[i + 8]
+            return int(w), int(h)
+        if marker == 0xDA:
+            # Start of scan reached without a frame header
+            return None
+        i += 2 + seg_len
+    return None
@@ -0,0 +1,579 @@
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Optional
+
+from helpers.frame_hub import EgressBudget
+
+logger = logging.getLogger('opensentry.frame_bus')
+
+# Channel header: magic, version, slots, slot_size, seq, demand_ns, heartbeat_ns
+_HEADER = struct.Struct('<4sIIIQQQ')
+_HEADER_SIZE = 64
+_SEQ_AT = 16
+_DEMAND_AT = 24
+_HEARTBEAT_AT = 32
+# Slot header: seq of the record stored in the slot (0 while being written), length
+_SLOT = struct.Struct('<QI')
+_SLOT_HEADER_SIZE = 16
+_U64 = struct.Struct('<Q')
+_MAGIC = b'OSFB'
+_VERSION = 1
+# Peer table header: magic, version, slots, slot_size, heartbeat_ns
+_PEERS_HEADER = struct.Struct('<4sIIIQ')
+_PEERS_HEARTBEAT_AT = 16
+_PEERS_MAGIC = b'OSPT'
+# Peer slot: pid, heartbeat_ns, egress bytes, kicks requested, kicks done, client list length
+_PEER = struct.Struct('<QQQQQQ')
+_PEER_KICKS = 8  # kick mailbox entries
+_PEER_KICK_ID = 64  # bytes per client id
+_PEER_KICKS_AT = 64
+_PEER_CLIENTS_AT = _PEER_KICKS_AT + _PEER_KICKS * _PEER_KICK_ID
+
+
+def _now_ns() -> int:
+    # CLOCK_MONOTONIC is system-wide on Linux, so processes can compare stamps
+    return time.monotonic_ns()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Open an existing segment without letting this process's tracker unlink it at exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        return shm
+
+
+class BusChannel:
+    """Ring of variable-length records in one shared-memory segment.
+
+    One process writes (create=True), any number attach read-only. Every
+    record gets the next sequence number; readers copy the newest record
+    and check its slot sequence before and after the copy (a seqlock), so
+    a slot overwritten mid-read is detected and retried. Readers set
+    `demand` while they want records and the writer stamps `heartbeat`
+    while it is alive; both are CLOCK_MONOTONIC nanoseconds.
+    """
+
+    def __init__(self, name: str, create: bool = False, slots: int = 4, slot_size: int = 1 << 20):
+        self.name = name
+        self._owner = create
+        if create:
+            try:
+                stale = _attach(name)
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+            size = _HEADER_SIZE + slots * (_SLOT_HEADER_SIZE + slot_size)
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self._shm.buf[:size] = bytes(size)
+            _HEADER.pack_into(self._shm.buf, 0, _MAGIC, _VERSION, slots, slot_size, 0, 0, _now_ns())
+        else:
+            self._shm = _attach(name)
+        magic, version, self.slots, self.slot_size = _HEADER.unpack_from(self._shm.buf, 0)[:4]
+        if magic != _MAGIC or version != _VERSION:
+            self._shm.close()
+            raise ValueError(f'{name}: not a frame bus channel')
+        self._buf = self._shm.buf
+        self.oversize = 0  # records dropped for not fitting a slot (writer side)
+
+    @classmethod
+    def open(cls, name: str) -> Optional['BusChannel']:
+        """Attach to an existing channel; None if its writer has not created it yet."""
+        try:
+            return cls(name)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _get(self, offset: int) -> int:
+        return _U64.unpack_from(self._buf, offset)[0]
+
+    def _slot_offset(self, seq: int) -> int:
+        return _HEADER_SIZE + (seq % self.slots) * (_SLOT_HEADER_SIZE + self.slot_size)
+
+    @property
+    def seq(self) -> int:
+        return self._get(_SEQ_AT)
+
+    def write(self, data: bytes) -> int:
+        """Append a record (writer only); returns its seq, or 0 if it is too large."""
+        n = len(data)
+        if n > self.slot_size:
+            self.oversize += 1
+            return 0
+        seq = self.seq + 1
+        off = self._slot_offset(seq)
+        _SLOT.pack_into(self._buf, off, 0, 0)
+        body = off + _SLOT_HEADER_SIZE
+        self._buf[body:body + n] = data
+        _SLOT.pack_into(self._buf, off, seq, n)
+        _U64.pack_into(self._buf, _SEQ_AT, seq)
+        self.beat()
+        return seq
+
+    def read(self, after_seq: int = 0) -> tuple[int, Optional[bytes]]:
+        """Copy of the newest record if it is newer than after_seq: (seq, data)."""
+        for _ in range(4):
+            seq = self.seq
+            if seq <= after_seq:
+                break
+            off = self._slot_offset(seq)
+            got, n = _SLOT.unpack_from(self._buf, off)
+            if got != seq or n > self.slot_size:
+                continue  # being rewritten; take the newest again
+            body = off + _SLOT_HEADER_SIZE
+            data = bytes(self._buf[body:body + n])
+            if self._get(off) == seq:
+                return seq, data
+        return after_seq, None
+
+    def wait(self, after_seq: int, timeout: float, poll: float = 0.005) -> int:
+        """Poll until a record newer than after_seq exists or timeout; return the seq."""
+        deadline = time.monotonic() + timeout
+        while True:
+            seq = self.seq
+            if seq != after_seq or time.monotonic() >= deadline:
+                return seq
+            time.sleep(poll)
+
+    def touch(self) -> None:
+        """Reader side: ask the writer to keep producing records."""
+        _U64.pack_into(self._buf, _DEMAND_AT, _now_ns())
+
+    def wanted(self, within: float = 2.0) -> bool:
+        return _now_ns() - self._get(_DEMAND_AT) < within * 1e9
+
+    def beat(self) -> None:
+        """Writer side: mark the channel as served."""
+        _U64.pack_into(self._buf, _HEARTBEAT_AT, _now_ns())
+
+    def alive(self, within: float = 5.0) -> bool:
+        return _now_ns() - self._get(_HEARTBEAT_AT) < within * 1e9
+
+    def close(self) -> None:
+        self._buf = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # a reader still holds a view; the mapping goes with the process
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def channel_name(bus: str, cam_id: str, kind: str) -> str:
+    return f'{bus}-{cam_id}-{kind}'
+
+
+class BusPublisher:
+    """Capture side: copies a broadcaster's frames into a channel while readers want them.
+
+    The broadcaster counts the publisher as a consumer only while some web
+    worker has touched the channel recently, so idle streams still park.
+    """
+
+    def __init__(self, channel: BusChannel, broadcaster):
+        self.channel = channel
+        self.broadcaster = broadcaster
+        self._th = threading.Thread(target=self._run, name=f'BusPublisher-{channel.name}', daemon=True)
+        self._th.start()
+
+    def _run(self) -> None:
+        ch = self.channel
+        last = 0
+        while True:
+            ch.beat()
+            if not ch.wanted():
+                time.sleep(0.25)
+                continue
+            self.broadcaster.acquire()
+            try:
+                while ch.wanted():
+                    seq, jpg = self.broadcaster.wait_frame(last, 1.0)
+                    ch.beat()
+                    if seq != last and jpg:
+                        ch.write(jpg)
+                    last = seq
+            finally:
+                self.broadcaster.release()
+
+
+class BusReader:
+    """Web side: pushes records of a channel into a local push-mode broadcaster.
+
+    Reads only while the local broadcaster has viewers, re-attaching when
+    the capture process (re)creates the channel.
+    """
+
+    def __init__(self, name: str, broadcaster):
+        self.name = name
+        self.broadcaster = broadcaster
+        self.channel: Optional[BusChannel] = None
+        self._pushed = 0
+        self._th = threading.Thread(target=self._run, name=f'BusReader-{name}', daemon=True)
+        self._th.start()
+
+    def _run(self) -> None:
+        last = 0
+        while self.broadcaster.wait_watched():
+            ch = self.channel
+            if ch is None or not ch.alive():
+                if ch is not None:
+                    ch.close()
+                ch = self.channel = BusChannel.open(self.name)
+                last = ch.seq if ch is not None else 0
+                if ch is None:
+                    time.sleep(1.0)
+                    continue
+            ch.touch()
+            if ch.wait(last, 0.5) == last:
+                continue
+            seq, data = ch.read(last)
+            if data is not None:
+                self._pushed += 1
+                self.broadcaster.push(data, self._pushed)
+            last = seq
+
+
+class BusMeta:
+    """Small JSON document (e.g. camera state) shared through a channel."""
+
+    def __init__(self, name: str, create: bool = False):
+        self.name = name
+        self.channel: Optional[BusChannel] = BusChannel(name, create=True, slots=2, slot_size=64 << 10) if create else None
+        self._cached: tuple[int, dict] = (0, {})
+
+    def publish(self, doc: dict) -> None:
+        self.channel.write(json.dumps(doc, separators=(',', ':')).encode())
+
+    def get(self) -> dict:
+        """Latest document, or {} while the writer is down."""
+        ch = self.channel
+        if ch is None or not ch.alive():
+            if ch is not None:
+                ch.close()
+            ch = self.channel = BusChannel.open(self.name)
+            self._cached = (0, {})
+            if ch is None:
+                return {}
+        last, doc = self._cached
+        seq, data = ch.read(last)
+        if data is not None:
+            try:
+                doc = json.loads(data)
+            except ValueError:
+                pass
+            self._cached = (seq, doc)
+        return doc
+
+
+def run_meta_publisher(meta: BusMeta, snapshot: Callable[[], dict], interval: float = 0.5) -> threading.Thread:
+    """Publish snapshot() every interval seconds from a daemon thread."""
+    def _loop():
+        while True:
+            try:
+                meta.publish(snapshot())
+            except Exception as e:
+                logger.debug('frame bus meta publish failed: %s', e)
+            time.sleep(interval)
+    th = threading.Thread(target=_loop, name=f'BusMeta-{meta.name}', daemon=True)
+    th.start()
+    return th
+
+
+class BusPeers:
+    """Table of the web processes serving one frame bus, in shared memory.
+
+    The capture daemon creates it and stamps its heartbeat; each web
+    process (gunicorn worker, stream server) owns one slot, kept current
+    by BusPeer, holding its heartbeat, the bytes it has sent to stream
+    clients and the list of those clients. Any process can then add up
+    the total egress, list every client and ask the owning process to
+    disconnect one through the slot's kick mailbox. Slot claims, client
+    lists and kick requests are written under an flock; the counters have
+    a single writer, the slot's owner.
+    """
+
+    def __init__(self, name: str, create: bool = False, slots: int = 32, slot_size: int = 32 << 10):
+        self.name = name
+        self._owner = create
+        if create:
+            try:
+                stale = _attach(name)
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+            size = _HEADER_SIZE + slots * slot_size
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self._shm.buf[:size] = bytes(size)
+            _PEERS_HEADER.pack_into(self._shm.buf, 0, _PEERS_MAGIC, _VERSION, slots, slot_size, _now_ns())
+        else:
+            self._shm = _attach(name)
+        magic, version, self.slots, self.slot_size = _PEERS_HEADER.unpack_from(self._shm.buf, 0)[:4]
+        if magic != _PEERS_MAGIC or version != _VERSION:
+            self._shm.close()
+            raise ValueError(f'{name}: not a frame bus peer table')
+        self._buf = self._shm.buf
+        self._lock_path = os.path.join(tempfile.gettempdir(), f'{name}.lock')
+
+    @classmethod
+    def open(cls, name: str) -> Optional['BusPeers']:
+        """Attach to an existing table; None if the capture daemon has not created it yet."""
+        try:
+            return cls(name)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with open(self._lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _slot(self, i: int) -> int:
+        return _HEADER_SIZE + i * self.slot_size
+
+    def _field(self, i: int, k: int) -> int:
+        return _PEER.unpack_from(self._buf, self._slot(i))[k]
+
+    def _set(self, i: int, k: int, value: int) -> None:
+        _U64.pack_into(self._buf, self._slot(i) + 8 * k, value)
+
+    def beat(self) -> None:
+        """Daemon side: mark the table as served."""
+        _U64.pack_into(self._buf, _PEERS_HEARTBEAT_AT, _now_ns())
+
+    def alive(self, within: float = 5.0) -> bool:
+        return _now_ns() - _U64.unpack_from(self._buf, _PEERS_HEARTBEAT_AT)[0] < within * 1e9
+
+    def _live(self, within: float = 5.0) -> list[tuple[int, int]]:
+        """(slot, pid) of every process that stamped its slot recently."""
+        now = _now_ns()
+        out = []
+        for i in range(self.slots):
+            pid, beat = _PEER.unpack_from(self._buf, self._slot(i))[:2]
+            if pid and now - beat < within * 1e9:
+                out.append((i, pid))
+        return out
+
+    def claim(self, pid: int) -> Optional[int]:
+        """Take a free (or abandoned) slot for `pid`; None if the table is full."""
+        with self._locked():
+            live = dict(self._live())
+            for i in range(self.slots):
+                if i not in live or live[i] == pid:
+                    _PEER.pack_into(self._buf, self._slot(i), pid, _now_ns(), 0, 0, 0, 0)
+                    return i
+        return None
+
+    def egress_total(self) -> int:
+        """Bytes sent to stream clients by all live web processes (see EgressBudget.total_getter)."""
+        return sum(self._field(i, 2) for i, _pid in self._live())
+
+    def _clients_locked(self, i: int) -> list[dict]:
+        off = self._slot(i) + _PEER_CLIENTS_AT
+        n = self._field(i, 5)
+        if not n:
+            return []
+        try:
+            return json.loads(bytes(self._buf[off:off + n]))
+        except ValueError:
+            return []
+
+    def clients(self, skip_pid: int = 0) -> list[dict]:
+        """Stream clients published by every live web process except skip_pid."""
+        out: list[dict] = []
+        with self._locked():
+            for i, pid in self._live():
+                if pid != skip_pid:
+                    out.extend(self._clients_locked(i))
+        return out
+
+    def request_kick(self, pid: int, client_id: str) -> Optional[int]:
+        """Queue client_id for the process `pid`; the request's number, or None if it has no such client."""
+        with self._locked():
+            for i, owner in self._live():
+                if owner != pid:
+                    continue
+                if not any(c.get('id') == client_id for c in self._clients_locked(i)):
+                    return None
+                n = self._field(i, 3) + 1
+                off = self._slot(i) + _PEER_KICKS_AT + ((n - 1) % _PEER_KICKS) * _PEER_KICK_ID
+                self._buf[off:off + _PEER_KICK_ID] = client_id.encode()[:_PEER_KICK_ID].ljust(_PEER_KICK_ID, b'\0')
+                self._set(i, 3, n)
+                return n
+        return None
+
+    def kick_done(self, pid: int, n: int) -> bool:
+        """True once the process `pid` has handled kick request n (or is gone)."""
+        for i, owner in self._live():
+            if owner == pid:
+                return self._field(i, 4) >= n
+        return True
+
+    def update(self, i: int, egress: int, clients: bytes) -> list[str]:
+        """Owner side: refresh slot i; returns the client ids queued for a kick since the last update."""
+        self._set(i, 1, _now_ns())
+        self._set(i, 2, egress)
+        off = self._slot(i) + _PEER_CLIENTS_AT
+        with self._locked():
+            if len(clients) <= self.slot_size - _PEER_CLIENTS_AT:
+                self._buf[off:off + len(clients)] = clients
+                self._set(i, 5, len(clients))
+            requested, done = self._field(i, 3), self._field(i, 4)
+            ids = []
+            for n in range(max(done, requested - _PEER_KICKS), requested):
+                at = self._slot(i) + _PEER_KICKS_AT + (n % _PEER_KICKS) * _PEER_KICK_ID
+                ids.append(bytes(self._buf[at:at + _PEER_KICK_ID]).rstrip(b'\0').decode(errors='replace'))
+            self._set(i, 4, requested)
+        return ids
+
+    def close(self) -> None:
+        self._buf = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class BusPeer:
+    """Web side: keeps this process's slot in the peer table current.
+
+    Every `interval` it stamps the heartbeat, copies egress.sent and
+    clients() into the slot and calls kick(client_id) for ids other
+    processes queued for it. It claims a new slot whenever the capture
+    daemon (re)creates the table.
+    """
+
+    def __init__(self, name: str, egress: 'BusEgress', clients: Callable[[], list], kick: Callable[[str], bool],
+                 interval: float = 0.25):
+        self.name = name
+        self.pid = os.getpid()
+        self._egress = egress
+        self._clients = clients
+        self._kick = kick
+        self.interval = interval
+        self.peers: Optional[BusPeers] = None
+        self._slot: Optional[int] = None
+        self._sent_at_claim = 0
+        self._full = False
+        self._th: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._th is None:
+            self._th = threading.Thread(target=self._run, name=f'BusPeer-{self.name}', daemon=True)
+            self._th.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self._tick()
+            except Exception as e:
+                logger.debug('frame bus peer update failed: %s', e)
+            time.sleep(self.interval)
+
+    def _tick(self) -> None:
+        peers = self.peers
+        if peers is None or not peers.alive():
+            if peers is not None:
+                peers.close()
+            peers = self.peers = BusPeers.open(self.name)
+            self._slot = None
+            if peers is None:
+                return
+        if self._slot is None:
+            self._slot = peers.claim(self.pid)
+            self._sent_at_claim = self._egress.sent
+            if self._slot is None:
+                if not self._full:
+                    logger.warning('frame bus peer table %s is full; clients of pid %d are not shared', self.name, self.pid)
+                self._full = True
+                return
+        data = json.dumps(self._clients(), separators=(',', ':')).encode()
+        ids = peers.update(self._slot, self._egress.sent - self._sent_at_claim, data)
+        for client_id in ids:
+            self._kick(client_id)
+
+    def clients(self) -> list[dict]:
+        """This process's clients (fresh) plus those every other web process published."""
+        own = self._clients()
+        peers = self.peers
+        return own + (peers.clients(skip_pid=self.pid) if peers is not None else [])
+
+    def kick(self, client_id: str, timeout: float = 2.0) -> Optional[bool]:
+        """Disconnect a client of any web process.
+
+        Client ids start with the owner's pid (see SubscriberRegistry.prefix).
+        True once kicked, False if no process has the client, None if its
+        owner did not act on the request within timeout.
+        """
+        head, sep, _ = client_id.partition('-')
+        if not sep or not head.isdigit():
+            return False
+        pid = int(head)
+        if pid == self.pid:
+            return self._kick(client_id)
+        peers = self.peers
+        n = peers.request_kick(pid, client_id) if peers is not None else None
+        if n is None:
+            return False
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if peers.kick_done(pid, n):
+                return True
+            time.sleep(0.05)
+        return None
+
+
+class BusEgress(EgressBudget):
+    """EgressBudget of a web process on the frame bus.
+
+    Parts sent to this process's clients are only counted into `sent`,
+    which BusPeer copies into the peer table. The capture daemon's
+    EgressBudget measures all web processes together from there, and
+    point() returns the operating point it settled on (its snapshot(),
+    published on the bus meta). The daemon's encoders apply its quality
+    factor; this process's streams apply its fps factor via fps().
+    """
+
+    def __init__(self, point: Callable[[], dict], refresh: float = 0.25):
+        super().__init__(lambda: (point() or {}).get('budget_kbps', 0))
+        self._point = point
+        self._refresh = refresh
+        self.sent = 0
+
+    def record(self, nbytes: int) -> None:
+        with self._lock:
+            self.sent += nbytes
+            self._update_locked(time.time())
+
+    def _update_locked(self, now: float) -> None:
+        if now - self._since < self._refresh:
+            return
+        self._since = now
+        point = self._point() or {}
+        self._rate = float(point.get('rate_kbps') or 0) * 1000.0 / 8.0
+        self.quality_factor = float(point.get('quality_factor') or 1.0)
+        self.fps_factor = float(point.get('fps_factor') or 1.0)
@@ -1,30 +1,472 @@
+import asyncio
+import os
+import sys
 import threading
 import time
-from typing import Callable, Optional
+from collections import deque
+from concurrent.futures import Future, wait as _wait_futures
+from typing import Awaitable, Callable, Optional
+
+
+def pin_current_thread(cpus: Optional[set[int]]) -> None:
+    """Best-effort pin of the calling OS thread to a CPU set (Linux only).
+
+    Skipped when cpus is empty or when gevent has monkey-patched threading,
+    since green threads share one OS thread and pinning would pin them all.
+    """
+    if not cpus or not hasattr(os, 'sched_setaffinity'):
+        return
+    monkey = sys.modules.get('gevent.monkey')
+    if monkey is not None and monkey.is_module_patched('threading'):
+        return
+    try:
+        os.sched_setaffinity(0, cpus)
+    except Exception:
+        pass
+
+
+class RateGate:
+    """Admit at most `fps` events per second from an event-driven loop.
+
+    Unlike a sleep timer it never delays an event; it only drops events that
+    arrive too early. A quarter-period tolerance absorbs capture jitter so a
+    30 fps source gated to 15 fps yields every other frame, not every third.
+    """
+
+    def __init__(self):
+        self._next = 0.0
+
+    def admit(self, fps: int, now: float | None = None) -> bool:
+        period = 1.0 / float(max(1, int(fps or 1)))
+        now = time.time() if now is None else now
+        if now < self._next - period * 0.25:
+            return False
+        self._next = now + period
+        return True
+
+
+class AsyncWaiters:
+    """Futures that asyncio coroutines park on until a producer thread wakes them.
+
+    add() must be called from the waiting coroutine's event loop; wake_all()
+    may be called from any thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def add(self) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        with self._lock:
+            self._waiters.append((loop, fut))
+        return fut
+
+    def discard(self, fut: asyncio.Future) -> None:
+        with self._lock:
+            self._waiters = [(l, f) for (l, f) in self._waiters if f is not fut]
+
+    def wake_all(self) -> None:
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        for loop, fut in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve_future, fut)
+            except RuntimeError:
+                # Event loop already closed
+                pass
+
+
+def _resolve_future(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+class EgressBudget:
+    """Rate controller keeping total stream egress under a byte-rate budget.
+
+    Stream generators report every part they send via record(). About once
+    a second the measured rate is compared with the budget and the global
+    operating point moves: over budget, JPEG quality drops first (down to
+    `min_quality_factor`), then the frame rate; once comfortably under
+    budget (below `headroom`) they recover in the reverse order. Producers
+    apply the operating point to their own settings with quality()/fps(),
+    so each profile degrades in proportion to what it asked for.
+    - budget_getter: returns the budget in kbit/s, read on every update;
+      0 or less means unlimited (and resets the operating point)
+    - total_getter: optional; returns the cumulative bytes sent by every
+      process sharing the budget (e.g. BusPeers.egress_total). When set,
+      the rate is measured from it instead of from record(). It may be
+      assigned after construction.
+    """
+
+    def __init__(self, budget_getter: Callable[[], float], min_quality: int = 30,
+                 min_quality_factor: float = 0.5, min_fps_factor: float = 0.1, headroom: float = 0.8,
+                 total_getter: Optional[Callable[[], int]] = None):
+        self._budget = budget_getter
+        self.total_getter = total_getter
+        self._total: Optional[int] = None
+        self.min_quality = min_quality
+        self.min_quality_factor = min_quality_factor
+        self.min_fps_factor = min_fps_factor
+        self.headroom = headroom
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._since = time.time()
+        self._rate = 0.0  # smoothed bytes/s
+        self.quality_factor = 1.0
+        self.fps_factor = 1.0
+
+    def record(self, nbytes: int) -> None:
+        with self._lock:
+            self._bytes += nbytes
+            self._update_locked(time.time())
+
+    def _update_locked(self, now: float) -> None:
+        dt = now - self._since
+        if dt < 1.0:
+            return
+        if self.total_getter is not None:
+            try:
+                total = int(self.total_getter() or 0)
+            except Exception:
+                total = self._total or 0
+            # Totals drop when a process leaves; count nothing for that window
+            self._bytes = max(0, total - self._total) if self._total is not None else 0
+            self._total = total
+        inst = self._bytes / dt
+        self._bytes = 0
+        self._since = now
+        # Light smoothing; a single burst should not swing the operating point
+        self._rate = inst if self._rate == 0.0 else 0.5 * self._rate + 0.5 * inst
+        try:
+            budget = float(self._budget() or 0) * 1000.0 / 8.0
+        except Exception:
+            budget = 0.0
+        if budget <= 0:
+            self.quality_factor = self.fps_factor = 1.0
+            return
+        if self._rate > budget:
+            # Multiplicative decrease: quality first, then frame interval
+            if self.quality_factor > self.min_quality_factor:
+                self.quality_factor = max(self.min_quality_factor, self.quality_factor * 0.85)
+            else:
+                self.fps_factor = max(self.min_fps_factor, self.fps_factor * 0.75)
+        elif self._rate < budget * self.headroom:
+            # Additive increase, undoing the decrease in reverse order
+            if self.fps_factor < 1.0:
+                self.fps_factor = min(1.0, self.fps_factor + 0.1)
+            else:
+                self.quality_factor = min(1.0, self.quality_factor + 0.05)
+
+    def quality(self, base: int) -> int:
+        if self.quality_factor >= 1.0:
+            return int(base)
+        return max(min(int(base), self.min_quality), int(round(base * self.quality_factor)))
+
+    def fps(self, base: float) -> int:
+        return max(1, int(round(float(base) * self.fps_factor)))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            # Account for idle time so the rate decays when nothing is sent
+            self._update_locked(time.time())
+            try:
+                budget = float(self._budget() or 0)
+            except Exception:
+                budget = 0.0
+            return {
+                'budget_kbps': budget,
+                'rate_kbps': round(self._rate * 8.0 / 1000.0, 1),
+                'quality_factor': round(self.quality_factor, 3),
+                'fps_factor': round(self.fps_factor, 3),
+            }
+
+
+class OrderedDelivery:
+    """Pass results of concurrently running jobs to `deliver` in submission order.
+
+    add() queues a future and returns once fewer than `depth` are
+    outstanding, so each stream keeps at most `depth` frames in flight (and
+    producers can safely rotate `depth` scratch buffers). A result reaches
+    `deliver` as soon as it and everything submitted before it are done;
+    failed jobs and None results are skipped.
+    """
+
+    def __init__(self, deliver: Callable[[bytes], None], depth: int = 1):
+        self._deliver = deliver
+        self.depth = max(1, int(depth))
+        self._lock = threading.Lock()
+        self._pending: deque = deque()
+
+    def add(self, fut: Future) -> None:
+        with self._lock:
+            self._pending.append(fut)
+        fut.add_done_callback(self._drain)
+        while True:
+            with self._lock:
+                if len(self._pending) < self.depth:
+                    return
+                head = self._pending[0]
+            _wait_futures([head])
+            # Done callbacks run after waiters wake; do not spin until then
+            self._drain()
+
+    def _drain(self, _fut: Optional[Future] = None) -> None:
+        with self._lock:
+            while self._pending and self._pending[0].done():
+                fut = self._pending.popleft()
+                try:
+                    result = fut.result()
+                except Exception:
+                    result = None
+                if result is not None:
+                    self._deliver(result)
+
+
+class Subscriber:
+    """Per-client state of one multipart stream.
+
+    A subscriber only ever holds the broadcaster's latest frame (a queue
+    depth of one): frames published while it is still writing are skipped
+    and counted in `dropped`, so a slow client costs one shared reference,
+    never a backlog. Every write is timed; `busy` is the fraction of the
+    last window spent blocked in writes.
+
+    Slow-client policy, applied once per window:
+    - busy above SLOW_BUSY: halve the client's own frame-rate cap
+      (`fps_cap`), so it spends less time blocked on each frame
+    - still slow at 1 fps for KICK_WINDOWS windows, or one write taking
+      longer than STALL_S: disconnect (`kicked`)
+    - busy below FAST_BUSY: double the cap again until it is lifted
+
+    A write that never returns cannot be seen from the stream generator, so
+    SubscriberRegistry also checks writes in progress; kicking a client
+    calls `abort` (e.g. shutting down its socket) so the blocked write, and
+    the server thread behind it, are released at once.
+    """
+    WINDOW_S = 2.0
+    SLOW_BUSY = 0.8
+    FAST_BUSY = 0.3
+    KICK_WINDOWS = 3
+    STALL_S = 10.0
+
+    def __init__(self, sub_id: str, stream: str, client: Optional[dict] = None,
+                 abort: Optional[Callable[[], None]] = None):
+        self.id = sub_id
+        self.stream = stream
+        self.client = dict(client or {})
+        self.started = time.time()
+        self.delivered = 0
+        self.dropped = 0
+        self.bytes = 0
+        self.write_ms = 0.0  # smoothed write latency
+        self.max_write_ms = 0.0
+        self.busy = 0.0
+        self.fps_cap: Optional[int] = None
+        self.kicked = False
+        self.kick_reason = ''
+        self._strikes = 0
+        self._win_start = time.monotonic()
+        self._win_busy = 0.0
+        self._win_frames = 0
+        self._next_at = 0.0
+        self._abort = abort
+        self.writing_since: Optional[float] = None  # monotonic start of the write in progress
+
+    def kick(self, reason: str = 'admin') -> None:
+        if self.kicked:
+            return
+        self.kick_reason = reason
+        self.kicked = True
+        if self._abort is not None:
+            try:
+                self._abort()
+            except Exception:
+                pass
+
+    def sent(self, nbytes: int, write_s: float, stream_fps: int) -> None:
+        """Account one delivered part and apply the slow-client policy."""
+        now = time.monotonic()
+        self.delivered += 1
+        self.bytes += nbytes
+        ms = write_s * 1000.0
+        self.write_ms = ms if self.delivered == 1 else 0.8 * self.write_ms + 0.2 * ms
+        self.max_write_ms = max(self.max_write_ms, ms)
+        self._win_busy += write_s
+        self._win_frames += 1
+        if write_s > self.STALL_S:
+            self.kick('stalled')
+            return
+        if self.fps_cap:
+            self._next_at = now - write_s + 1.0 / self.fps_cap
+        span = now - self._win_start
+        if span < self.WINDOW_S:
+            return
+        self.busy = min(1.0, self._win_busy / span)
+        rate = self._win_frames / span
+        self._win_start, self._win_busy, self._win_frames = now, 0.0, 0
+        if self.busy > self.SLOW_BUSY:
+            if self.fps_cap == 1:
+                self._strikes += 1
+                if self._strikes >= self.KICK_WINDOWS:
+                    self.kick('slow')
+            else:
+                self.fps_cap = max(1, int(min(self.fps_cap or rate, rate) / 2))
+        elif self.busy < self.FAST_BUSY:
+            self._strikes = 0
+            if self.fps_cap:
+                self.fps_cap *= 2
+                if self.fps_cap >= max(1, int(stream_fps)):
+                    self.fps_cap = None
+        else:
+            self._strikes = 0
+
+    def pause(self) -> float:
+        """Seconds to wait before taking the next frame under the fps cap."""
+        if not self.fps_cap:
+            return 0.0
+        return max(0.0, self._next_at - time.monotonic())
+
+    def info(self) -> dict:
+        return {
+            'id': self.id,
+            'stream': self.stream,
+            **self.client,
+            'connected_s': round(time.time() - self.started, 1),
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'bytes': self.bytes,
+            'write_ms': round(self.write_ms, 1),
+            'max_write_ms': round(self.max_write_ms, 1),
+            'busy': round(self.busy, 3),
+            'fps_cap': self.fps_cap,
+            'writing_s': round(time.monotonic() - self.writing_since, 1) if self.writing_since else 0.0,
+            'state': 'kicked' if self.kicked else ('throttled' if self.fps_cap else 'ok'),
+        }
+
+
+class SubscriberRegistry:
+    """Every connected stream client, across all broadcasters.
+
+    A reaper thread, started with the first client, kicks clients whose
+    current write has been blocked for longer than Subscriber.STALL_S.
+    """
+
+    def __init__(self, prefix: str = ''):
+        self._lock = threading.Lock()
+        self._subs: dict[str, Subscriber] = {}
+        self._next_id = 0
+        # Prepended to client ids, e.g. the pid when several processes serve streams
+        self.prefix = prefix
+        self._reaper: Optional[threading.Thread] = None
+
+    def add(self, stream: str, client: Optional[dict] = None,
+            abort: Optional[Callable[[], None]] = None) -> Subscriber:
+        with self._lock:
+            self._next_id += 1
+            sub = Subscriber(f'{self.prefix}c{self._next_id}', stream, client, abort)
+            self._subs[sub.id] = sub
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap, name='SubscriberReaper', daemon=True)
+                self._reaper.start()
+        return sub
+
+    def _reap(self) -> None:
+        while True:
+            time.sleep(1.0)
+            now = time.monotonic()
+            with self._lock:
+                subs = list(self._subs.values())
+            for sub in subs:
+                since = sub.writing_since
+                if since is not None and now - since > sub.STALL_S:
+                    sub.kick('stalled')
+
+    def remove(self, sub: Subscriber) -> None:
+        with self._lock:
+            self._subs.pop(sub.id, None)
+
+    def get(self, sub_id: str) -> Optional[Subscriber]:
+        with self._lock:
+            return self._subs.get(sub_id)
+
+    def list(self) -> list[dict]:
+        with self._lock:
+            subs = list(self._subs.values())
+        return [sub.info() for sub in subs]
+
+
+subscribers = SubscriberRegistry()
 
 
 class Broadcaster:
     """Shared MJPEG broadcaster that centralizes encoding per route.
 
-    - produce_fn: returns JPEG bytes for current frame or None to skip.
+    - produce_fn: returns JPEG bytes for current frame or None to skip. It
+      may also return a Future (e.g. from EncoderPool.submit) to encode off
+      this thread; up to `depth` run concurrently and are published in
+      order. With produce_fn None the broadcaster runs no thread and the
+      producer calls push() instead.
     - fps_getter: returns target FPS (int), read each loop for live updates.
+    - wait_fn: optional `wait_fn(after_seq, timeout) -> seq` that blocks until
+      the source has input newer than after_seq. When given, produce_fn runs
+      once per new input (capped at fps) instead of on a free-running timer.
+      While the source has never produced (seq 0) the broadcaster falls back
+      to one produce per period, e.g. for placeholder frames.
+    - cpus: optional CPU set the producer thread is pinned to.
+    - meter: optional object whose record(nbytes) is called for every part
+      sent to a client (e.g. EgressBudget).
+    - idle_grace: seconds the producer keeps running after the last client
+      leaves. Past that it parks (blocks without producing) until the next
+      client subscribes; watched() tells push-mode producers the same.
+
+    Each published frame is wrapped into its complete multipart part once;
+    every subscriber yields that same bytes object, so fan-out does no
+    per-client copying whatever the frame size.
     """
 
-    def __init__(self, name: str, produce_fn: Callable[[], Optional[bytes]], fps_getter: Callable[[], int]):
+    BOUNDARY = b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: '
+
+    def __init__(
+        self,
+        name: str,
+        produce_fn: Optional[Callable[[], "Optional[bytes] | Future"]],
+        fps_getter: Callable[[], int],
+        wait_fn: Optional[Callable[[int, float], int]] = None,
+        cpus: Optional[set[int]] = None,
+        depth: int = 1,
+        meter=None,
+        idle_grace: float = 0.0,
+    ):
         self.name = name
+        self.cpus = cpus
         self._produce = produce_fn
         self._get_fps = fps_getter
-        self._latest: Optional[bytes] = None
+        self._wait = wait_fn
+        self._latest: Optional[bytes] = None  # multipart part of the newest frame
+        self._latest_jpeg: Optional[bytes] = None
         self._seq: int = 0
         self._lock = threading.Lock()
         self._cv = threading.Condition(self._lock)
         self._th: Optional[threading.Thread] = None
         self._running = False
+        self._delivery = OrderedDelivery(self._publish, depth)
+        self._meter = meter
+        self._gate = RateGate()
+        self._pushed_seq = 0
+        self._async_waiters = AsyncWaiters()
+        self._grace = max(0.0, float(idle_grace))
+        self._clients = 0
+        self._idle_since = time.monotonic()
 
     def start(self) -> None:
         if self._running:
             return
         self._running = True
+        if self._produce is None:
+            return
         self._th = threading.Thread(target=self._run, name=f"Broadcaster-{self.name}", daemon=True)
         self._th.start()
 
@@ -32,16 +474,50 @@ class Broadcaster:
         with self._lock:
             self._running = False
             self._cv.notify_all()
+        self._async_waiters.wake_all()
+
+    @property
+    def clients(self) -> int:
+        return self._clients
+
+    def _watched_locked(self) -> bool:
+        return self._clients > 0 or time.monotonic() - self._idle_since < self._grace
+
+    def watched(self) -> bool:
+        """True while a client is subscribed or the idle grace period runs."""
+        with self._lock:
+            return self._watched_locked()
+
+    def wait_watched(self) -> bool:
+        """Block while unwatched; False once the broadcaster is stopped."""
+        with self._lock:
+            while self._running and not self._watched_locked():
+                self._cv.wait()
+            return self._running
 
     def _run(self) -> None:
+        pin_current_thread(self.cpus)
         next_time = time.time()
-        while True:
+        gate = RateGate()
+        last_in = 0
+        while self.wait_watched():
             fps = max(1, int(self._get_fps() or 1))
             period = 1.0 / float(fps)
-            now = time.time()
-            if now < next_time:
-                time.sleep(min(period, next_time - now))
-            next_time = time.time() + period
+            seq = self._wait(last_in, period) if self._wait is not None else 0
+            if seq != 0:
+                if seq == last_in:
+                    # Timed out without new input; nothing to encode
+                    if not self._running:
+                        break
+                    continue
+                last_in = seq
+                if not gate.admit(fps):
+                    continue
+            else:
+                now = time.time()
+                if now < next_time:
+                    time.sleep(min(period, next_time - now))
+                next_time = time.time() + period
 
             # Produce current frame bytes
             try:
@@ -50,29 +526,230 @@ class Broadcaster:
                 data = None
             if data is None:
                 continue
-
-            with self._lock:
-                if not self._running:
-                    break
-                self._latest = data
-                self._seq += 1
-                self._cv.notify_all()
+            if not isinstance(data, Future):
+                # Ready bytes still queue behind encodes in flight
+                ready: Future = Future()
+                ready.set_result(data)
+                data = ready
+            self._delivery.add(data)
+            if not self._running:
+                break
 
             # Avoid spinning in case of extremely fast producers
             time.sleep(0)
 
-    def multipart_stream(self):
-        """Flask generator for multipart/x-mixed-replace route."""
-        boundary = b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: '
-        last = -1
+    def push(self, data: bytes, seq: int) -> None:
+        """Publish the producer's output number `seq` (push mode).
+
+        Outputs are identified by the producer's own increasing sequence, so
+        a frame is sent to clients once, never re-sent because a timer
+        fired; pushes faster than fps_getter allows are dropped.
+        """
+        if seq <= self._pushed_seq:
+            return
+        self._pushed_seq = seq
+        if self._gate.admit(self._get_fps()):
+            self._publish(data)
+
+    def _publish(self, data: bytes) -> None:
+        if not data:
+            return
+        # Keepalive resends of an unchanged frame reuse its part
+        part = self._latest if data is self._latest_jpeg else None
+        if part is None:
+            part = b''.join((self.BOUNDARY, str(len(data)).encode(), b'\r\n\r\n', data, b'\r\n'))
+        with self._lock:
+            if not self._running:
+                return
+            self._latest = part
+            self._latest_jpeg = data
+            self._seq += 1
+            self._cv.notify_all()
+        self._async_waiters.wake_all()
+
+    def acquire(self) -> None:
+        """Count a consumer of this broadcaster's frames (see idle_grace)."""
+        with self._lock:
+            self._clients += 1
+            self._cv.notify_all()  # unpark the producer
+
+    def release(self) -> None:
+        with self._lock:
+            self._clients -= 1
+            if self._clients == 0:
+                self._idle_since = time.monotonic()
+
+    def wait_frame(self, after_seq: int, timeout: float) -> tuple[int, Optional[bytes]]:
+        """Block until a frame newer than after_seq is published; return (seq, jpeg)."""
+        with self._lock:
+            self._cv.wait_for(lambda: self._seq != after_seq or not self._running, timeout)
+            return self._seq, self._latest_jpeg
+
+    async def wait_part_async(self, after_seq: int, timeout: float) -> tuple[int, Optional[bytes]]:
+        """asyncio counterpart of waiting for a new frame: (seq, multipart part)."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
         while True:
             with self._lock:
-                while self._running and (self._seq == last or self._latest is None):
-                    self._cv.wait(timeout=1.0)
+                if self._seq != after_seq or not self._running:
+                    return self._seq, self._latest
+                fut = self._async_waiters.add()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self._async_waiters.discard(fut)
+                return after_seq, None
+            try:
+                await asyncio.wait_for(fut, remaining)
+            except asyncio.TimeoutError:
+                self._async_waiters.discard(fut)
+                return after_seq, None
+
+    async def multipart_stream_async(self, send: Callable[[bytes], Awaitable[None]],
+                                     client: Optional[dict] = None,
+                                     abort: Optional[Callable[[], None]] = None) -> None:
+        """asyncio counterpart of multipart_stream().
+
+        `await send(part)` must return once the part has been written to
+        the client; the same Subscriber policy applies. Returns when the
+        broadcaster stops or the client is kicked; send() raising (client
+        gone) ends it too.
+        """
+        sub = subscribers.add(self.name, client, abort)
+        self.acquire()
+        last = -1
+        try:
+            while not sub.kicked:
+                seq, part = await self.wait_part_async(last, 1.0)
                 if not self._running:
                     break
-                last = self._seq
-                data = self._latest
-            if not data:
-                continue
-            yield boundary + str(len(data)).encode() + b'\r\n\r\n' + data + b'\r\n'
+                if seq == last or part is None:
+                    continue
+                if last >= 0:
+                    sub.dropped += seq - last - 1
+                last = seq
+                if self._meter is not None:
+                    self._meter.record(len(part))
+                t0 = sub.writing_since = time.monotonic()
+                await send(part)
+                sub.writing_since = None
+                sub.sent(len(part), time.monotonic() - t0, self._get_fps())
+                pause = sub.pause()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+        finally:
+            subscribers.remove(sub)
+            self.release()
+
+    def multipart_stream(self, client: Optional[dict] = None, abort: Optional[Callable[[], None]] = None):
+        """Flask generator for multipart/x-mixed-replace route.
+
+        The client is tracked in `subscribers` (see Subscriber) while the
+        stream runs; `client` adds descriptive fields (address, agent) and
+        `abort` force-closes the connection when the client is kicked.
+        """
+        sub = subscribers.add(self.name, client, abort)
+        self.acquire()
+        last = -1
+        try:
+            while not sub.kicked:
+                with self._lock:
+                    while self._running and not sub.kicked and (self._seq == last or self._latest is None):
+                        self._cv.wait(timeout=1.0)
+                    if not self._running or sub.kicked:
+                        break
+                    if last >= 0:
+                        sub.dropped += self._seq - last - 1
+                    last = self._seq
+                    part = self._latest
+                if self._meter is not None:
+                    self._meter.record(len(part))
+                # The WSGI server writes the part before resuming us
+                t0 = sub.writing_since = time.monotonic()
+                yield part
+                sub.writing_since = None
+                sub.sent(len(part), time.monotonic() - t0, self._get_fps())
+                pause = sub.pause()
+                if pause > 0:
+                    time.sleep(pause)
+        finally:
+            subscribers.remove(sub)
+            self.release()
+
+
+class _Subscription:
+    """Response iterable over a broadcaster stream that calls on_close once.
+
+    WSGI servers call close() when the client goes away, including before
+    the first chunk, where a plain generator's finally block would not run.
+    """
+
+    def __init__(self, stream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._stream)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._stream.close()
+        finally:
+            self._on_close()
+
+
+class StreamProfiles:
+    """Broadcasters keyed by output profile, created on first subscribe.
+
+    All clients asking for the same key share one broadcaster, so each
+    profile is encoded once however many clients watch it; it is stopped
+    and dropped when its last subscriber leaves.
+    - factory: key -> new (not yet started) Broadcaster
+    - limit: most profiles live at once; subscribe() returns None beyond it
+    """
+
+    def __init__(self, factory: Callable[[object], Broadcaster], limit: int = 8):
+        self._factory = factory
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._entries: dict = {}  # key -> [broadcaster, subscribers]
+
+    def open(self, key) -> Optional[tuple[Broadcaster, Callable[[], None]]]:
+        """(broadcaster, release) for key, counted as one subscriber until release()."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.limit:
+                    return None
+                entry = [self._factory(key), 0]
+                entry[0].start()
+                self._entries[key] = entry
+            entry[1] += 1
+        return entry[0], lambda: self._release(key, entry)
+
+    def subscribe(self, key, client: Optional[dict] = None,
+                  abort: Optional[Callable[[], None]] = None) -> Optional[_Subscription]:
+        opened = self.open(key)
+        if opened is None:
+            return None
+        broadcaster, release = opened
+        return _Subscription(broadcaster.multipart_stream(client, abort), release)
+
+    def _release(self, key, entry) -> None:
+        with self._lock:
+            entry[1] -= 1
+            if entry[1] > 0 or self._entries.get(key) is not entry:
+                return
+            del self._entries[key]
+        entry[0].stop()
+
+    def active(self) -> list[tuple[object, int]]:
+        """(key, subscriber count) for every live profile."""
+        with self._lock:
+            return [(key, entry[1]) for key, entry in self._entries.items()]
@@ -0,0 +1,155 @@
+import ctypes
+import ctypes.util
+import glob
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+logger = logging.getLogger('opensentry.hotplug')
+
+# inotify(7) constants
+_IN_ATTRIB = 0x00000004
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class DeviceWatcher:
+    """Watch /dev for video device nodes appearing and disappearing.
+
+    Uses inotify where available; otherwise it falls back to comparing the
+    /dev/video* listing every few seconds. Every add/remove bumps a generation
+    counter that cameras block on with wait_change(), so a camera with no
+    device costs nothing until a node actually shows up. With inotify, an
+    attribute change on a node (udev granting access after creating it)
+    bumps the generation too, so an open that failed on permissions is
+    retried right away.
+
+    The reader thread waits in select() rather than a blocking read so it
+    also yields under gevent's monkey-patched threads.
+    """
+
+    def __init__(self, dev_dir: str = '/dev', poll_interval: float = 2.0):
+        self.dev_dir = dev_dir
+        self.poll_interval = poll_interval
+        self._cv = threading.Condition()
+        self._generation = 0
+        self._present = set(self._list_devices())
+        self._started = False
+
+    def _list_devices(self) -> list[str]:
+        return sorted(glob.glob(os.path.join(self.dev_dir, 'video*')))
+
+    def start(self) -> None:
+        with self._cv:
+            if self._started:
+                return
+            self._started = True
+        fd = self._inotify_open()
+        if fd is not None:
+            logger.info('Watching %s for video devices with inotify', self.dev_dir)
+        else:
+            logger.info('inotify unavailable; polling %s for video devices every %.0f s', self.dev_dir, self.poll_interval)
+        target = self._run_inotify if fd is not None else self._run_poll
+        args = (fd,) if fd is not None else ()
+        threading.Thread(target=target, args=args, name='DeviceWatcher', daemon=True).start()
+
+    def _inotify_open(self) -> int | None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+            fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+            if fd < 0:
+                return None
+            # udev creates the node, then fixes up its permissions (IN_ATTRIB)
+            wd = libc.inotify_add_watch(fd, os.fsencode(self.dev_dir), _IN_CREATE | _IN_DELETE | _IN_ATTRIB)
+            if wd < 0:
+                os.close(fd)
+                return None
+            return fd
+        except Exception:
+            return None
+
+    def _run_inotify(self, fd: int) -> None:
+        while True:
+            try:
+                ready, _, _ = select.select([fd], [], [], 60.0)
+                if not ready:
+                    continue
+                data = os.read(fd, 4096)
+            except BlockingIOError:
+                continue
+            except Exception:
+                logger.warning('inotify watch on %s failed; falling back to polling', self.dev_dir)
+                self._run_poll()
+                return
+            changed = attrib = False
+            off = 0
+            while off + _EVENT_HEADER.size <= len(data):
+                _wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, off)
+                name = data[off + _EVENT_HEADER.size:off + _EVENT_HEADER.size + length].rstrip(b'\0')
+                off += _EVENT_HEADER.size + length
+                if name.startswith(b'video'):
+                    changed = True
+                    attrib = attrib or bool(mask & _IN_ATTRIB)
+            if changed:
+                self._refresh(attrib)
+
+    def _run_poll(self) -> None:
+        while True:
+            time.sleep(self.poll_interval)
+            self._refresh()
+
+    def _refresh(self, attrib: bool = False) -> None:
+        """Re-list the nodes; `attrib` bumps the generation even if none came or went."""
+        present = set(self._list_devices())
+        with self._cv:
+            if present == self._present:
+                if attrib:
+                    self._generation += 1
+                    self._cv.notify_all()
+                return
+            added = present - self._present
+            removed = self._present - present
+            self._present = present
+            self._generation += 1
+            self._cv.notify_all()
+        logger.info('Video devices changed: added=%s removed=%s', sorted(added), sorted(removed))
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def wait_change(self, after_generation: int, timeout: float | None = None, wake=None) -> int:
+        """Block until the device set changes past `after_generation`.
+
+        `wake` is an optional predicate that also ends the wait once true;
+        callers that set it should call notify() so it is re-checked.
+        Returns the current generation (unchanged on timeout or wake).
+        """
+        with self._cv:
+            self._cv.wait_for(lambda: self._generation != after_generation or (wake is not None and wake()), timeout)
+            return self._generation
+
+    def notify(self) -> None:
+        """Re-check every waiter's wake predicate."""
+        with self._cv:
+            self._cv.notify_all()
+
+
+_watcher: DeviceWatcher | None = None
+_watcher_lock = threading.Lock()
+
+
+def get_device_watcher() -> DeviceWatcher:
+    """Process-wide watcher shared by all cameras, started on first use."""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = DeviceWatcher()
+            _watcher.start()
+        return _watcher
@@ -1,6 +1,14 @@
+from html import escape
+from typing import List, Tuple
+from urllib.parse import quote
+
 from helpers.theme import get_css, header_html
 
-def render_index_page() -> str:
+def render_index_page(cameras: List[Tuple[str, str]] | None = None, stream_base: str = '') -> str:
+    """Render the dashboard.
+    cameras: list of (camera id, name) for multi-camera devices; None shows the single default feed.
+    stream_base: origin serving the feeds (e.g. the asyncio stream server), '' for this one.
+    """
     css = get_css() + """
     .wrap { display:flex; align-items:center; justify-content:center; padding:32px 16px; }
     .card { width:100%; max-width:960px; background: var(--surface); border:1px solid var(--border); border-radius:12px; padding:20px 22px; box-shadow:0 6px 30px rgba(0,0,0,0.35); }
@@ -11,8 +19,36 @@ def render_index_page() -> str:
     .btn { background: var(--accent); color:#fff; border:0; padding:10px 20px; border-radius:8px; font-weight:600; cursor:pointer; font-size:14px; }
     .btn:hover { filter: brightness(1.1); }
     .btn:disabled { opacity:0.5; cursor:not-allowed; }
+    .card + .card { margin-top:16px; }
+    .stack { width:100%; max-width:960px; }
     """
     hdr = header_html("OpenSentry - Motion Detection Camera")
+    base = escape(stream_base)
+    if cameras:
+        cards = "".join(
+            f"""
+                <div class=\"card\">
+                    <h1>{escape(name)}</h1>
+                    <div class=\"video-container\">
+                        <img src=\"{base}/cam/{escape(quote(cam_id, safe=''))}/video_feed_motion\" alt=\"Motion Detection Feed - {escape(name)}\" />
+                    </div>
+                    <div class=\"controls\">
+                        <button class=\"btn\" id=\"snapshot-btn-{escape(cam_id)}\" data-cam=\"{escape(cam_id)}\" onclick=\"captureSnapshot(this.dataset.cam)\">Take Snapshot</button>
+                    </div>
+                </div>"""
+            for cam_id, name in cameras
+        )
+    else:
+        cards = f"""
+                <div class=\"card\">
+                    <h1>OpenSentry Feed</h1>
+                    <div class=\"video-container\">
+                        <img src=\"{base}/video_feed_motion\" alt=\"Motion Detection Feed\" />
+                    </div>
+                    <div class=\"controls\">
+                        <button class=\"btn\" id=\"snapshot-btn\" onclick=\"captureSnapshot()\">Take Snapshot</button>
+                    </div>
+                </div>"""
     return f"""
     <!DOCTYPE html>
     <html lang=\"en\">
@@ -25,24 +61,17 @@ def render_index_page() -> str:
     <body>
         {hdr}
         <div class=\"wrap\">
-            <div class=\"card\">
-                <h1>OpenSentry Feed</h1>
-                <div class=\"video-container\">
-                    <img src=\"/video_feed_motion\" alt=\"Motion Detection Feed\" />
-                </div>
-                <div class=\"controls\">
-                    <button class=\"btn\" id=\"snapshot-btn\" onclick=\"captureSnapshot()\">Take Snapshot</button>
-                </div>
+            <div class=\"stack\">{cards}
             </div>
         </div>
         <script>
-        async function captureSnapshot() {{
-            const btn = document.getElementById('snapshot-btn');
+        async function captureSnapshot(cam) {{
+            const btn = document.getElementById(cam ? 'snapshot-btn-' + cam : 'snapshot-btn');
             btn.disabled = true;
             btn.textContent = 'Capturing...';
 
             try {{
-                const response = await fetch('/api/snapshot');
+                const response = await fetch(cam ? '/api/snapshot?cam=' + encodeURIComponent(cam) : '/api/snapshot');
                 if (!response.ok) {{
                     throw new Error('Failed to capture snapshot');
                 }}
@@ -1,112 +1,296 @@
-import time
-import os
+from abc import ABC, abstractmethod
+
 import numpy as np
 import cv2
 
+from helpers.buffers import ScratchBuffers
+
+
+class MotionBlobs:
+    """Foreground blobs of one motion mask that passed the min_area filter.
+
+    - boxes: (N, 4) int32 array of per-blob x, y, w, h
+    - areas: (N,) int32 array of per-blob pixel counts
+    - area: total pixel count of the kept blobs
+    - box: union (x1, y1, x2, y2) of the kept blobs (exclusive), or None
+    """
+    __slots__ = ('boxes', 'areas', 'area', 'box')
+
+    def __init__(self, boxes: np.ndarray, areas: np.ndarray):
+        self.boxes = boxes
+        self.areas = areas
+        self.area = int(areas.sum())
+        if len(boxes):
+            ends = boxes[:, :2] + boxes[:, 2:4]
+            self.box = (int(boxes[:, 0].min()), int(boxes[:, 1].min()), int(ends[:, 0].max()), int(ends[:, 1].max()))
+        else:
+            self.box = None
+
+    def __bool__(self) -> bool:
+        return self.box is not None
+
+
+NO_MOTION = MotionBlobs(np.zeros((0, 4), np.int32), np.zeros(0, np.int32))
+
+
+def find_motion(mask: np.ndarray, min_area: int, bufs: ScratchBuffers | None = None) -> MotionBlobs:
+    """Label the 8-connected blobs of a binary mask and keep those >= min_area pixels.
+
+    One cv2.connectedComponentsWithStats() pass yields every blob's box and
+    area; filtering and the union box are NumPy operations, so the cost does
+    not grow with a Python loop over thousands of noise specks. bufs, if
+    given, holds the reused label image.
+    """
+    if not cv2.countNonZero(mask):
+        return NO_MOTION
+    labels = bufs.get('labels', mask.shape[:2], np.int32) if bufs is not None else None
+    n, _, stats, _ = cv2.connectedComponentsWithStats(mask, labels=labels, connectivity=8, ltype=cv2.CV_32S)
+    blobs = stats[1:n]  # row 0 is the background
+    kept = blobs[blobs[:, cv2.CC_STAT_AREA] >= min_area]
+    return MotionBlobs(kept[:, :4], kept[:, cv2.CC_STAT_AREA])
+
+
+def normalize_zones(zones) -> list[dict]:
+    """Valid zones from config: {'mode': 'include'|'exclude', 'points': [[x, y], ...]}.
+
+    Points are fractions of the frame size (0..1), so zones survive
+    resolution changes. Malformed entries and polygons with fewer than three
+    points are dropped.
+    """
+    out = []
+    for zone in zones if isinstance(zones, list) else ():
+        try:
+            mode = str(zone.get('mode', 'include'))
+            points = [[min(1.0, max(0.0, float(x))), min(1.0, max(0.0, float(y)))] for x, y in zone['points']]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            continue
+        if mode in ('include', 'exclude') and len(points) >= 3:
+            out.append({'mode': mode, 'points': points})
+    return out
+
+
+def parse_zones(text: str) -> list[dict]:
+    """Zones from the settings form: one per line, 'include|exclude x,y x,y x,y ...'.
+
+    Raises ValueError naming the first line that cannot be parsed.
+    """
+    zones = []
+    for n, line in enumerate(text.splitlines(), 1):
+        words = line.split()
+        if not words or words[0].startswith('#'):
+            continue
+        zone = normalize_zones([{'mode': words[0].lower(), 'points': [w.split(',') for w in words[1:]]}])
+        if not zone:
+            raise ValueError(f'zone line {n}: expected "include" or "exclude" and at least three x,y points')
+        zones += zone
+    return zones
+
+
+def format_zones(zones: list[dict]) -> str:
+    return '\n'.join(
+        zone['mode'] + ' ' + ' '.join(f'{x:g},{y:g}' for x, y in zone['points'])
+        for zone in normalize_zones(zones)
+    )
+
+
+class ZoneMask:
+    """Zones rasterized for one analysis size.
+
+    - rect: (x, y, w, h) bounding rectangle of the include zones (the whole
+      frame if there are none); analysis crops to it, so the background
+      model only covers watched pixels
+    - mask: uint8 (h, w) of the rect, 255 where motion counts, or None when
+      every pixel of the rect counts
+    A zone setup that leaves nothing to watch gives an empty rect.
+    """
+    __slots__ = ('key', 'rect', 'mask')
+
+    def __init__(self, zones: list[dict], width: int, height: int):
+        self.key = (repr(zones), width, height)
+        include = [z for z in zones if z['mode'] == 'include']
+        full = np.zeros((height, width), np.uint8)
+        if include:
+            for zone in include:
+                cv2.fillPoly(full, [self._polygon(zone, width, height)], 255)
+        else:
+            full[:] = 255
+        for zone in zones:
+            if zone['mode'] == 'exclude':
+                cv2.fillPoly(full, [self._polygon(zone, width, height)], 0)
+        x, y, w, h = cv2.boundingRect(full)
+        self.rect = (x, y, w, h)
+        crop = full[y:y + h, x:x + w]
+        self.mask = None if w == 0 or cv2.countNonZero(crop) == w * h else np.ascontiguousarray(crop)
+
+    @staticmethod
+    def _polygon(zone: dict, width: int, height: int) -> np.ndarray:
+        return np.array([[round(x * (width - 1)), round(y * (height - 1))] for x, y in zone['points']], np.int32)
+
+
+class MotionDetector(ABC):
+    """Foreground segmentation backend: grayscale frame in, motion mask out.
+
+    apply() returns a uint8 mask (255 = moving) of the frame's shape, built
+    in the detector's own reused buffer. learning_rate follows OpenCV's
+    convention: -1 lets the backend pick (about 1/history), 0 freezes the
+    background model, 1 relearns it from this frame.
+
+    settings(cfg) picks the backend's parameters out of a motion_detection
+    dict; detector_params() compares them to tell when a running detector
+    has to be rebuilt.
+    """
+    name = ''
+
+    @staticmethod
+    def settings(cfg: dict) -> tuple:
+        return ()
+
+    def __init__(self, cfg: dict):
+        self.params = (self.name,) + self.settings(cfg)
+        self._bufs = ScratchBuffers()
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+    @abstractmethod
+    def apply(self, gray: np.ndarray, learning_rate: float = -1) -> np.ndarray:
+        ...
+
+    def detect(self, gray: np.ndarray, min_area: int, mask: np.ndarray | None = None,
+               learning_rate: float = -1) -> tuple[np.ndarray, MotionBlobs]:
+        """apply(), then drop pixels outside mask, specks (3x3 opening) and blobs < min_area."""
+        fg = self.apply(gray, learning_rate)
+        if mask is not None:
+            cv2.bitwise_and(fg, mask, dst=fg)
+        fg = cv2.morphologyEx(fg, cv2.MORPH_OPEN, self._kernel, dst=self._bufs.get('open', fg.shape))
+        return fg, find_motion(fg, min_area, self._bufs)
+
+
+class Mog2Detector(MotionDetector):
+    """Per-pixel Gaussian mixture (cv2 MOG2); mog2_history, mog2_var_threshold."""
+    name = 'mog2'
+
+    @staticmethod
+    def settings(cfg: dict) -> tuple:
+        return int(cfg.get('mog2_history', 500)), int(cfg.get('mog2_var_threshold', 16))
+
+    def __init__(self, cfg: dict):
+        super().__init__(cfg)
+        history, var_threshold = self.params[1:]
+        self._model = cv2.createBackgroundSubtractorMOG2(history=history, varThreshold=var_threshold, detectShadows=False)
+
+    def apply(self, gray: np.ndarray, learning_rate: float = -1) -> np.ndarray:
+        return self._model.apply(gray, fgmask=self._bufs.get('fg', gray.shape), learningRate=learning_rate)
+
+
+class KnnDetector(MotionDetector):
+    """K-nearest-neighbour background samples (cv2 KNN); mog2_history, knn_dist2_threshold.
+
+    Copes better than MOG2 with multi-modal backgrounds such as foliage, at
+    a higher per-pixel cost.
+    """
+    name = 'knn'
+
+    @staticmethod
+    def settings(cfg: dict) -> tuple:
+        return int(cfg.get('mog2_history', 500)), float(cfg.get('knn_dist2_threshold', 400))
+
+    def __init__(self, cfg: dict):
+        super().__init__(cfg)
+        history, dist2 = self.params[1:]
+        self._model = cv2.createBackgroundSubtractorKNN(history=history, dist2Threshold=dist2, detectShadows=False)
+
+    def apply(self, gray: np.ndarray, learning_rate: float = -1) -> np.ndarray:
+        return self._model.apply(gray, fgmask=self._bufs.get('fg', gray.shape), learningRate=learning_rate)
+
 
-def create_motion_generator(camera_stream, get_settings):
+class FrameDiffDetector(MotionDetector):
+    """Difference to the previous frame; threshold, kernel, iterations.
+
+    No background model at all, so it is the cheapest backend and never
+    needs to learn, but it only sees the edges of uniform moving objects
+    (hence the dilation) and misses anything that stops. learning_rate is
+    ignored.
     """
-    Factory that produces a generator yielding MJPEG frames with motion overlay.
+    name = 'diff'
+
+    @staticmethod
+    def settings(cfg: dict) -> tuple:
+        return int(cfg.get('threshold', 25)), max(1, int(cfg.get('kernel', 15))), max(0, int(cfg.get('iterations', 2)))
+
+    def __init__(self, cfg: dict):
+        super().__init__(cfg)
+        self.threshold, ksize, self.iterations = self.params[1:]
+        self._dilate = cv2.getStructuringElement(cv2.MORPH_RECT, (ksize, ksize))
+        self._has_prev = False
+
+    def apply(self, gray: np.ndarray, learning_rate: float = -1) -> np.ndarray:
+        cur = cv2.GaussianBlur(gray, (5, 5), 0, dst=self._bufs.get('cur', gray.shape))
+        prev = self._bufs.get('prev', gray.shape)
+        fg = self._bufs.get('fg', gray.shape)
+        if not self._has_prev:
+            fg[:] = 0
+            self._has_prev = True
+        else:
+            cv2.absdiff(prev, cur, dst=fg)
+            cv2.threshold(fg, self.threshold, 255, cv2.THRESH_BINARY, dst=fg)
+            if self.iterations:
+                cv2.dilate(fg, self._dilate, dst=fg, iterations=self.iterations)
+        np.copyto(prev, cur)
+        return fg
+
 
-    - camera_stream: object exposing get_frame()
-    - get_settings: callable returning a dict with keys
-        threshold, kernel, iterations, min_area, pad
+class RunningAverageDetector(MotionDetector):
+    """Difference to an exponential moving average of past frames; threshold, mog2_history.
+
+    The average moves by 1/history per frame (learning_rate overrides it),
+    so it adapts to lighting like the mixture models at a fraction of
+    their cost, but has a single background mode per pixel.
     """
-    # Tuning parameters
-    TARGET_FPS = 15
-    PROC_SCALE = 0.5  # process at half resolution to reduce CPU
-    JPEG_QUALITY = 75
-
-    def generate_frames_with_detection():
-        prev_small = None
-        last_send = 0.0
-        while True:
-            frame = camera_stream.get_frame()
-            if frame is None:
-                # Optional placeholder to make streams testable without a camera
-                if os.environ.get('OPENSENTRY_ALLOW_PLACEHOLDER', '0') in ('1', 'true', 'TRUE'):
-                    frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                    cv2.putText(frame, 'NO CAMERA', (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
-                else:
-                    time.sleep(0.1)
-                    continue
-
-            cfg = get_settings()
-            m_thresh = int(cfg.get('threshold', 25))
-            m_kernel = int(cfg.get('kernel', 15))
-            m_iters = int(cfg.get('iterations', 2))
-            min_area = int(cfg.get('min_area', 500))
-            pad = int(cfg.get('pad', 10))
-
-            # FPS cap
-            now_ts = time.time()
-            min_interval = 1.0 / max(1, TARGET_FPS)
-            dt = now_ts - last_send
-            if dt < min_interval:
-                time.sleep(max(0.0, min_interval - dt))
-            last_send = time.time()
-
-            # Downscale for processing
-            H, W = frame.shape[:2]
-            small = cv2.resize(frame, (int(W * PROC_SCALE), int(H * PROC_SCALE)), interpolation=cv2.INTER_AREA)
-            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
-            gray = cv2.GaussianBlur(gray, (21, 21), 0)
-
-            if prev_small is None:
-                prev_small = gray
-                continue
-
-            frame_delta = cv2.absdiff(prev_small, gray)
-            thresh = cv2.threshold(frame_delta, m_thresh, 255, cv2.THRESH_BINARY)[1]
-            # Cache kernel by size
-            ksize = max(1, m_kernel)
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (ksize, ksize))
-            thresh = cv2.dilate(thresh, kernel, iterations=max(0, m_iters))
-
-            contours, _ = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-            motion_detected = False
-            x_min = y_min = x_max = y_max = None
-            for contour in contours:
-                if cv2.contourArea(contour) < min_area:
-                    continue
-                (x, y, w, h) = cv2.boundingRect(contour)
-                if x_min is None:
-                    x_min, y_min, x_max, y_max = x, y, x + w, y + h
-                    motion_detected = True
-                else:
-                    x_min = min(x_min, x)
-                    y_min = min(y_min, y)
-                    x_max = max(x_max, x + w)
-                    y_max = max(y_max, y + h)
-
-            if motion_detected:
-                # Scale bbox back to full-res coords
-                inv = 1.0 / PROC_SCALE
-                x1 = int(max(0, x_min - pad) * inv)
-                y1 = int(max(0, y_min - pad) * inv)
-                x2 = int(min(small.shape[1] - 1, x_max + pad) * inv)
-                y2 = int(min(small.shape[0] - 1, y_max + pad) * inv)
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 3)
-
-            status = "MOTION DETECTED" if motion_detected else "No Motion"
-            color = (0, 0, 255) if motion_detected else (0, 255, 0)
-            cv2.putText(frame, status, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
-
-            prev_small = gray
-
-            # Downscale for output to reduce JPEG cost if very large
-            out = frame
-            if W > 960:
-                scale_out = 960 / float(W)
-                out = cv2.resize(frame, (int(W * scale_out), int(H * scale_out)), interpolation=cv2.INTER_AREA)
-            ret, buffer = cv2.imencode('.jpg', out, [int(cv2.IMWRITE_JPEG_QUALITY), int(JPEG_QUALITY)])
-            if not ret:
-                continue
-
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n'
-                   b'Content-Length: ' + str(len(frame_bytes)).encode() + b'\r\n\r\n' + frame_bytes + b'\r\n')
-
-    return generate_frames_with_detection
+    name = 'average'
+
+    @staticmethod
+    def settings(cfg: dict) -> tuple:
+        return int(cfg.get('threshold', 25)), max(1, int(cfg.get('mog2_history', 500)))
+
+    def __init__(self, cfg: dict):
+        super().__init__(cfg)
+        self.threshold, history = self.params[1:]
+        self._alpha = 1.0 / history
+        self._frames = 0
+
+    def apply(self, gray: np.ndarray, learning_rate: float = -1) -> np.ndarray:
+        avg = self._bufs.get('avg', gray.shape, np.float32)
+        back = self._bufs.get('back', gray.shape)
+        fg = self._bufs.get('fg', gray.shape)
+        if self._frames == 0 or learning_rate >= 1:
+            avg[:] = gray
+        self._frames += 1
+        cv2.convertScaleAbs(avg, dst=back)
+        cv2.absdiff(gray, back, dst=fg)
+        cv2.threshold(fg, self.threshold, 255, cv2.THRESH_BINARY, dst=fg)
+        # Learn quickly while young, like MOG2 does, then settle at 1/history
+        alpha = learning_rate if learning_rate >= 0 else max(self._alpha, 1.0 / self._frames)
+        if alpha > 0:
+            cv2.accumulateWeighted(gray, avg, alpha)
+        return fg
+
+
+DETECTORS = {cls.name: cls for cls in (Mog2Detector, KnnDetector, FrameDiffDetector, RunningAverageDetector)}
+
+
+def _detector_class(cfg: dict):
+    name = str(cfg.get('detector') or 'mog2').lower()
+    cls = DETECTORS.get(name)
+    if cls is None:
+        raise ValueError(f'unknown motion detector {name!r} (expected one of {", ".join(DETECTORS)})')
+    return cls
+
+
+def detector_params(cfg: dict) -> tuple:
+    """The `params` a detector created from cfg would have."""
+    cls = _detector_class(cfg)
+    return (cls.name,) + cls.settings(cfg)
+
+
+def create_detector(cfg: dict) -> MotionDetector:
+    """Detector named by cfg['detector'] (default mog2), configured from the same dict."""
+    return _detector_class(cfg)(cfg)
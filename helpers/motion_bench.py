@@ -0,0 +1,185 @@
+"""Compare motion detector backends on one clip.
+
+    python -m helpers.motion_bench --source 'file:/clips/driveway.mp4?speed=max&loop=0'
+    python -m helpers.motion_bench --detectors mog2,average --set threshold=18
+
+Frames are read once from a source URI (see helpers/sources.py), reduced to
+grayscale at the analysis scale like _MotionWorker does, and every backend
+then runs over the same frames. For each backend it reports detect()
+latency per frame and how well it detected motion:
+
+- synthetic: sources know where their objects are, so detections are
+  scored against that ground truth: hit rate (frames with objects where
+  motion was found), IoU of the detected box with the objects' box, and
+  precision (share of foreground pixels that lie on an object)
+- other sources have no ground truth; each backend's decisions are
+  compared with the first backend's instead
+
+The first --warmup frames only train the background models and are not
+scored. Settings default to the motion_detection section of config.json.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from helpers.config import load_config
+from helpers.motion import DETECTORS, create_detector
+from helpers.sources import open_source
+
+_DEFAULT_SOURCE = 'synthetic:?w=1280&h=720&fps=0&objects=2&noise=4'
+_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+
+
+def read_clip(uri: str, frames: int, scale: float):
+    """Up to `frames` analysis-size gray frames plus ground-truth boxes per frame (or None)."""
+    src = open_source(uri)
+    grays, truth = [], []
+    try:
+        while len(grays) < frames:
+            ok, frame = src.read()
+            if not ok or frame is None:
+                break
+            if frame.ndim == 2:  # JPEG buffer from a passthrough-capable source
+                frame = cv2.imdecode(frame, cv2.IMREAD_COLOR)
+            H, W = frame.shape[:2]
+            small = cv2.resize(frame, (int(W * scale), int(H * scale)), interpolation=cv2.INTER_AREA)
+            grays.append(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+            boxes = getattr(src, 'boxes', None)
+            truth.append(None if boxes is None else [tuple(int(v * scale) for v in b) for b in boxes])
+    finally:
+        src.release()
+    return grays, truth
+
+
+def _union(boxes):
+    """(x1, y1, x2, y2) around (x, y, w, h) boxes, or None."""
+    if not boxes:
+        return None
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[0] + b[2] for b in boxes), max(b[1] + b[3] for b in boxes))
+
+
+def _iou(a, b) -> float:
+    if a is None or b is None:
+        return 0.0
+    iw = min(a[2], b[2]) - max(a[0], b[0])
+    ih = min(a[3], b[3]) - max(a[1], b[1])
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    return inter / float((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter)
+
+
+def run_backend(name: str, cfg: dict, grays, truth, warmup: int, min_area: int) -> dict:
+    detector = create_detector({**cfg, 'detector': name})
+    times, decisions = [], []
+    hits = gt_frames = false = empty_frames = 0
+    ious, fg_total, fg_on_objects = [], 0, 0
+    gt_mask = np.zeros(grays[0].shape, np.uint8) if grays else None
+    for i, gray in enumerate(grays):
+        t0 = time.perf_counter()
+        fg, blobs = detector.detect(gray, min_area)
+        elapsed = time.perf_counter() - t0
+        if i < warmup:
+            continue
+        times.append(elapsed)
+        decisions.append(bool(blobs))
+        boxes = truth[i]
+        if boxes is None:
+            continue
+        if boxes:
+            gt_frames += 1
+            hits += bool(blobs)
+            ious.append(_iou(blobs.box, _union(boxes)))
+        else:
+            empty_frames += 1
+            false += bool(blobs)
+        gt_mask[:] = 0
+        for x, y, w, h in boxes:
+            gt_mask[y:y + h, x:x + w] = 255
+        fg_total += cv2.countNonZero(fg)
+        fg_on_objects += cv2.countNonZero(cv2.bitwise_and(fg, gt_mask))
+    ms = np.array(times) * 1000.0 if times else np.zeros(1)
+    return {
+        'detector': name,
+        'params': list(detector.params[1:]),
+        'frames': len(times),
+        'ms_mean': round(float(ms.mean()), 3),
+        'ms_p95': round(float(np.percentile(ms, 95)), 3),
+        'triggered': round(sum(decisions) / len(decisions), 3) if decisions else None,
+        'hit_rate': round(hits / gt_frames, 3) if gt_frames else None,
+        'false_rate': round(false / empty_frames, 3) if empty_frames else None,
+        'iou': round(float(np.mean(ious)), 3) if ious else None,
+        'precision': round(fg_on_objects / fg_total, 3) if fg_total else None,
+        '_decisions': decisions,
+    }
+
+
+def _parse_set(items) -> dict:
+    out = {}
+    for item in items or ():
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise SystemExit(f'--set expects key=value, got {item!r}')
+        try:
+            out[key] = json.loads(value)
+        except ValueError:
+            out[key] = value
+    return out
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog='python -m helpers.motion_bench', description='Compare motion detector backends on one clip.')
+    ap.add_argument('--source', default=_DEFAULT_SOURCE, help=f'source URI (default {_DEFAULT_SOURCE})')
+    ap.add_argument('--frames', type=int, default=400, help='frames to read (default 400)')
+    ap.add_argument('--warmup', type=int, default=60, help='unscored frames that train the models (default 60)')
+    ap.add_argument('--scale', type=float, default=0.5, help='analysis scale, as in the server (default 0.5)')
+    ap.add_argument('--detectors', default=','.join(DETECTORS), help='comma-separated backends (default all)')
+    ap.add_argument('--min-area', type=int, help='blob area threshold (default: config min_area)')
+    ap.add_argument('--set', action='append', metavar='KEY=VALUE', help='override a motion_detection setting')
+    ap.add_argument('--json', action='store_true', help='print JSON instead of a table')
+    args = ap.parse_args(argv)
+
+    names = [n.strip().lower() for n in args.detectors.split(',') if n.strip()]
+    unknown = [n for n in names if n not in DETECTORS]
+    if unknown:
+        ap.error(f'unknown detector(s) {", ".join(unknown)}; choose from {", ".join(DETECTORS)}')
+    cfg = dict((load_config(_CONFIG_PATH) or {}).get('motion_detection') or {})
+    cfg.update(_parse_set(args.set))
+    min_area = args.min_area if args.min_area is not None else int(cfg.get('min_area', 500))
+
+    grays, truth = read_clip(args.source, args.frames, args.scale)
+    if len(grays) <= args.warmup:
+        print(f'only {len(grays)} frames read, need more than --warmup {args.warmup}', file=sys.stderr)
+        return 1
+    has_truth = truth[0] is not None
+    results = [run_backend(n, cfg, grays, truth, args.warmup, min_area) for n in names]
+    if not has_truth:
+        ref = results[0]['_decisions']
+        for r in results:
+            r['agreement'] = round(sum(a == b for a, b in zip(r['_decisions'], ref)) / len(ref), 3)
+    for r in results:
+        del r['_decisions']
+
+    if args.json:
+        print(json.dumps({'source': args.source, 'size': list(grays[0].shape[::-1]), 'min_area': min_area,
+                          'results': results}, indent=2))
+        return 0
+    h, w = grays[0].shape
+    print(f'{args.source}: {len(grays) - args.warmup} scored frames at {w}x{h}, min_area {min_area}')
+    cols = ['ms_mean', 'ms_p95', 'triggered'] + (['hit_rate', 'false_rate', 'iou', 'precision'] if has_truth else ['agreement'])
+    print(f'{"detector":<10}' + ''.join(f'{c:>12}' for c in cols))
+    for r in results:
+        print(f'{r["detector"]:<10}' + ''.join(f'{"-" if r[c] is None else r[c]:>12}' for c in cols))
+    if not has_truth:
+        print(f'agreement: share of frames where the motion decision matches {names[0]}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -24,14 +24,20 @@ def render_settings_page(
     cam_height: int = 0,
     cam_fps: int = 15,
     cam_mjpeg: bool = True,
+    cam_passthrough: bool = False,
+    cam_yuv: bool = False,
     out_max_width: int = 960,
     jpeg_quality: int = 75,
     raw_fps: int = 15,
+    egress_budget_kbps: int = 0,
     # Automatic snapshots
     snapshot_enabled: bool = False,
     snapshot_cooldown: int = 15,
     snapshot_motion_threshold: int = 5000,
     snapshot_directory: str = 'snapshots',
+    # Motion zones, one per line (see helpers/motion.parse_zones)
+    m_zones: str = '',
+    m_detector: str = 'mog2',
 ) -> str:
     # OAuth2 settings
     auth_mode_local_checked = 'checked' if auth_mode == 'local' else ''
@@ -40,6 +46,10 @@ def render_settings_page(
     raw_class = 'ok' if raw_ok else 'down'
     raw_text = 'Active' if raw_ok else 'Down'
     motion_class = 'ok' if motion_ok else 'down'
+    detector_options = ''.join(
+        f'<option value="{value}"{" selected" if value == m_detector else ""}>{label}</option>'
+        for value, label in (('mog2', 'MOG2 (default)'), ('knn', 'KNN'), ('average', 'Running average'), ('diff', 'Frame difference'))
+    )
     motion_text = 'Active' if motion_ok else 'Down'
 
     css = get_css() + """
@@ -56,7 +66,7 @@ def render_settings_page(
             .md-grid .control .control-title { display: flex; gap: 8px; align-items: baseline; justify-content: space-between; color: var(--muted); }
             .md-grid .control output { font-variant-numeric: tabular-nums; min-width: 3ch; text-align: right; color: var(--text); }
             input[type=range] { width: 100%; accent-color: var(--accent); }
-            input[type=text], input[type=number] { background:#0e131b; color:var(--text); border:1px solid var(--border); border-radius:8px; padding:8px 10px; }
+            input[type=text], input[type=number], textarea, select { background:#0e131b; color:var(--text); border:1px solid var(--border); border-radius:8px; padding:8px 10px; }
             input[type=checkbox], input[type=radio] { accent-color: var(--accent); }
             button { background: var(--accent); color:#fff; border:0; padding:8px 12px; border-radius:8px; font-weight:600; cursor:pointer; }
             button:hover { filter: brightness(1.05); }
@@ -160,6 +170,8 @@ def render_settings_page(
                         <label class=\"control\">
                             <span class=\"control-title\">MJPEG</span>
                             <label><input type=\"checkbox\" name=\"cam_mjpeg\" { 'checked' if cam_mjpeg else '' }> Enable MJPEG</label>
+                            <label><input type=\"checkbox\" name=\"cam_passthrough\" { 'checked' if cam_passthrough else '' }> MJPEG passthrough (serve camera JPEGs without re-encoding)</label>
+                            <label><input type=\"checkbox\" name=\"cam_yuv\" { 'checked' if cam_yuv else '' }> Raw YUV capture when MJPEG is off (skip BGR conversions)</label>
                         </label>
                         <label class=\"control\">
                             <span class=\"control-title\">JPEG quality: <output id=\"stream_jpeg_quality_out\">{jpeg_quality}</output></span>
@@ -173,12 +185,20 @@ def render_settings_page(
                             <span class=\"control-title\">Stream FPS: <output id=\"stream_raw_fps_out\">{raw_fps}</output></span>
                             <input type=\"range\" name=\"stream_raw_fps\" min=\"5\" max=\"30\" step=\"1\" value=\"{raw_fps}\" oninput=\"document.getElementById('stream_raw_fps_out').textContent=this.value\">
                         </label>
+                        <label class=\"control\">
+                            <span class=\"control-title\">Egress budget (kbit/s, 0 = unlimited)</span>
+                            <input type=\"number\" name=\"stream_egress_budget\" min=\"0\" step=\"100\" value=\"{egress_budget_kbps}\">
+                        </label>
                     </div>
                     <p><small>Leave width/height 0 to use device defaults. Lower dimensions, quality, and FPS reduce CPU and latency.</small></p>
                 </fieldset>
                 <fieldset>
                     <legend>Motion detection sensitivity</legend>
                     <div class=\"md-grid\">
+                        <label class=\"control\">
+                            <span class=\"control-title\">Detector</span>
+                            <select name=\"md_detector\">{detector_options}</select>
+                        </label>
                         <label class=\"control\">
                             <span class=\"control-title\">Motion sensitivity: <output id=\"mog2_var_threshold_out\">{mog2_var_threshold}</output></span>
                             <input type=\"range\" name=\"mog2_var_threshold\" min=\"8\" max=\"30\" step=\"1\" value=\"{mog2_var_threshold}\">
@@ -196,7 +216,12 @@ def render_settings_page(
                             <input type=\"range\" name=\"md_pad\" min=\"0\" max=\"50\" step=\"1\" value=\"{m_pad}\">
                         </label>
                     </div>
-                    <p><small><strong>Motion sensitivity:</strong> Lower values (8-12) detect subtle movements, higher values (18-30) reduce false positives. <strong>Learning period:</strong> How many frames to build background model (200-500 for fast adaptation, 500-1000 for stable scenes).</small></p>
+                    <p><small><strong>Motion sensitivity:</strong> Lower values (8-12) detect subtle movements, higher values (18-30) reduce false positives. <strong>Learning period:</strong> How many frames to build background model (200-500 for fast adaptation, 500-1000 for stable scenes). <strong>Detector:</strong> MOG2 suits most scenes; KNN copes better with swaying foliage at a higher CPU cost; running average and frame difference are the cheapest (compare them on your own footage with <code>python -m helpers.motion_bench</code>).</small></p>
+                </fieldset>
+                <fieldset>
+                    <legend>Motion zones</legend>
+                    <textarea name="md_zones" rows="4" spellcheck="false" style="width:100%; box-sizing:border-box; font-family:monospace;" placeholder="include 0.1,0.4 0.6,0.4 0.6,1 0.1,1">{m_zones}</textarea>
+                    <p><small>One polygon per line: <code>include</code> or <code>exclude</code>, then at least three <code>x,y</code> corners as fractions of the frame (0,0 = top left, 1,1 = bottom right). With include zones, only their bounding rectangle is analysed, so smaller zones cost less CPU. Motion inside exclude zones is ignored. Leave empty to watch the whole frame.</small></p>
                 </fieldset>
                 <fieldset>
                     <legend>Automatic Snapshots</legend>
@@ -0,0 +1,280 @@
+import glob
+import os
+import time
+import urllib.parse
+
+import cv2
+import numpy as np
+
+# URI schemes CameraStream accepts instead of a V4L2 device
+SOURCE_SCHEMES = ('file', 'images', 'synthetic')
+_IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+# Packed YUYV output for raw-capture testing (missing from older OpenCV)
+_BGR2YUYV = getattr(cv2, 'COLOR_BGR2YUV_YUYV', None)
+
+
+def is_source_uri(value) -> bool:
+    """True for 'file:', 'images:' or 'synthetic:' URIs."""
+    if not isinstance(value, str) or ':' not in value:
+        return False
+    return value.split(':', 1)[0].lower() in SOURCE_SCHEMES
+
+
+def _truthy(value: str) -> bool:
+    return str(value) in ('1', 'true', 'TRUE', 'True', 'yes')
+
+
+class _PacedSource:
+    """Shared cv2.VideoCapture-like surface for the non-device sources.
+
+    read() blocks until the next frame is due, like a camera does, so the
+    capture loop needs no pacing of its own (`self_paced`). fps <= 0 means
+    as fast as the consumer reads. set(CAP_PROP_CONVERT_RGB, 0) asks for JPEG
+    buffers (1xN uint8) as in MJPEG passthrough, where the source supports it,
+    or for packed YUYV (HxWx2) when the YUYV fourcc was requested.
+    """
+    self_paced = True
+    supports_jpeg = False
+
+    def __init__(self, fps: float):
+        self.fps = float(fps)
+        self.jpeg = False
+        self.yuyv = False
+        self._fourcc = 0
+        self.jpeg_quality = 85
+        self.ended = False
+        self._next = 0.0
+        self._open = True
+
+    def _pace(self) -> None:
+        if self.fps <= 0:
+            return
+        now = time.time()
+        if self._next > now:
+            time.sleep(self._next - now)
+            now = self._next
+        # Do not try to catch up after a stall; just resume the cadence
+        self._next = max(self._next + 1.0 / self.fps, now - 1.0 / self.fps)
+
+    def isOpened(self) -> bool:
+        return self._open
+
+    def release(self) -> None:
+        self._open = False
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FPS:
+            return float(max(0.0, self.fps))
+        return 0.0
+
+    def set(self, prop: int, value: float) -> bool:
+        if prop == cv2.CAP_PROP_FOURCC:
+            self._fourcc = int(value)
+            return False
+        if prop == cv2.CAP_PROP_CONVERT_RGB and self.supports_jpeg:
+            raw = float(value) == 0.0
+            self.yuyv = raw and self._fourcc == cv2.VideoWriter_fourcc(*'YUYV') and _BGR2YUYV is not None
+            self.jpeg = raw and not self.yuyv
+            return True
+        # Size and rate come from the URI, not the device settings
+        return False
+
+    def _emit(self, img, buf):
+        """Return (True, frame), reusing buf when shapes match."""
+        if self.yuyv:
+            reuse = buf is not None and buf.shape == img.shape[:2] + (2,)
+            return True, cv2.cvtColor(img, _BGR2YUYV, dst=buf if reuse else None)
+        if self.jpeg:
+            ok, enc = cv2.imencode('.jpg', img, [int(cv2.IMWRITE_JPEG_QUALITY), int(self.jpeg_quality)])
+            if not ok:
+                return False, None
+            return True, enc.reshape(1, -1)
+        if buf is not None and buf.shape == img.shape and buf.dtype == img.dtype and buf is not img:
+            np.copyto(buf, img)
+            return True, buf
+        return True, img
+
+
+class FileSource(_PacedSource):
+    """Video file played at its native rate (speed=native) or unthrottled (speed=max)."""
+
+    def __init__(self, path: str, loop: bool = True, speed: str = 'native'):
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise ValueError(f'cannot open video file {path!r}')
+        native = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        super().__init__(0.0 if speed == 'max' else native)
+        self.path = path
+        self.loop = loop
+        self._cap = cap
+
+    def read(self, buf=None):
+        if self.ended or not self._open:
+            return False, None
+        self._pace()
+        ok, frame = self._cap.read(buf) if buf is not None else self._cap.read()
+        if not ok and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._cap.read(buf) if buf is not None else self._cap.read()
+        if not ok:
+            self.ended = True
+            return False, None
+        return True, frame
+
+    def release(self) -> None:
+        super().release()
+        self._cap.release()
+
+
+class ImageDirSource(_PacedSource):
+    """Sorted image files from a directory, played as a sequence.
+
+    JPEG files are handed out byte-for-byte when JPEG output is requested.
+    """
+    supports_jpeg = True
+
+    def __init__(self, directory: str, fps: float = 15.0, loop: bool = True):
+        files = sorted(p for p in glob.glob(os.path.join(directory, '*')) if p.lower().endswith(_IMAGE_EXTS))
+        if not files:
+            raise ValueError(f'no images in {directory!r}')
+        super().__init__(fps)
+        self.files = files
+        self.loop = loop
+        self._idx = 0
+
+    def read(self, buf=None):
+        if self.ended or not self._open:
+            return False, None
+        if self._idx >= len(self.files):
+            if not self.loop:
+                self.ended = True
+                return False, None
+            self._idx = 0
+        path = self.files[self._idx]
+        self._idx += 1
+        self._pace()
+        if self.jpeg and path.lower().endswith(('.jpg', '.jpeg')):
+            return True, np.fromfile(path, dtype=np.uint8).reshape(1, -1)
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is None:
+            return False, None
+        return self._emit(img, buf)
+
+
+class SyntheticSource(_PacedSource):
+    """Procedural scene: textured static background with moving rectangles.
+
+    Deterministic for a given seed, so runs are reproducible. `boxes` holds
+    the (x, y, w, h) of every object in the last frame as ground truth.
+    `noise` adds sensor-like noise (amplitude in grey levels) from a small
+    precomputed bank so it costs one saturating add per frame.
+    """
+    supports_jpeg = True
+
+    def __init__(self, width: int = 1280, height: int = 720, fps: float = 30.0,
+                 objects: int = 2, seed: int = 0, noise: int = 0, size: float = 0.12):
+        super().__init__(fps)
+        self.objects = max(0, int(objects))
+        self.seed = int(seed)
+        self.noise = max(0, int(noise))
+        self.size = float(size)
+        self.boxes: list[tuple[int, int, int, int]] = []
+        self._frame_no = 0
+        self._build(int(width), int(height))
+
+    def _build(self, width: int, height: int) -> None:
+        self.width = max(16, width)
+        self.height = max(16, height)
+        rng = np.random.default_rng(self.seed)
+        # Gradient plus static texture, so the background model has structure
+        yy, xx = np.mgrid[0:self.height, 0:self.width]
+        base = (40 + 80 * xx / self.width + 40 * yy / self.height).astype(np.uint8)
+        tex = rng.integers(0, 24, size=(self.height, self.width), dtype=np.uint8)
+        gray = cv2.add(base, tex)
+        self._bg = cv2.merge([gray, cv2.add(gray, 10), cv2.subtract(gray, 10)])
+        self._frame = np.empty_like(self._bg)  # scratch for JPEG output
+        self._noise_bank = [
+            rng.integers(0, self.noise + 1, size=self._bg.shape, dtype=np.uint8) for _ in range(4)
+        ] if self.noise else []
+        side = max(4, int(min(self.width, self.height) * self.size))
+        # Each object: position, velocity (px/frame at 30 fps), size, colour
+        self._objs = []
+        for _ in range(self.objects):
+            w = int(side * rng.uniform(0.6, 1.4))
+            h = int(side * rng.uniform(0.6, 1.4))
+            self._objs.append([
+                rng.uniform(0, self.width - w), rng.uniform(0, self.height - h),
+                rng.choice((-1, 1)) * rng.uniform(4, 12), rng.choice((-1, 1)) * rng.uniform(3, 8), w, h,
+                tuple(int(c) for c in rng.integers(150, 256, size=3)),
+            ])
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        return super().get(prop)
+
+    def read(self, buf=None):
+        if not self._open:
+            return False, None
+        self._pace()
+        if self.jpeg or self.yuyv:
+            out = self._frame
+        elif buf is not None and buf.shape == self._bg.shape:
+            out = buf
+        else:
+            # Never hand out the same array twice; the caller keeps it in a ring
+            out = np.empty_like(self._bg)
+        np.copyto(out, self._bg)
+        if self._noise_bank:
+            cv2.add(out, self._noise_bank[self._frame_no % len(self._noise_bank)], dst=out)
+        # Keep apparent speed independent of fps
+        step = 30.0 / self.fps if self.fps > 0 else 1.0
+        boxes = []
+        for obj in self._objs:
+            x, y, vx, vy, w, h, color = obj
+            x += vx * step
+            y += vy * step
+            if x < 0 or x + w > self.width:
+                vx = -vx
+                x = min(max(x, 0), self.width - w)
+            if y < 0 or y + h > self.height:
+                vy = -vy
+                y = min(max(y, 0), self.height - h)
+            obj[0], obj[1], obj[2], obj[3] = x, y, vx, vy
+            ix, iy = int(x), int(y)
+            cv2.rectangle(out, (ix, iy), (ix + w - 1, iy + h - 1), color, -1)
+            boxes.append((ix, iy, w, h))
+        self.boxes = boxes
+        self._frame_no += 1
+        if self.jpeg or self.yuyv:
+            return self._emit(out, buf)
+        return True, out
+
+
+def open_source(uri: str):
+    """Open a source URI; raises ValueError for unknown or unusable ones.
+
+    - file:/path/video.mp4?loop=1&speed=native|max
+    - images:/path/dir?fps=15&loop=1
+    - synthetic:?w=1280&h=720&fps=30&objects=2&seed=0&noise=0&size=0.12
+    """
+    parts = urllib.parse.urlsplit(uri)
+    scheme = parts.scheme.lower()
+    path = urllib.parse.unquote((parts.netloc or '') + (parts.path or ''))
+    q = dict(urllib.parse.parse_qsl(parts.query))
+    try:
+        if scheme == 'file':
+            return FileSource(path, loop=_truthy(q.get('loop', '1')), speed=q.get('speed', 'native'))
+        if scheme == 'images':
+            return ImageDirSource(path, fps=float(q.get('fps', 15)), loop=_truthy(q.get('loop', '1')))
+        if scheme == 'synthetic':
+            return SyntheticSource(
+                width=int(q.get('w', 1280)), height=int(q.get('h', 720)), fps=float(q.get('fps', 30)),
+                objects=int(q.get('objects', 2)), seed=int(q.get('seed', 0)),
+                noise=int(q.get('noise', 0)), size=float(q.get('size', 0.12)),
+            )
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'invalid source {uri!r}: {e}') from e
+    raise ValueError(f'unknown source scheme in {uri!r}')
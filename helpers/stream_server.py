@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger('opensentry.stream_server')
+
+_REASONS = {400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found', 405: 'Method Not Allowed',
+            501: 'Not Implemented', 503: 'Service Unavailable'}
+
+
+class StreamError(Exception):
+    """Raised by a resolver to answer a stream request with an error status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class StreamServer:
+    """asyncio HTTP front end for the multipart stream routes.
+
+    Each viewer is one coroutine and one transport. Every frame is the
+    broadcaster's prebuilt part, written with transport.write and awaited
+    until flushed (the write buffer limit is 0), so a connection holds at
+    most the unsent tail of one frame however slow the client is.
+
+    - resolve(method, target, headers, peer) -> (broadcaster, release, client)
+      authenticates and picks the stream, or raises StreamError; release()
+      is called once the viewer disconnects.
+    - headers: extra response headers sent with every stream.
+    """
+
+    def __init__(self, resolve: Callable, host: str = '0.0.0.0', port: int = 0,
+                 headers: Optional[dict] = None, reuse_port: bool = False):
+        self._resolve = resolve
+        self.host = host
+        self.port = port
+        self._headers = dict(headers or {})
+        self._reuse_port = reuse_port
+        self.connections = 0
+
+    async def serve_forever(self) -> None:
+        server = await asyncio.start_server(self._handle, self.host, self.port,
+                                            reuse_port=self._reuse_port or None, backlog=1024)
+        logger.info('Stream server listening on %s:%d', self.host, self.port)
+        async with server:
+            await server.serve_forever()
+
+    def start_in_thread(self) -> threading.Thread:
+        """Run the server on its own event loop in a daemon thread."""
+        th = threading.Thread(target=lambda: asyncio.run(self.serve_forever()), name='StreamServer', daemon=True)
+        th.start()
+        return th
+
+    async def _error(self, writer: asyncio.StreamWriter, status: int, message: str) -> None:
+        body = ('{"error": "%s"}' % message.replace('"', "'")).encode()
+        writer.write(
+            f'HTTP/1.1 {status} {_REASONS.get(status, "Error")}\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode()
+            + body
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 10.0)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+        release = None
+        self.connections += 1
+        try:
+            lines = head.decode('latin-1').split('\r\n')
+            parts = lines[0].split(' ')
+            if len(parts) != 3:
+                raise StreamError(400, 'bad request line')
+            method, target = parts[0], parts[1]
+            if method not in ('GET', 'HEAD'):
+                raise StreamError(405, 'method not allowed')
+            headers = []
+            for line in lines[1:]:
+                name, sep, value = line.partition(':')
+                if sep:
+                    headers.append((name.strip(), value.strip()))
+            peer = writer.get_extra_info('peername') or ('', 0)
+            broadcaster, release, client = self._resolve(method, target, headers, peer[0])
+        except StreamError as e:
+            await self._error(writer, e.status, e.message)
+            writer.close()
+            self.connections -= 1
+            return
+
+        transport = writer.transport
+        transport.set_write_buffer_limits(high=0)
+        loop = asyncio.get_running_loop()
+        head_lines = [
+            'HTTP/1.1 200 OK',
+            'Content-Type: multipart/x-mixed-replace; boundary=frame',
+            'Cache-Control: no-store, no-cache, must-revalidate, max-age=0, no-transform',
+            'Pragma: no-cache',
+            'Expires: 0',
+            'X-Accel-Buffering: no',
+            'Connection: close',
+        ] + [f'{k}: {v}' for k, v in self._headers.items()]
+        writer.write(('\r\n'.join(head_lines) + '\r\n\r\n').encode('latin-1'))
+
+        async def send(part: bytes) -> None:
+            writer.write(part)
+            await writer.drain()
+
+        try:
+            if method == 'GET':
+                await broadcaster.multipart_stream_async(
+                    send, client, lambda: loop.call_soon_threadsafe(transport.abort))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.connections -= 1
+            release()
+            writer.close()
@@ -0,0 +1,103 @@
+import cv2
+import numpy as np
+
+from helpers.buffers import ScratchBuffers
+
+# Camera YUYV is BT.601 limited range (Y 16..235, C 16..240); JPEG/JFIF wants
+# full range, so planes are stretched with a lookup table while building I420.
+_Y_LUT = np.clip((np.arange(256) - 16) * 255.0 / 219.0 + 0.5, 0, 255).astype(np.uint8)
+_C_LUT = np.clip((np.arange(256) - 128) * 255.0 / 224.0 + 128.5, 0, 255).astype(np.uint8)
+
+
+def is_yuyv(frame) -> bool:
+    """True for the (H, W, 2) packed YUYV arrays OpenCV returns with CONVERT_RGB=0."""
+    return frame is not None and frame.ndim == 3 and frame.shape[2] == 2
+
+
+def luma(yuyv: np.ndarray, bufs: ScratchBuffers, name: str = 'luma') -> np.ndarray:
+    """Y plane of a YUYV frame as a contiguous (H, W) array (no color conversion)."""
+    h, w = yuyv.shape[:2]
+    return cv2.extractChannel(yuyv, 0, bufs.get(name, (h, w)))
+
+
+def i420_size(width: int, height: int) -> tuple[int, int]:
+    """Output size rounded down so every I420 plane row stays 4-byte aligned."""
+    return max(8, width - width % 8), max(2, height - height % 2)
+
+
+def yuyv_to_i420(yuyv: np.ndarray, width: int, height: int, bufs: ScratchBuffers) -> np.ndarray:
+    """Repack (and optionally downscale) YUYV into a full-range I420 buffer.
+
+    Returns an (height * 3 // 2, width) uint8 array holding the Y, U and V
+    planes back to back, the layout TurboJPEG's encode_from_yuv() expects.
+    Plane copies and resizes only; no RGB round trip. width/height should
+    come from i420_size().
+    """
+    h, w = yuyv.shape[:2]
+    out = bufs.get('i420', (height * 3 // 2, width))
+    y_plane, u_plane, v_plane = _planes(out)
+    cw, ch = width // 2, height // 2
+
+    if (w, h) == (width, height):
+        cv2.extractChannel(yuyv, 0, y_plane)
+    else:
+        cv2.resize(luma(yuyv, bufs, 'i420_y'), (width, height), dst=y_plane, interpolation=cv2.INTER_AREA)
+
+    # YUYV chroma is already half width; take every other row for 4:2:0.
+    # The chroma channel alternates U, V per pixel pair.
+    uv = cv2.extractChannel(yuyv[::2], 1, bufs.get('i420_uv', (h // 2, w))).reshape(h // 2, w // 2, 2)
+    if (w // 2, h // 2) == (cw, ch):
+        cv2.extractChannel(uv, 0, u_plane)
+        cv2.extractChannel(uv, 1, v_plane)
+    else:
+        u = cv2.extractChannel(uv, 0, bufs.get('i420_u', (h // 2, w // 2)))
+        v = cv2.extractChannel(uv, 1, bufs.get('i420_v', (h // 2, w // 2)))
+        cv2.resize(u, (cw, ch), dst=u_plane, interpolation=cv2.INTER_AREA)
+        cv2.resize(v, (cw, ch), dst=v_plane, interpolation=cv2.INTER_AREA)
+
+    cv2.LUT(y_plane, _Y_LUT, dst=y_plane)
+    chroma = out.reshape(-1)[width * height:].reshape(-1, cw)
+    cv2.LUT(chroma, _C_LUT, dst=chroma)
+    return out
+
+
+def _bgr_to_yuv(color) -> tuple[int, int, int]:
+    b, g, r = (float(c) for c in color)
+    y = 0.299 * r + 0.587 * g + 0.114 * b
+    u = 128.0 - 0.168736 * r - 0.331264 * g + 0.5 * b
+    v = 128.0 + 0.5 * r - 0.418688 * g - 0.081312 * b
+    return tuple(int(max(0, min(255, round(c)))) for c in (y, u, v))
+
+
+def _planes(i420: np.ndarray):
+    height = i420.shape[0] * 2 // 3
+    width = i420.shape[1]
+    flat = i420.reshape(-1)
+    cw, ch = width // 2, height // 2
+    return (
+        i420[:height],
+        flat[width * height:width * height + cw * ch].reshape(ch, cw),
+        flat[width * height + cw * ch:].reshape(ch, cw),
+    )
+
+
+def draw_rect_i420(i420: np.ndarray, p1, p2, color, thickness: int = 1) -> None:
+    """cv2.rectangle on an I420 buffer; color is BGR like everywhere else."""
+    yv, uv, vv = _bgr_to_yuv(color)
+    y_plane, u_plane, v_plane = _planes(i420)
+    cv2.rectangle(y_plane, p1, p2, yv, thickness)
+    c1, c2 = (p1[0] // 2, p1[1] // 2), (p2[0] // 2, p2[1] // 2)
+    ct = max(1, thickness // 2) if thickness > 0 else thickness
+    cv2.rectangle(u_plane, c1, c2, uv, ct)
+    cv2.rectangle(v_plane, c1, c2, vv, ct)
+
+
+def put_text_i420(i420: np.ndarray, text: str, org, font, scale: float, color, thickness: int = 1) -> None:
+    """cv2.putText on an I420 buffer; chroma is drawn at half scale."""
+    yv, uv, vv = _bgr_to_yuv(color)
+    y_plane, u_plane, v_plane = _planes(i420)
+    cv2.putText(y_plane, text, org, font, scale, yv, thickness)
+    corg = (org[0] // 2, org[1] // 2)
+    ct = max(1, thickness // 2)
+    cv2.putText(u_plane, text, corg, font, scale / 2.0, uv, ct)
+    cv2.putText(v_plane, text, corg, font, scale / 2.0, vv, ct)
@@ -1,3 +1,4 @@
+import asyncio
 import threading
 import time
 import os
@@ -8,18 +9,29 @@ import uuid
 import socket
 import json
 import io
+import re
+import signal
+import sys
 from collections import deque
+from concurrent.futures import Future
  
 from flask import Flask, Response, request, redirect, url_for, send_file, abort, session, render_template_string, jsonify
 from io import BytesIO
+from werkzeug.exceptions import HTTPException
 import cv2
 from helpers.camera import CameraStream
 from helpers.settings_page import render_settings_page
 from helpers.index_page import render_index_page
 from helpers.theme import get_css, header_html
 from helpers.mdns import MdnsAdvertiser
-from helpers.encoders import init_jpeg_encoder, encode_jpeg_bgr
-from helpers.frame_hub import Broadcaster
+from helpers.encoders import init_jpeg_encoder, encode_jpeg_bgr, encode_jpeg_i420, decode_jpeg_scaled, jpeg_dimensions, turbojpeg_enabled, get_encoder_pool
+from helpers.yuv import yuyv_to_i420, i420_size, luma, draw_rect_i420, put_text_i420
+from helpers.motion import (NO_MOTION, DETECTORS, MotionBlobs, MotionDetector, ZoneMask, create_detector, detector_params,
+                            format_zones, normalize_zones, parse_zones)
+from helpers.frame_hub import Broadcaster, EgressBudget, OrderedDelivery, RateGate, StreamProfiles, pin_current_thread, subscribers
+from helpers.buffers import ScratchBuffers, ScratchRing
+from helpers.frame_bus import BusChannel, BusEgress, BusMeta, BusPeer, BusPeers, BusPublisher, BusReader, channel_name, run_meta_publisher
+from helpers.stream_server import StreamError, StreamServer
 from helpers.config import load_config as _load_config, save_config as _save_config
 
 app = Flask(__name__)
@@ -197,11 +209,20 @@ def _probe_oauth2(base_url: str) -> tuple[bool, dict | str]:
         return False, "missing required fields"
     return True, info
 
+def _bearer_ok() -> bool:
+    """True if the request carries the configured API token."""
+    auth = request.headers.get('Authorization', '')
+    return bool(API_TOKEN) and auth.startswith('Bearer ') and auth[len('Bearer '):].strip() == API_TOKEN
+
+
 def _auth_allowed() -> bool:
     # Allow unauthenticated access to only the login and OAuth2 routes
     ep = request.endpoint or ''
     if ep in ('login', 'oauth2_login', 'oauth2_callback', 'oauth2_fallback', 'api_oauth2_test', 'static', 'health', 'favicon', 'status'):
         return True
+    # Admin APIs also accept the /status bearer token (Command Center)
+    if ep.startswith('api_clients') and _bearer_ok():
+        return True
     return bool(session.get('logged_in'))
 
 
@@ -495,9 +516,29 @@ def status():
         if token != API_TOKEN:
             return ({'error': 'forbidden'}, 403)
     # Build status
-    has_frame = (camera_stream.get_frame() is not None)
+    has_frame = (camera_stream.seq != 0)
     raw_ok = camera_stream.running and has_frame
     motion_ok = raw_ok
+    cameras = {}
+    for cam_id, pipe in list(_pipelines.items()):
+        cameras[cam_id] = {
+            'name': pipe.name,
+            'running': bool(pipe.camera.running),
+            'has_frame': bool(pipe.camera.seq != 0),
+            'health': pipe.camera.health(),
+            'profiles': pipe.active_profiles(),
+            # Motion analysis cadence: idle while the scene has been quiet
+            'analysis': pipe.motion_worker.analysis(),
+            # False once the default stream has had no viewer for the idle grace period
+            'streaming': {
+                'raw': pipe.raw_broadcaster.watched(),
+                'motion': pipe.motion_broadcaster.watched(),
+            },
+            'routes': {
+                'raw': f'/cam/{cam_id}/video_feed',
+                'motion': f'/cam/{cam_id}/video_feed_motion',
+            },
+        }
     data = {
         'id': DEVICE_ID,
         'name': DEVICE_NAME,
@@ -511,6 +552,13 @@ def status():
         'camera': {
             'running': bool(camera_stream.running),
             'has_frame': bool(has_frame),
+            **camera_stream.health(),
+        },
+        'cameras': cameras,
+        'egress': {
+            **egress.snapshot(),
+            'jpeg_quality': egress.quality(JPEG_QUALITY),
+            'fps': egress.fps(int(stream_config.get('raw_fps', RAW_TARGET_FPS))),
         },
         'auth_mode': 'token' if API_TOKEN else 'session',
     }
@@ -543,6 +591,13 @@ def logs_download():
 OUTPUT_MAX_WIDTH = int(os.environ.get('OPENSENTRY_OUTPUT_MAX_WIDTH', '960'))
 JPEG_QUALITY = int(os.environ.get('OPENSENTRY_JPEG_QUALITY', '75'))
 RAW_TARGET_FPS = int(os.environ.get('OPENSENTRY_RAW_FPS', '15'))
+# Static-scene skip on the raw stream: a frame whose thumbnail differs from
+# the last encoded one by at most STATIC_THRESHOLD grey levels is not
+# re-encoded; the previous JPEG is re-sent at STATIC_FPS. 0 disables it.
+STATIC_THRESHOLD = int(os.environ.get('OPENSENTRY_STATIC_THRESHOLD', '8'))
+STATIC_FPS = float(os.environ.get('OPENSENTRY_STATIC_FPS', '1'))
+# Total egress budget of all streams in kbit/s (0 = unlimited)
+EGRESS_BUDGET_KBPS = int(os.environ.get('OPENSENTRY_EGRESS_BUDGET_KBPS', '0'))
 
 # Video/stream configurable defaults and live config
 VIDEO_DEFAULTS = {
@@ -550,14 +605,52 @@ VIDEO_DEFAULTS = {
     'height': 0,
     'fps': 15,
     'mjpeg': True,
+    'passthrough': False,
+    'yuv': False,
 }
 STREAM_DEFAULTS = {
     'max_width': OUTPUT_MAX_WIDTH,
     'jpeg_quality': JPEG_QUALITY,
     'raw_fps': RAW_TARGET_FPS,
+    'static_threshold': STATIC_THRESHOLD,
+    'static_fps': STATIC_FPS,
+    'egress_budget_kbps': EGRESS_BUDGET_KBPS,
 }
 video_config = dict(VIDEO_DEFAULTS)
 stream_config = dict(STREAM_DEFAULTS)
+# Shared by every stream: measures what is sent and scales quality/fps to fit
+egress = EgressBudget(lambda: stream_config.get('egress_budget_kbps', 0))
+
+# Per-camera sections from config.json ("cameras": {id: {...}}). Empty means a
+# single auto-probed camera. Each section may set device, name, and overrides
+# for video and motion_detection.
+camera_configs: dict[str, dict] = {}
+# Last-good device per camera id, so restarts skip the full device probe
+camera_hints: dict[str, dict] = {}
+# Named output profiles ("stream_profiles": {name: {"w", "fps", "q"}}), picked
+# with ?profile=<name> on the feed routes; ?w=&fps=&q= override their fields
+stream_profiles: dict[str, dict] = {}
+# Distinct non-default profiles per camera and stream kind, each one encoder
+MAX_STREAM_PROFILES = int(os.environ.get('OPENSENTRY_MAX_STREAM_PROFILES', '8'))
+# Seconds the default stream encoders keep running after their last viewer leaves
+STREAM_IDLE_GRACE_S = float(os.environ.get('OPENSENTRY_STREAM_IDLE_GRACE', '10'))
+# Shared-memory frame bus name. When set, `python server.py --capture-daemon`
+# owns the cameras and every web worker streams from the bus instead
+FRAME_BUS = os.environ.get('OPENSENTRY_FRAME_BUS', '').strip()
+FRAME_BUS_SLOT_KB = int(os.environ.get('OPENSENTRY_FRAME_BUS_SLOT_KB', '1024'))
+CAPTURE_DAEMON = __name__ == '__main__' and '--capture-daemon' in sys.argv
+# asyncio front end for the stream routes (0 = off; see helpers/stream_server.py)
+STREAM_PORT = int(os.environ.get('OPENSENTRY_STREAM_PORT', '0'))
+STREAM_SERVER = __name__ == '__main__' and '--stream-server' in sys.argv
+_stream_server_started = False  # in this process (dev server); on the frame bus it is a sibling process
+DEFAULT_CAMERA_ID = 'default'
+# Camera registry: id -> _CameraPipeline (filled by _build_pipelines)
+_pipelines: dict = {}
+
+def _camera_video_settings(cam_id: str) -> dict:
+    """Effective video settings for a configured camera (global + overrides)."""
+    overrides = (camera_configs.get(cam_id) or {}).get('video') or {}
+    return {**video_config, **overrides}
 
 def _apply_video_stream_settings():
     """Apply current video/stream settings to runtime (env + globals) and refresh camera."""
@@ -575,6 +668,8 @@ def _apply_video_stream_settings():
         h = int(video_config.get('height', 0) or 0)
         f = int(video_config.get('fps', 0) or 0)
         m = bool(video_config.get('mjpeg', True))
+        pt = bool(video_config.get('passthrough', False))
+        yv = bool(video_config.get('yuv', False))
         if w > 0:
             os.environ['OPENSENTRY_CAMERA_WIDTH'] = str(w)
         else:
@@ -588,18 +683,20 @@ def _apply_video_stream_settings():
         else:
             os.environ.pop('OPENSENTRY_CAMERA_FPS', None)
         os.environ['OPENSENTRY_CAMERA_MJPEG'] = '1' if m else '0'
-        # Update camera sleep interval and force reopen to apply
-        try:
-            if f > 0:
-                camera_stream._sleep = 1.0 / max(1, f)
-        except Exception:
-            pass
-        try:
-            if camera_stream.camera is not None:
-                camera_stream.camera.release()
-        except Exception:
-            pass
-        camera_stream.camera = None
+        os.environ['OPENSENTRY_CAMERA_PASSTHROUGH'] = '1' if (m and pt) else '0'
+        os.environ['OPENSENTRY_CAMERA_YUV'] = '1' if (yv and not m) else '0'
+        # Update each camera's settings and sleep interval, then force reopen to apply
+        for cam_id, pipe in list(_pipelines.items()):
+            cam = pipe.camera
+            if cam.video is not None:
+                cam.video = _camera_video_settings(cam_id)
+            try:
+                cam_fps = int((cam.video or video_config).get('fps', 0) or 0)
+                if cam_fps > 0:
+                    cam._sleep = 1.0 / max(1, cam_fps)
+            except Exception:
+                pass
+            cam.request_reopen()
     except Exception:
         pass
 
@@ -608,13 +705,19 @@ settings_lock = threading.Lock()
 
 # Motion detection defaults and settings (thread-safe, in-memory)
 MOTION_DEFAULTS = {
-    'threshold': 25,           # [DEPRECATED] pixel diff threshold (kept for compatibility)
-    'min_area': 500,           # minimum contour area (pixels)
-    'kernel': 15,              # [DEPRECATED] dilation kernel (kept for compatibility)
-    'iterations': 2,           # [DEPRECATED] dilation iterations (kept for compatibility)
+    'threshold': 25,           # pixel diff threshold (diff and average detectors)
+    'min_area': 500,           # minimum blob area (analysis-size pixels)
+    'kernel': 15,              # dilation kernel (diff detector)
+    'iterations': 2,           # dilation iterations (diff detector)
     'pad': 10,                 # box padding (px)
     'mog2_var_threshold': 16,  # MOG2 variance threshold (8-30, lower = more sensitive)
     'mog2_history': 500,       # MOG2 learning history (frames, ~30 sec @ 15fps)
+    'detector': 'mog2',        # mog2 | knn | diff | average (see helpers/motion.py)
+    'knn_dist2_threshold': 400,  # KNN squared-distance threshold (lower = more sensitive)
+    'idle_fps': 2,             # analysis rate once the scene is quiet (0 = always full rate)
+    'idle_after': 10,          # seconds without motion before dropping to idle_fps
+    'wake_threshold': 10,      # thumbnail grey-level change that restores the full rate
+    'zones': [],               # include/exclude polygons, fractions of the frame (see helpers/motion.py)
 }
 motion_detection_config = MOTION_DEFAULTS.copy()
 
@@ -653,6 +756,18 @@ if _cfg:
             # Load snapshot config if present
             if 'snapshots' in _cfg and isinstance(_cfg['snapshots'], dict):
                 snapshot_config.update(_cfg['snapshots'])
+            # Load per-camera sections if present
+            if 'cameras' in _cfg and isinstance(_cfg['cameras'], dict):
+                for _cid, _ccfg in _cfg['cameras'].items():
+                    # ids appear in /cam/<id>/ routes, so keep them URL-safe
+                    if isinstance(_ccfg, dict) and re.fullmatch(r'[A-Za-z0-9_-]+', str(_cid)):
+                        camera_configs[str(_cid)] = dict(_ccfg)
+                    else:
+                        logger.warning('Ignoring invalid camera section %r in config', _cid)
+            if 'stream_profiles' in _cfg and isinstance(_cfg['stream_profiles'], dict):
+                stream_profiles.update({str(k): v for k, v in _cfg['stream_profiles'].items() if isinstance(v, dict)})
+            if 'camera_hints' in _cfg and isinstance(_cfg['camera_hints'], dict):
+                camera_hints.update({str(k): v for k, v in _cfg['camera_hints'].items() if isinstance(v, dict)})
             # read existing device_id if present
             DEVICE_ID = _cfg.get('device_id') if isinstance(_cfg, dict) else None
         # Apply loaded video/stream settings (updates env and camera)
@@ -668,7 +783,7 @@ if not DEVICE_ID:
     DEVICE_ID = uuid.uuid4().hex[:12]
     try:
         with settings_lock:
-            _save_config(CONFIG_PATH, motion_detection_config, device_id=DEVICE_ID)
+            _save_config(CONFIG_PATH, None, device_id=DEVICE_ID)
     except Exception:
         pass
 
@@ -681,16 +796,14 @@ def _get_snapshots_dir() -> str:
     os.makedirs(full_path, exist_ok=True)
     return full_path
 
-# Global camera stream (class imported from helpers.camera)
-camera_stream = CameraStream()
-
-# Ensure camera is released on shutdown
+# Ensure cameras are released on shutdown
 def _on_shutdown():
-    try:
-        if camera_stream and camera_stream.running:
-            camera_stream.stop()
-    except Exception:
-        pass
+    for pipe in list(_pipelines.values()):
+        try:
+            if pipe.camera.running:
+                pipe.camera.stop()
+        except Exception:
+            pass
     # Stop mDNS advertiser if running
     try:
         global _mdns_adv
@@ -705,8 +818,9 @@ atexit.register(_on_shutdown)
 @app.before_request
 def _ensure_camera_started():
     global _startup_logged
-    if not camera_stream.running:
-        camera_stream.start()
+    for pipe in list(_pipelines.values()):
+        if not pipe.camera.running:
+            pipe.camera.start()
     # One-time startup log and mDNS init for Gunicorn/WSGI path (Flask>=3 removed before_first_request)
     if not _startup_logged:
         try:
@@ -752,49 +866,152 @@ def _start_mdns_advertiser():
 
 # ---------- Centralized streaming hubs and background workers ----------
 
-# Raw stream broadcaster (single encode shared by all clients)
-def _produce_raw_jpeg() -> bytes | None:
-    frame = camera_stream.get_frame()
-    if frame is None:
-        # Optional placeholder to make streams testable without a camera
-        if os.environ.get('OPENSENTRY_ALLOW_PLACEHOLDER', '0') in ('1', 'true', 'TRUE'):
-            import numpy as _np
-            f = _np.zeros((480, 640, 3), dtype=_np.uint8)
-            cv2.putText(f, 'NO CAMERA', (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
-            return encode_jpeg_bgr(f, JPEG_QUALITY)
-        return None
-    # Downscale for output if needed
-    H, W = frame.shape[:2]
-    if W > OUTPUT_MAX_WIDTH:
-        scale = OUTPUT_MAX_WIDTH / float(W)
-        frame = cv2.resize(frame, (int(W * scale), int(H * scale)), interpolation=cv2.INTER_AREA)
-    return encode_jpeg_bgr(frame, JPEG_QUALITY)
-
-
-raw_broadcaster = Broadcaster(
-    name='raw',
-    produce_fn=_produce_raw_jpeg,
-    fps_getter=lambda: int(stream_config.get('raw_fps', RAW_TARGET_FPS)),
-)
+# Per-capture products shared by the raw encoders, the motion worker and the
+# overlay encoders through CameraStream.derive(): each is computed at most
+# once per frame and returned as a read-only view living as long as the frame.
+
+def _readonly(arr: np.ndarray) -> np.ndarray:
+    view = arr.view()
+    view.flags.writeable = False
+    return view
+
+
+def _output_bgr(camera: CameraStream, seq: int, max_width: int) -> np.ndarray | None:
+    """BGR pixels of capture seq downscaled to at most max_width."""
+    def make(scratch: ScratchBuffers):
+        frame = camera.frame_at(seq)
+        if frame is None or frame.shape[1] <= max_width:
+            return frame
+        H, W = frame.shape[:2]
+        scale = max_width / float(W)
+        ow, oh = int(W * scale), int(H * scale)
+        return _readonly(cv2.resize(frame, (ow, oh), dst=scratch.get('out', (oh, ow, 3)), interpolation=cv2.INTER_AREA))
+    return camera.derive(seq, ('bgr', max_width), make)
+
+
+def _output_i420(camera: CameraStream, seq: int, max_width: int) -> np.ndarray | None:
+    """Full-range I420 of YUYV capture seq downscaled to at most max_width."""
+    def make(scratch: ScratchBuffers):
+        yuyv = camera.yuyv_at(seq)
+        if yuyv is None:
+            return None
+        H, W = yuyv.shape[:2]
+        scale = min(1.0, max_width / float(W))
+        ow, oh = i420_size(int(W * scale), int(H * scale))
+        return _readonly(yuyv_to_i420(yuyv, ow, oh, scratch))
+    return camera.derive(seq, ('i420', max_width), make)
+
+
+def _analysis_gray(camera: CameraStream, seq: int, scale: float):
+    """Grayscale image at ~scale for motion analysis, plus the full (W, H).
+
+    Passthrough JPEGs are decoded straight to reduced-size luma via DCT
+    scaling; YUYV frames contribute their Y plane as-is; BGR frames start
+    from the output-size copy the streams share whenever that is at least
+    as large, so the full-resolution frame is only resized once.
+    """
+    def make(scratch: ScratchBuffers):
+        jpg = camera.jpeg_at(seq) if camera.passthrough else None
+        if jpg is not None:
+            size = jpeg_dimensions(jpg)
+            gray = decode_jpeg_scaled(jpg, scale, gray=True)
+            if size is not None and gray is not None:
+                tw, th = int(size[0] * scale), int(size[1] * scale)
+                if gray.shape[1] != tw:
+                    gray = cv2.resize(gray, (tw, th), dst=scratch.get('gray', (th, tw)), interpolation=cv2.INTER_AREA)
+                return _readonly(gray), size
+        yuyv = camera.yuyv_at(seq) if camera.yuyv else None
+        if yuyv is not None:
+            H, W = yuyv.shape[:2]
+            sw, sh = int(W * scale), int(H * scale)
+            y = luma(yuyv, scratch)
+            return _readonly(cv2.resize(y, (sw, sh), dst=scratch.get('gray', (sh, sw)), interpolation=cv2.INTER_AREA)), (W, H)
+        frame = camera.frame_at(seq)
+        if frame is None:
+            return None, None
+        H, W = frame.shape[:2]
+        sw, sh = int(W * scale), int(H * scale)
+        if sw <= OUTPUT_MAX_WIDTH:
+            frame = _output_bgr(camera, seq, OUTPUT_MAX_WIDTH)
+            if frame is None:
+                return None, None
+        if frame.shape[1] != sw:
+            frame = cv2.resize(frame, (sw, sh), dst=scratch.get('small', (sh, sw, 3)), interpolation=cv2.INTER_AREA)
+        return _readonly(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=scratch.get('gray', (sh, sw)))), (W, H)
+    return camera.derive(seq, ('gray', scale), make) or (None, None)
+
+
+def _scene_thumb(camera: CameraStream, seq: int) -> np.ndarray | None:
+    """32x18 grayscale thumbnail of capture seq from a sparse sample.
+
+    Shared by the raw encoder's static-scene check and the motion worker's
+    idle wake-up check.
+    """
+    def make(scratch: ScratchBuffers):
+        jpg = camera.jpeg_at(seq) if camera.passthrough else None
+        if jpg is not None:
+            sample = decode_jpeg_scaled(jpg, 0.125, gray=True)
+        elif camera.yuyv:
+            yuyv = camera.yuyv_at(seq)
+            sample = yuyv[::8, ::8, 0] if yuyv is not None else None
+        else:
+            frame = camera.frame_at(seq)
+            sample = frame[::8, ::8] if frame is not None else None
+        if sample is None:
+            return None
+        # Gather the strided view first; OpenCV would copy it into a new array
+        packed = scratch.like('sample', sample)
+        np.copyto(packed, sample)
+        if packed.ndim == 3 and packed.shape[2] == 3:
+            packed = cv2.cvtColor(packed, cv2.COLOR_BGR2GRAY, dst=scratch.get('sample_gray', packed.shape[:2]))
+        elif packed.ndim == 3:
+            packed = packed[:, :, 0]
+        return _readonly(cv2.resize(packed, (32, 18), dst=scratch.get('thumb', (18, 32)), interpolation=cv2.INTER_AREA))
+    return camera.derive(seq, 'thumb', make)
 
 
 class _MotionWorker:
-    def __init__(self):
+    def __init__(self, camera: CameraStream, overrides: dict | None = None, cam_id: str = DEFAULT_CAMERA_ID, cpus: set[int] | None = None, on_output=None, watched=None):
+        self._camera = camera
+        self._on_output = on_output  # on_output(jpeg, seq) for every new overlay frame
+        # watched() -> False: nobody views the overlay stream, so analysis
+        # runs (for snapshots and motion profiles) but nothing is drawn/encoded
+        self._watched = watched
+        self._overrides = overrides or {}
+        self._cam_id = cam_id
+        self._cpus = cpus
         self._th = None
         self._running = False
         self._lock = threading.Lock()
+        self._cv = threading.Condition(self._lock)
         self._latest: bytes | None = None
-        self._prev_small = None
+        self._latest_seq = 0
+        self._result = None  # (seq, W, H, box, status, color) of the latest output
         self._proc_scale = 0.5
-        self._bg_subtractor = None  # MOG2 background subtractor
-        self._mog2_params = None  # Track current MOG2 parameters (var_threshold, history)
+        self._detector: MotionDetector | None = None  # backend picked by motion_detection.detector
+        self._detector_key = None  # (detector params, zone rect) the detector was built for
+        self._zones: ZoneMask | None = None  # include/exclude zones at analysis size
+        self._detector_frames = 0  # frames the current detector has learned from
+        # Adaptive cadence (motion_detection.idle_fps/idle_after/wake_threshold)
+        self._idle = False  # analysing at idle_fps until the wake check or a blob fires
+        self._last_analysis = 0.0  # monotonic time of the last analysed capture
+        self._last_motion = 0.0  # monotonic time of the last motion (or detector rebuild)
+        self._active_dt = 0.0  # EMA of the analysis interval at full rate
+        self._thumb_ref = None  # thumbnail of the last analysed capture
+        self._captures = 0  # captures taken past the fps cap
+        self._analysed = 0  # of those, the ones run through the detector
         self._last_snapshot_time = 0  # Track last automatic snapshot time (epoch seconds)
+        # Overlay encodes run on the shared pool while the next frame is
+        # analysed; each one in flight draws into its own buffer set
+        self._pool = get_encoder_pool()
+        self._overlay_bufs = ScratchRing(self._pool.depth)
+        self._delivery = OrderedDelivery(self._publish, self._pool.depth)
 
     def start(self):
         if self._running:
             return
         self._running = True
-        self._th = threading.Thread(target=self._run, name='MotionWorker', daemon=True)
+        self._th = threading.Thread(target=self._run, name=f'MotionWorker-{self._cam_id}', daemon=True)
         self._th.start()
 
     def stop(self):
@@ -804,8 +1021,31 @@ class _MotionWorker:
         with self._lock:
             return self._latest
 
-    def _maybe_save_snapshot(self, frame, contours, min_area: int):
-        """Save automatic snapshot if conditions are met."""
+    def wait_latest(self, after_seq: int, timeout: float) -> int:
+        """Block until a detection result newer than capture after_seq exists; return its capture seq."""
+        with self._cv:
+            self._cv.wait_for(lambda: self._result is not None and self._result[0] > after_seq, timeout)
+            return self._result[0] if self._result is not None else 0
+
+    def snapshot_jpeg(self, timeout: float = 5.0) -> bytes | None:
+        """Overlay JPEG of the latest result, rendered on demand while the stream is unwatched."""
+        if self._watched is None or self._watched():
+            return self.get_latest()
+        _, job = self.render_latest(ScratchBuffers(), OUTPUT_MAX_WIDTH, JPEG_QUALITY)
+        if job is None:
+            return self.get_latest()
+        try:
+            return job.result(timeout)
+        except Exception:
+            return None
+
+    def _maybe_save_snapshot(self, seq: int, blobs: MotionBlobs, box, status, color):
+        """Save automatic snapshot if conditions are met.
+
+        BGR pixels of capture `seq` are only fetched (decoded or converted in
+        passthrough/YUV mode) once a snapshot is actually due; the overlay is
+        drawn on a private full-resolution copy.
+        """
         import time
 
         # Check if automatic snapshots are enabled
@@ -822,8 +1062,8 @@ class _MotionWorker:
         if current_time - self._last_snapshot_time < cooldown:
             return
 
-        # Calculate total motion area
-        total_motion_area = sum(cv2.contourArea(c) for c in contours if cv2.contourArea(c) >= min_area)
+        # Total area of the blobs that passed min_area (analysis-size pixels)
+        total_motion_area = blobs.area
 
         # Check if motion exceeds threshold
         if total_motion_area < motion_threshold:
@@ -834,124 +1074,704 @@ class _MotionWorker:
             from datetime import datetime
             snapshots_dir = _get_snapshots_dir()
             timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-            filename = f"{timestamp}_motion.jpg"
+            suffix = 'motion' if self._cam_id == DEFAULT_CAMERA_ID else f'{self._cam_id}_motion'
+            filename = f"{timestamp}_{suffix}.jpg"
             filepath = os.path.join(snapshots_dir, filename)
 
-            cv2.imwrite(filepath, frame)
+            frame = self._camera.frame_at(seq)
+            if frame is None:
+                return
+            annotated = frame.copy()
+            x1, y1, x2, y2 = box
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 255, 0), 3)
+            cv2.putText(annotated, status, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+            cv2.imwrite(filepath, annotated)
             self._last_snapshot_time = current_time
             logger.info(f"Automatic snapshot saved: {filename} (motion area: {total_motion_area:.0f}px)")
         except Exception as e:
             logger.error(f"Failed to save automatic snapshot: {e}")
 
     def _run(self):
-        last_send = 0.0
+        pin_current_thread(self._cpus)
+        gate = RateGate()
+        last_seq = 0
         while self._running:
-            frame = camera_stream.get_frame()
-            if frame is None:
-                time.sleep(0.05)
+            seq = self._camera.wait_seq(last_seq, timeout=1.0)
+            if seq == 0 or seq == last_seq:
+                # No frame yet, or no new capture within the timeout
+                if seq == 0:
+                    time.sleep(0.05)
                 continue
+            last_seq = seq
 
-            # FPS cap for processing to avoid CPU spikes
-            now_ts = time.time()
-            target_fps = max(1, int(stream_config.get('raw_fps', RAW_TARGET_FPS)))
-            min_interval = 1.0 / float(target_fps)
-            if (now_ts - last_send) < min_interval:
-                time.sleep(max(0.0, min_interval - (now_ts - last_send)))
-            last_send = time.time()
-
-            # Downscale for motion processing
-            H, W = frame.shape[:2]
-            small = cv2.resize(frame, (int(W * self._proc_scale), int(H * self._proc_scale)), interpolation=cv2.INTER_AREA)
+            # FPS cap for processing to avoid CPU spikes (drops early captures)
+            if not gate.admit(int(stream_config.get('raw_fps', RAW_TARGET_FPS))):
+                continue
 
             # Load settings snapshot
-            cfg = _get_motion_settings_snapshot()
-            var_threshold = int(cfg.get('mog2_var_threshold', 16))
-            history = int(cfg.get('mog2_history', 500))
+            cfg = _get_motion_settings_snapshot(self._overrides)
+            now = time.monotonic()
+            self._captures += 1
+            if self._idle_skip(seq, cfg, now):
+                # Quiet scene: the capture carries the last detection result
+                self._carry_result(seq)
+                continue
+
+            # Downscaled grayscale input for motion processing
+            small, size = _analysis_gray(self._camera, seq, self._proc_scale)
+            if small is None:
+                continue
+            W, H = size
             min_area = int(cfg.get('min_area', 500))
             pad = int(cfg.get('pad', 10))
 
-            # Initialize or reinitialize MOG2 if parameters changed
-            current_params = (var_threshold, history)
-            if self._bg_subtractor is None or self._mog2_params != current_params:
-                self._bg_subtractor = cv2.createBackgroundSubtractorMOG2(
-                    history=history,           # Learn from N frames of history
-                    varThreshold=var_threshold, # Pixel variance threshold (sensitivity)
-                    detectShadows=False         # Disable shadow detection for speed
-                )
-                self._mog2_params = current_params
-                logger.info(f"Initialized MOG2 background subtractor (history={history}, varThreshold={var_threshold})")
-
-            # Apply MOG2 background subtraction (replaces frame differencing)
-            fg_mask = self._bg_subtractor.apply(small)
-
-            # Optional: Light morphological filtering to reduce noise
-            # (much lighter than the old dilation approach)
-            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-            fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, kernel)
-
-            contours, _ = cv2.findContours(fg_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-            motion_detected = False
-            x_min = y_min = x_max = y_max = None
-            for contour in contours:
-                if cv2.contourArea(contour) < min_area:
-                    continue
-                (x, y, w, h) = cv2.boundingRect(contour)
-                if x_min is None:
-                    x_min, y_min, x_max, y_max = x, y, x + w, y + h
-                    motion_detected = True
-                else:
-                    x_min = min(x_min, x)
-                    y_min = min(y_min, y)
-                    x_max = max(x_max, x + w)
-                    y_max = max(y_max, y + h)
-
-            draw_frame = frame
+            # Zones are rasterized again only when they or the analysis size change
+            zones = self._zones
+            if zones is None or zones.key != (repr(cfg['zones']), small.shape[1], small.shape[0]):
+                zones = self._zones = ZoneMask(cfg['zones'], small.shape[1], small.shape[0])
+            zx, zy, zw, zh = zones.rect
+
+            # (Re)build the detector if its parameters or the modelled rect changed
+            key = (detector_params(cfg), zones.rect)
+            if self._detector is None or self._detector_key != key:
+                self._detector = create_detector(cfg)
+                self._detector_key = key
+                self._detector_frames = 0
+                self._idle, self._last_motion = False, now
+                logger.info(f"Initialized {self._detector.name} motion detector {self._detector.params[1:]} for camera {self._cam_id}")
+
+            if zw == 0:
+                # Every pixel is excluded
+                blobs = NO_MOTION
+            else:
+                # Foreground of the watched rect only, without excluded
+                # pixels, specks and blobs < min_area
+                _, blobs = self._detector.detect(small[zy:zy + zh, zx:zx + zw], min_area, zones.mask,
+                                                 self._learning_rate(cfg, now))
+            self._detector_frames += 1
+            motion_detected = bool(blobs)
+            self._analysed_at(seq, cfg, now, motion_detected)
+
+            box = None
             if motion_detected:
-                inv = 1.0 / self._proc_scale
+                x_min, y_min, x_max, y_max = blobs.box
+                x_min, x_max, y_min, y_max = x_min + zx, x_max + zx, y_min + zy, y_max + zy
+                inv = W / float(small.shape[1])
                 x1 = int(max(0, x_min - pad) * inv)
                 y1 = int(max(0, y_min - pad) * inv)
                 x2 = int(min(small.shape[1] - 1, x_max + pad) * inv)
                 y2 = int(min(small.shape[0] - 1, y_max + pad) * inv)
-                cv2.rectangle(draw_frame, (x1, y1), (x2, y2), (0, 255, 0), 3)
+                box = (x1, y1, x2, y2)
             status = "MOTION DETECTED" if motion_detected else "No Motion"
             color = (0, 0, 255) if motion_detected else (0, 255, 0)
-            cv2.putText(draw_frame, status, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
 
             # Automatic snapshot on motion detection
             if motion_detected:
-                self._maybe_save_snapshot(draw_frame, contours, min_area)
+                self._maybe_save_snapshot(seq, blobs, box, status, color)
+
+            self._emit((seq, W, H, box, status, color))
+
+    def _emit(self, result: tuple) -> None:
+        """Publish a detection result and, while the stream is watched, its overlay."""
+        with self._lock:
+            self._result = result
+            self._cv.notify_all()
+        if self._watched is not None and not self._watched():
+            return
+        job = self.render_overlay(*result, self._overlay_bufs.next(), OUTPUT_MAX_WIDTH, egress.quality(JPEG_QUALITY))
+        if job is not None:
+            self._delivery.add(job)
 
-            # Downscale for output if needed and encode
-            H2, W2 = draw_frame.shape[:2]
-            if W2 > OUTPUT_MAX_WIDTH:
-                scale_out = OUTPUT_MAX_WIDTH / float(W2)
-                draw_frame = cv2.resize(draw_frame, (int(W2 * scale_out), int(H2 * scale_out)), interpolation=cv2.INTER_AREA)
+    def _carry_result(self, seq: int) -> None:
+        """Result for an unanalysed capture: the previous detection on the new frame."""
+        with self._lock:
+            prev = self._result
+        if prev is not None:
+            self._emit((seq,) + prev[1:])
 
-            jpg = encode_jpeg_bgr(draw_frame, JPEG_QUALITY)
-            with self._lock:
-                self._latest = jpg
+    def _idle_skip(self, seq: int, cfg: dict, now: float) -> bool:
+        """True if capture seq need not be analysed.
 
+        While idle, one capture per 1/idle_fps is analysed so the model keeps
+        learning; any other capture is analysed only if its thumbnail
+        differs from that of the last analysed capture by more than
+        wake_threshold grey levels, which also ends the idle period.
+        """
+        idle_fps = float(cfg['idle_fps'])
+        if not self._idle or idle_fps <= 0 or now - self._last_analysis >= 1.0 / idle_fps:
+            return False
+        thumb = _scene_thumb(self._camera, seq)
+        ref = self._thumb_ref
+        if thumb is None or ref is None or ref.shape != thumb.shape:
+            return False
+        if int(cv2.absdiff(thumb, ref).max()) > int(cfg['wake_threshold']):
+            self._idle = False
+            return False
+        return True
 
-_motion_worker = _MotionWorker()
+    def _learning_rate(self, cfg: dict, now: float) -> float:
+        """Background learning rate for an analysis after a (possibly idle) gap.
 
-motion_broadcaster = Broadcaster(
-    name='motion',
-    produce_fn=lambda: _motion_worker.get_latest(),
-    fps_getter=lambda: int(stream_config.get('raw_fps', RAW_TARGET_FPS)),
-)
+        At full rate the detector picks its own (about 1/history per frame).
+        After a gap of k full-rate intervals the model is moved as far as k
+        frames would have moved it, 1 - (1 - 1/history)^k, so it adapts in
+        the same wall-clock time at any cadence. Young models keep their own
+        faster start-up rate.
+        """
+        history = max(1, int(cfg.get('mog2_history', 500)))
+        dt = now - self._last_analysis
+        if self._last_analysis and dt < 1.0:
+            if not self._idle and not self._active_dt:
+                self._active_dt = dt
+            elif not self._idle and dt < 2.0 * self._active_dt:
+                self._active_dt += (dt - self._active_dt) * 0.1
+        if not self._active_dt or self._detector_frames < history // 2:
+            return -1
+        k = dt / self._active_dt
+        if k < 1.5:
+            return -1
+        return min(1.0, 1.0 - (1.0 - 1.0 / history) ** k)
+
+    def _analysed_at(self, seq: int, cfg: dict, now: float, motion: bool) -> None:
+        """Update the cadence state after analysing capture seq."""
+        self._analysed += 1
+        self._last_analysis = now
+        if motion:
+            self._last_motion = now
+            self._idle = False
+        elif (float(cfg['idle_fps']) > 0 and now - self._last_motion >= float(cfg['idle_after'])
+              and self._detector_frames >= int(cfg.get('mog2_history', 500)) // 2):
+            # Only once the model has settled; it learns at full rate
+            self._idle = True
+        if float(cfg['idle_fps']) > 0:
+            thumb = _scene_thumb(self._camera, seq)
+            if thumb is not None:
+                if self._thumb_ref is None or self._thumb_ref.shape != thumb.shape:
+                    self._thumb_ref = np.empty_like(thumb)
+                np.copyto(self._thumb_ref, thumb)
+
+    def analysis(self) -> dict:
+        """Cadence state for /status: idle flag, captures taken and how many were analysed."""
+        return {'idle': self._idle, 'captures': self._captures, 'analysed': self._analysed}
+
+    def _publish(self, jpg: bytes) -> None:
+        with self._lock:
+            self._latest = jpg
+            self._latest_seq += 1
+            seq = self._latest_seq
+            self._cv.notify_all()
+        if self._on_output is not None:
+            self._on_output(jpg, seq)
+
+    def render_latest(self, bufs: ScratchBuffers, max_width: int, quality: int, after_seq: int = 0) -> tuple[int, Future | None]:
+        """Redraw the latest detection result at another output size/quality.
+
+        Returns (capture seq, job); job is None if there is no result newer
+        than capture after_seq.
+        """
+        with self._lock:
+            result = self._result
+        if result is None or result[0] <= after_seq:
+            return after_seq, None
+        return result[0], self.render_overlay(*result, bufs, max_width, quality)
+
+    def render_overlay(self, seq: int, W: int, H: int, box, status, color,
+                       bufs: ScratchBuffers, max_width: int, quality: int) -> Future | None:
+        """Draw the overlay for capture seq and submit its JPEG encode.
+
+        bufs belong to the caller and must not be reused until the
+        returned future is done.
+        """
+        jpg = self._encode_overlay_yuv(seq, W, H, box, status, color, bufs, max_width, quality)
+        if jpg is None:
+            jpg = self._encode_overlay_bgr(seq, box, status, color, bufs, max_width, quality)
+        return jpg
+
+    def _encode_overlay_yuv(self, seq: int, W: int, H: int, box, status, color,
+                            bufs: ScratchBuffers, max_width: int, quality: int) -> Future | None:
+        """Overlay drawn on I420 built from the YUYV capture; None if not applicable."""
+        if not (self._camera.yuyv and turbojpeg_enabled()):
+            return None
+        shared = _output_i420(self._camera, seq, max_width)
+        if shared is None:
+            return None
+        scale_out = shared.shape[1] / float(W)
+        i420 = bufs.like('i420', shared)
+        np.copyto(i420, shared)
+        if box is not None:
+            x1, y1, x2, y2 = (int(v * scale_out) for v in box)
+            draw_rect_i420(i420, (x1, y1), (x2, y2), (0, 255, 0), max(1, int(round(3 * scale_out))))
+        put_text_i420(i420, status, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+        return self._pool.submit(encode_jpeg_i420, i420, quality)
+
+    def _encode_overlay_bgr(self, seq: int, box, status, color,
+                            bufs: ScratchBuffers, max_width: int, quality: int) -> Future | None:
+        # Output-size pixels, shared with the raw stream (and decoded or
+        # converted lazily once per frame in passthrough/YUV mode)
+        frame = self._camera.frame_at(seq)
+        shared = _output_bgr(self._camera, seq, max_width)
+        if frame is None or shared is None:
+            return None
 
+        # Shared products are read-only: copy into a reused overlay buffer
+        # and draw there, scaled to output coordinates.
+        scale_out = shared.shape[1] / float(frame.shape[1])
+        draw_frame = bufs.like('draw', shared)
+        np.copyto(draw_frame, shared)
+        if box is not None:
+            x1, y1, x2, y2 = (int(v * scale_out) for v in box)
+            cv2.rectangle(draw_frame, (x1, y1), (x2, y2), (0, 255, 0), max(1, int(round(3 * scale_out))))
+        cv2.putText(draw_frame, status, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+        return self._pool.submit(encode_jpeg_bgr, draw_frame, quality)
+
+
+class _RawEncoder:
+    """Raw-stream JPEG producer for one broadcaster.
+
+    profile is (max_width, quality), or None to follow the live stream
+    settings. Only the owning broadcaster thread calls it, so the scratch
+    buffers need no locking. Encodes go to the shared pool; the image each
+    one reads is private (copied out of the shared per-capture product),
+    since ring slots are recycled while a job may still be queued. The
+    encode itself is a per-capture product too, so profiles that differ
+    only in frame rate share each JPEG.
+
+    Static scenes are not re-encoded: each capture is reduced to a tiny
+    thumbnail from a strided sample and compared with the thumbnail of the
+    last encoded frame (see STATIC_THRESHOLD). Gradual drift accumulates
+    against that reference, so slow lighting changes still get encoded.
+    """
 
-_hubs_started = False
+    def __init__(self, camera: CameraStream, profile: tuple[int, int] | None = None):
+        self.camera = camera
+        self.profile = profile
+        self._last_seq = 0
+        self._pool = get_encoder_pool()
+        self._bufs = ScratchRing(self._pool.depth)
+        self._placeholder_jpeg: tuple[int, bytes] | None = None  # (quality, jpeg)
+        self._thumbs = ScratchBuffers()  # 'ref'/'diff' static-scene thumbnails
+        self._ref_key = None  # (shape, max_width, quality) the reference was encoded with
+        self._last_job: bytes | Future | None = None
+        self._last_sent = 0.0
+
+    def _static(self, seq: int, key) -> bool:
+        """True if capture `seq` matches the last encoded frame; else it becomes the reference."""
+        threshold = int(stream_config.get('static_threshold', STATIC_THRESHOLD))
+        cur = _scene_thumb(self.camera, seq)
+        if cur is None:
+            self._ref_key = None
+            return False
+        ref = self._thumbs.get('ref', cur.shape)
+        if threshold > 0 and key == self._ref_key and self._last_job is not None:
+            if int(cv2.absdiff(cur, ref, dst=self._thumbs.get('diff', cur.shape)).max()) <= threshold:
+                return True
+        np.copyto(ref, cur)
+        self._ref_key = key
+        return False
 
-def _ensure_hubs_started():
-    global _hubs_started
-    if _hubs_started:
+    def _keepalive(self) -> bytes | None:
+        """The previous JPEG again, at most STATIC_FPS times per second."""
+        now = time.time()
+        static_fps = float(stream_config.get('static_fps', STATIC_FPS))
+        if static_fps <= 0 or now - self._last_sent < 1.0 / static_fps:
+            return None
+        job = self._last_job
+        if isinstance(job, Future):
+            if not job.done() or job.exception() is not None:
+                return None
+            job = job.result()
+        if job is not None:
+            self._last_sent = now
+        return job
+
+    def _sent(self, job: bytes | Future) -> bytes | Future:
+        self._last_job = job
+        self._last_sent = time.time()
+        return job
+
+    def __call__(self) -> bytes | Future | None:
+        camera = self.camera
+        max_width, quality = self.profile or (OUTPUT_MAX_WIDTH, JPEG_QUALITY)
+        quality = egress.quality(quality)
+        # MJPEG passthrough: serve the device's own JPEG when no downscale is
+        # needed and the profile does not ask for a lower quality than default
+        size = camera.frame_size
+        if camera.passthrough and size is not None and size[0] <= max_width and quality >= JPEG_QUALITY:
+            seq, jpg = camera.get_jpeg(self._last_seq)
+            if jpg is not None:
+                self._last_seq = seq
+                return jpg
+            if seq == self._last_seq:
+                return None
+        # YUV capture: repack the YUYV buffer to I420 for TurboJPEG, no BGR
+        if camera.yuyv and turbojpeg_enabled():
+            seq = camera.seq
+            if seq != 0 and seq == self._last_seq:
+                return None
+            yuyv = camera.yuyv_at(seq)
+            if yuyv is not None:
+                self._last_seq = seq
+                if self._static(seq, (yuyv.shape, max_width, quality)):
+                    return self._keepalive()
+                job = camera.derive(seq, ('jpeg-i420', max_width, quality),
+                                    lambda _: self._submit(encode_jpeg_i420, _output_i420(camera, seq, max_width), quality))
+                if job is not None:
+                    return self._sent(job)
+        seq, frame = camera.get_frame_seq()
+        if frame is not None:
+            if seq == self._last_seq:
+                # Already encoded this capture
+                return None
+            self._last_seq = seq
+        if frame is None:
+            # Optional placeholder to make streams testable without a camera
+            if os.environ.get('OPENSENTRY_ALLOW_PLACEHOLDER', '0') in ('1', 'true', 'TRUE'):
+                if self._placeholder_jpeg is None or self._placeholder_jpeg[0] != quality:
+                    f = np.zeros((480, 640, 3), dtype=np.uint8)
+                    cv2.putText(f, 'NO CAMERA', (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
+                    self._placeholder_jpeg = (quality, encode_jpeg_bgr(f, quality))
+                return self._placeholder_jpeg[1]
+            return None
+        if self._static(seq, (frame.shape, max_width, quality)):
+            return self._keepalive()
+        job = camera.derive(seq, ('jpeg', max_width, quality),
+                            lambda _: self._submit(encode_jpeg_bgr, _output_bgr(camera, seq, max_width), quality))
+        return self._sent(job) if job is not None else None
+
+    def _submit(self, encode, image: np.ndarray | None, quality: int) -> Future | None:
+        """Encode a private copy of a shared output-size image on the pool."""
+        if image is None:
+            return None
+        out = self._bufs.next().like('out', image)
+        np.copyto(out, image)
+        return self._pool.submit(encode, out, quality)
+
+
+class _OverlayEncoder:
+    """Motion-overlay producer for a non-default profile (max_width, quality).
+
+    Redraws the worker's latest result on its capture at the profile's size,
+    so detection still runs once per camera. Each result is rendered once.
+    """
+
+    def __init__(self, worker: _MotionWorker, profile: tuple[int, int]):
+        self.worker = worker
+        self.profile = profile
+        self._bufs = ScratchRing(get_encoder_pool().depth)
+        self._last_seq = 0
+
+    def __call__(self) -> Future | None:
+        max_width, quality = self.profile
+        self._last_seq, job = self.worker.render_latest(self._bufs.next(), max_width, egress.quality(quality), self._last_seq)
+        return job
+
+
+class _CameraPipeline:
+    """Capture, motion analysis and the stream broadcasters for one camera."""
+
+    def __init__(self, cam_id: str, name: str, camera: CameraStream, motion_overrides: dict | None = None, cpus: set[int] | None = None):
+        self.id = cam_id
+        self.name = name
+        self.camera = camera
+        self.cpus = cpus
+        # Default-profile broadcasters (single encode shared by all clients),
+        # following the live stream settings. The motion worker pushes each
+        # new overlay frame into its broadcaster; nothing polls it.
+        self.raw_broadcaster = Broadcaster(
+            name=f'raw-{cam_id}',
+            produce_fn=_RawEncoder(camera),
+            fps_getter=lambda: egress.fps(int(stream_config.get('raw_fps', RAW_TARGET_FPS))),
+            wait_fn=camera.wait_seq,
+            cpus=cpus,
+            depth=get_encoder_pool().depth,
+            meter=egress,
+            idle_grace=STREAM_IDLE_GRACE_S,
+        )
+        self.motion_broadcaster = Broadcaster(
+            name=f'motion-{cam_id}',
+            produce_fn=None,
+            fps_getter=lambda: egress.fps(int(stream_config.get('raw_fps', RAW_TARGET_FPS))),
+            meter=egress,
+            idle_grace=STREAM_IDLE_GRACE_S,
+        )
+        self.motion_worker = _MotionWorker(camera, motion_overrides, cam_id, cpus,
+                                           on_output=self.motion_broadcaster.push,
+                                           watched=self.motion_broadcaster.watched)
+        # Other (max_width, fps, quality) profiles, created per request
+        self.profiles = {
+            'raw': StreamProfiles(self._raw_profile, MAX_STREAM_PROFILES),
+            'motion': StreamProfiles(self._motion_profile, MAX_STREAM_PROFILES),
+        }
+        self._hubs_started = False
+
+    def _raw_profile(self, profile: tuple[int, int, int]) -> Broadcaster:
+        w, fps, q = profile
+        return Broadcaster(
+            name=f'raw-{self.id}-{w}w{fps}fps-q{q}',
+            produce_fn=_RawEncoder(self.camera, (w, q)),
+            fps_getter=lambda: egress.fps(fps),
+            wait_fn=self.camera.wait_seq,
+            cpus=self.cpus,
+            depth=get_encoder_pool().depth,
+            meter=egress,
+        )
+
+    def _motion_profile(self, profile: tuple[int, int, int]) -> Broadcaster:
+        w, fps, q = profile
+        return Broadcaster(
+            name=f'motion-{self.id}-{w}w{fps}fps-q{q}',
+            produce_fn=_OverlayEncoder(self.motion_worker, (w, q)),
+            fps_getter=lambda: egress.fps(fps),
+            wait_fn=self.motion_worker.wait_latest,
+            cpus=self.cpus,
+            depth=get_encoder_pool().depth,
+            meter=egress,
+        )
+
+    def stream(self, kind: str, profile: tuple[int, int, int] | None, client: dict | None = None, abort=None):
+        """Multipart stream for kind 'raw'/'motion'; None if the profile limit is reached."""
+        if profile is None:
+            default = self.raw_broadcaster if kind == 'raw' else self.motion_broadcaster
+            return default.multipart_stream(client, abort)
+        return self.profiles[kind].subscribe(profile, client, abort)
+
+    def open_stream(self, kind: str, profile: tuple[int, int, int] | None):
+        """(broadcaster, release) for kind/profile; None if the profile limit is reached."""
+        if profile is None:
+            return (self.raw_broadcaster if kind == 'raw' else self.motion_broadcaster), _no_release
+        return self.profiles[kind].open(profile)
+
+    def active_profiles(self) -> list[dict]:
+        return [
+            {'kind': kind, 'w': w, 'fps': fps, 'q': q, 'subscribers': n}
+            for kind, registry in self.profiles.items()
+            for (w, fps, q), n in registry.active()
+        ]
+
+    def ensure_hubs_started(self) -> None:
+        if self._hubs_started:
+            return
+        self.raw_broadcaster.start()
+        self.motion_broadcaster.start()
+        self.motion_worker.start()
+        self._hubs_started = True
+
+    def route_ok(self) -> bool:
+        return bool(self.camera.running and self.camera.seq != 0)
+
+
+def _no_release() -> None:
+    pass
+
+
+class _BusCamera:
+    """Stand-in for CameraStream in a web worker: state published by the capture daemon."""
+
+    video = None
+
+    def __init__(self, meta: BusMeta, cam_id: str):
+        self._meta = meta
+        self._cam_id = cam_id
+
+    def _state(self) -> dict:
+        return (self._meta.get().get('cameras') or {}).get(self._cam_id) or {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._state().get('running'))
+
+    @property
+    def seq(self) -> int:
+        return int(self._state().get('seq') or 0)
+
+    def health(self) -> dict:
+        return self._state().get('health') or {'state': 'no capture daemon'}
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def request_reopen(self) -> None:
+        # The daemon picks up saved video settings from config.json
+        pass
+
+
+class _BusSnapshots:
+    """Stand-in for _MotionWorker in a web worker; serves /api/snapshot from the bus."""
+
+    def __init__(self, broadcaster: Broadcaster, camera: _BusCamera):
+        self._broadcaster = broadcaster
+        self._camera = camera
+
+    def analysis(self) -> dict:
+        return self._camera._state().get('analysis') or {}
+
+    def snapshot_jpeg(self, timeout: float = 5.0) -> bytes | None:
+        # Watching the stream makes the daemon render overlays into the bus;
+        # take the next one, or the last one seen if none arrives in time
+        b = self._broadcaster
+        b.acquire()
+        try:
+            seq, jpg = b.wait_frame(-1, 0)
+            return b.wait_frame(seq, timeout)[1] or jpg
+        finally:
+            b.release()
+
+
+class _BusPipeline:
+    """A camera whose capture, analysis and encoding run in the capture daemon.
+
+    The default raw/motion streams are push-mode broadcasters fed from the
+    frame bus while this worker has viewers. Stream profiles are not
+    available here, since they would need encoding in the web worker.
+    """
+
+    def __init__(self, cam_id: str, name: str, meta: BusMeta):
+        self.id = cam_id
+        self.name = name
+        self.camera = _BusCamera(meta, cam_id)
+        self.profiles: dict = {}  # no profile registries; stream() refuses profiles
+        # egress is a BusEgress here: it counts what this worker sends and
+        # applies the fps factor the capture daemon set for all workers
+        self.raw_broadcaster = Broadcaster(name=f'raw-{cam_id}', produce_fn=None,
+                                           fps_getter=lambda: egress.fps(int(stream_config.get('raw_fps', RAW_TARGET_FPS))),
+                                           meter=egress, idle_grace=STREAM_IDLE_GRACE_S)
+        self.motion_broadcaster = Broadcaster(name=f'motion-{cam_id}', produce_fn=None,
+                                              fps_getter=lambda: egress.fps(int(stream_config.get('raw_fps', RAW_TARGET_FPS))),
+                                              meter=egress, idle_grace=STREAM_IDLE_GRACE_S)
+        self.motion_worker = _BusSnapshots(self.motion_broadcaster, self.camera)
+        self._readers: list[BusReader] = []
+
+    def stream(self, kind: str, profile: tuple[int, int, int] | None, client: dict | None = None, abort=None):
+        if profile is not None:
+            return None
+        default = self.raw_broadcaster if kind == 'raw' else self.motion_broadcaster
+        return default.multipart_stream(client, abort)
+
+    def open_stream(self, kind: str, profile: tuple[int, int, int] | None):
+        if profile is not None:
+            return None
+        return (self.raw_broadcaster if kind == 'raw' else self.motion_broadcaster), _no_release
+
+    def active_profiles(self) -> list[dict]:
+        return []
+
+    def ensure_hubs_started(self) -> None:
+        if self._readers:
+            return
+        for kind, b in (('raw', self.raw_broadcaster), ('motion', self.motion_broadcaster)):
+            b.start()
+            self._readers.append(BusReader(channel_name(FRAME_BUS, self.id, kind), b))
+
+    def route_ok(self) -> bool:
+        return bool(self.camera.running and self.camera.seq != 0)
+
+
+def _cpu_sets(count: int) -> list[set[int] | None]:
+    """Split available CPUs into one disjoint set per camera pipeline.
+
+    Only used with several cameras; OPENSENTRY_PIN_CPUS=0 disables pinning.
+    """
+    if count <= 1 or os.environ.get('OPENSENTRY_PIN_CPUS', '1') in ('0', 'false', 'FALSE'):
+        return [None] * count
+    try:
+        cpus = sorted(os.sched_getaffinity(0))
+    except Exception:
+        return [None] * count
+    if len(cpus) < count:
+        # Not enough cores for disjoint sets; let the scheduler balance
+        return [None] * count
+    per = len(cpus) // count
+    return [{cpus[(i * per + k) % len(cpus)] for k in range(per)} for i in range(count)]
+
+
+def _camera_hint_saver(cam_id: str):
+    """Persist the device a camera opened on so the next start tries it first."""
+    def _save(hint: dict) -> None:
+        with settings_lock:
+            camera_hints[cam_id] = hint
+            _save_config(CONFIG_PATH, None, camera_hints={cam_id: hint})
+    return _save
+
+
+def _kick_client(client_id: str) -> bool:
+    """Disconnect a stream client of this process; False if it has none by that id."""
+    sub = subscribers.get(client_id)
+    if sub is None:
+        return False
+    sub.kick('admin')
+    return True
+
+
+# Web process on the frame bus: shares its clients and egress with the others
+_bus_peer: BusPeer | None = None
+
+
+def _build_pipelines() -> None:
+    """Create one pipeline per configured camera (or a single default one)."""
+    global egress, _bus_peer
+    if FRAME_BUS and not CAPTURE_DAEMON:
+        meta = BusMeta(channel_name(FRAME_BUS, 'all', 'meta'))
+        # The capture daemon meters all web processes against the budget
+        egress = BusEgress(lambda: meta.get().get('egress') or {})
+        # Client ids carry the pid so any worker can route a kick to the owner
+        subscribers.prefix = f'{os.getpid()}-'
+        _bus_peer = BusPeer(channel_name(FRAME_BUS, 'all', 'peers'), egress, subscribers.list, _kick_client)
+        for cam_id, ccfg in (list(camera_configs.items()) or [(DEFAULT_CAMERA_ID, {})]):
+            name = DEVICE_NAME if not camera_configs else str(ccfg.get('name') or f'{DEVICE_NAME} {cam_id}')
+            _pipelines[cam_id] = _BusPipeline(cam_id, name, meta)
         return
-    raw_broadcaster.start()
-    _motion_worker.start()
-    motion_broadcaster.start()
-    _hubs_started = True
+    if not camera_configs:
+        cam = CameraStream(
+            hint=camera_hints.get(DEFAULT_CAMERA_ID),
+            on_open=_camera_hint_saver(DEFAULT_CAMERA_ID),
+        )
+        _pipelines[DEFAULT_CAMERA_ID] = _CameraPipeline(DEFAULT_CAMERA_ID, DEVICE_NAME, cam)
+        return
+    claimed = tuple(str(c.get('device')) for c in camera_configs.values() if c.get('device') not in (None, ''))
+    for (cam_id, ccfg), cpus in zip(camera_configs.items(), _cpu_sets(len(camera_configs))):
+        video = _camera_video_settings(cam_id)
+        cam = CameraStream(
+            fps=int(video.get('fps', 0) or 30),
+            device=ccfg.get('device') if ccfg.get('device') not in (None, '') else None,
+            video=video,
+            exclude=claimed,
+            name=cam_id,
+            cpus=cpus,
+            hint=camera_hints.get(cam_id),
+            on_open=_camera_hint_saver(cam_id),
+            source=ccfg.get('source') or None,
+        )
+        name = str(ccfg.get('name') or f'{DEVICE_NAME} {cam_id}')
+        _pipelines[cam_id] = _CameraPipeline(cam_id, name, cam, ccfg.get('motion_detection'), cpus)
+        if cpus:
+            logger.info('Camera %s pinned to CPUs %s', cam_id, sorted(cpus))
+
+
+_build_pipelines()
+
+# Default pipeline serves the legacy single-camera routes
+_default_pipeline = next(iter(_pipelines.values()))
+camera_stream = _default_pipeline.camera
+_motion_worker = _default_pipeline.motion_worker
+raw_broadcaster = _default_pipeline.raw_broadcaster
+motion_broadcaster = _default_pipeline.motion_broadcaster
+
+
+def _get_pipeline(cam_id: str):
+    pipe = _pipelines.get(cam_id)
+    if pipe is None:
+        abort(404)
+    return pipe
+
+
+def _ensure_hubs_started():
+    for pipe in list(_pipelines.values()):
+        pipe.ensure_hubs_started()
+    if _bus_peer is not None:
+        _bus_peer.start()
 
 @app.after_request
 def _add_observability_headers(resp):
@@ -989,16 +1809,25 @@ def generate_frames():
     return raw_broadcaster.multipart_stream()
 
 
-def _get_motion_settings_snapshot():
+def _get_motion_settings_snapshot(overrides: dict | None = None):
     with settings_lock:
+        cfg = {**motion_detection_config, **(overrides or {})}
+        detector = str(cfg.get('detector') or 'mog2').lower()
         return {
-            'threshold': int(motion_detection_config.get('threshold', 25)),
-            'kernel': int(motion_detection_config.get('kernel', 15)),
-            'iterations': int(motion_detection_config.get('iterations', 2)),
-            'min_area': int(motion_detection_config.get('min_area', 500)),
-            'pad': int(motion_detection_config.get('pad', 10)),
-            'mog2_var_threshold': int(motion_detection_config.get('mog2_var_threshold', 16)),
-            'mog2_history': int(motion_detection_config.get('mog2_history', 500)),
+            'threshold': int(cfg.get('threshold', 25)),
+            'kernel': int(cfg.get('kernel', 15)),
+            'iterations': int(cfg.get('iterations', 2)),
+            'min_area': int(cfg.get('min_area', 500)),
+            'pad': int(cfg.get('pad', 10)),
+            'mog2_var_threshold': int(cfg.get('mog2_var_threshold', 16)),
+            'mog2_history': int(cfg.get('mog2_history', 500)),
+            'knn_dist2_threshold': float(cfg.get('knn_dist2_threshold', 400)),
+            # An unknown name (hand-edited config) falls back to the default
+            'detector': detector if detector in DETECTORS else 'mog2',
+            'idle_fps': max(0.0, float(cfg.get('idle_fps', 2))),
+            'idle_after': max(0.0, float(cfg.get('idle_after', 10))),
+            'wake_threshold': max(0, int(cfg.get('wake_threshold', 10))),
+            'zones': normalize_zones(cfg.get('zones')),
         }
 
 
@@ -1014,7 +1843,18 @@ def generate_frames_with_detection():
 @app.route('/')
 def index():
     """Root endpoint - renders the index page via helper."""
-    return render_index_page()
+    cameras = [(cam_id, pipe.name) for cam_id, pipe in _pipelines.items()] if camera_configs else None
+    return render_index_page(cameras, _stream_base())
+
+
+def _stream_base() -> str:
+    """Origin of the asyncio stream server for this request's host, or '' if it is off."""
+    if not STREAM_PORT or not (FRAME_BUS or _stream_server_started):
+        return ''
+    host = request.host
+    if re.search(r':\d+$', host):
+        host = host.rsplit(':', 1)[0]
+    return f'//{host}:{STREAM_PORT}'
 
 @app.route('/settings', methods=['GET', 'POST'])
 def settings():
@@ -1024,8 +1864,11 @@ def settings():
         action = request.form.get('action')
         if action == 'reset_motion':
             with settings_lock:
+                # Zones describe the scene, not sensitivity: keep them
+                zones = motion_detection_config.get('zones', [])
                 motion_detection_config.clear()
                 motion_detection_config.update(MOTION_DEFAULTS)
+                motion_detection_config['zones'] = zones
             try:
                 _save_config(CONFIG_PATH, motion_detection_config)
             except Exception:
@@ -1075,7 +1918,7 @@ def settings():
                 # Persist config to disk
                 try:
                     logger.info(f"Saving auth config to disk: {auth_config}")
-                    _save_config(CONFIG_PATH, motion_detection_config, auth_config=auth_config)
+                    _save_config(CONFIG_PATH, None, auth_config=auth_config)
                     logger.info("Auth config saved successfully")
                 except Exception as e:
                     logger.error(f"Failed to save auth config: {e}")
@@ -1095,6 +1938,13 @@ def settings():
         pd_in = _to_int(request.form.get('md_pad', ''), motion_detection_config['pad'])
         mog2_var_in = _to_int(request.form.get('mog2_var_threshold', ''), motion_detection_config.get('mog2_var_threshold', 16))
         mog2_hist_in = _to_int(request.form.get('mog2_history', ''), motion_detection_config.get('mog2_history', 500))
+        detector_in = (request.form.get('md_detector') or '').strip().lower()
+        zones_in = None
+        if 'md_zones' in request.form:
+            try:
+                zones_in = parse_zones(request.form.get('md_zones', ''))
+            except ValueError as e:
+                logger.warning(f"Ignoring motion zones: {e}")
 
         # Clamp to sane ranges
         ma_in = max(0, ma_in)
@@ -1108,6 +1958,10 @@ def settings():
             motion_detection_config['pad'] = pd_in
             motion_detection_config['mog2_var_threshold'] = mog2_var_in
             motion_detection_config['mog2_history'] = mog2_hist_in
+            if zones_in is not None:
+                motion_detection_config['zones'] = zones_in
+            if detector_in in DETECTORS:
+                motion_detection_config['detector'] = detector_in
             # Camera & Stream settings from form
             def _to_int2(val, default):
                 try:
@@ -1118,9 +1972,12 @@ def settings():
             cam_height_in = request.form.get('cam_height')
             cam_fps_in = request.form.get('cam_fps')
             cam_mjpeg_in = 'cam_mjpeg' in request.form
+            cam_passthrough_in = 'cam_passthrough' in request.form
+            cam_yuv_in = 'cam_yuv' in request.form
             stream_jpeg_q_in = request.form.get('stream_jpeg_quality')
             stream_max_w_in = request.form.get('stream_max_width')
             stream_raw_fps_in = request.form.get('stream_raw_fps')
+            stream_egress_in = request.form.get('stream_egress_budget')
             if cam_width_in is not None and cam_width_in != '':
                 video_config['width'] = max(0, _to_int2(cam_width_in, video_config.get('width', 0)))
             if cam_height_in is not None and cam_height_in != '':
@@ -1128,12 +1985,16 @@ def settings():
             if cam_fps_in is not None and cam_fps_in != '':
                 video_config['fps'] = max(1, _to_int2(cam_fps_in, video_config.get('fps', 15)))
             video_config['mjpeg'] = bool(cam_mjpeg_in)
+            video_config['passthrough'] = bool(cam_passthrough_in)
+            video_config['yuv'] = bool(cam_yuv_in)
             if stream_jpeg_q_in is not None and stream_jpeg_q_in != '':
                 stream_config['jpeg_quality'] = max(30, min(95, _to_int2(stream_jpeg_q_in, stream_config.get('jpeg_quality', JPEG_QUALITY))))
             if stream_max_w_in is not None and stream_max_w_in != '':
                 stream_config['max_width'] = max(320, _to_int2(stream_max_w_in, stream_config.get('max_width', OUTPUT_MAX_WIDTH)))
             if stream_raw_fps_in is not None and stream_raw_fps_in != '':
                 stream_config['raw_fps'] = max(1, _to_int2(stream_raw_fps_in, stream_config.get('raw_fps', RAW_TARGET_FPS)))
+            if stream_egress_in is not None and stream_egress_in != '':
+                stream_config['egress_budget_kbps'] = max(0, _to_int2(stream_egress_in, stream_config.get('egress_budget_kbps', 0)))
 
             # Snapshot settings from form
             snapshot_enabled_in = 'snapshot_enabled' in request.form
@@ -1162,6 +2023,8 @@ def settings():
         m_pad = motion_detection_config['pad']
         mog2_var_threshold = motion_detection_config.get('mog2_var_threshold', 16)
         mog2_history = motion_detection_config.get('mog2_history', 500)
+        m_zones = format_zones(motion_detection_config.get('zones', []))
+        m_detector = str(motion_detection_config.get('detector') or 'mog2')
         # Snapshot config
         snapshot_enabled = snapshot_config.get('enabled', False)
         snapshot_cooldown = snapshot_config.get('cooldown', 15)
@@ -1169,7 +2032,7 @@ def settings():
         snapshot_directory = snapshot_config.get('directory', 'snapshots')
 
     # Snapshot simple route health/status
-    has_frame = (camera_stream.get_frame() is not None)
+    has_frame = (camera_stream.seq != 0)
     raw_ok = camera_stream.running and has_frame
     motion_ok = raw_ok  # motion depends on camera frames
 
@@ -1178,6 +2041,8 @@ def settings():
         m_pad=m_pad,
         mog2_var_threshold=mog2_var_threshold,
         mog2_history=mog2_history,
+        m_zones=m_zones,
+        m_detector=m_detector,
         raw_ok=raw_ok,
         motion_ok=motion_ok,
         device_id=str(DEVICE_ID or ''),
@@ -1193,9 +2058,12 @@ def settings():
         cam_height=int(video_config.get('height', 0)),
         cam_fps=int(video_config.get('fps', 15)),
         cam_mjpeg=bool(video_config.get('mjpeg', True)),
+        cam_passthrough=bool(video_config.get('passthrough', False)),
+        cam_yuv=bool(video_config.get('yuv', False)),
         out_max_width=int(stream_config.get('max_width', OUTPUT_MAX_WIDTH)),
         jpeg_quality=int(stream_config.get('jpeg_quality', JPEG_QUALITY)),
         raw_fps=int(stream_config.get('raw_fps', RAW_TARGET_FPS)),
+        egress_budget_kbps=int(stream_config.get('egress_budget_kbps', 0) or 0),
         snapshot_enabled=snapshot_enabled,
         snapshot_cooldown=snapshot_cooldown,
         snapshot_motion_threshold=snapshot_motion_threshold,
@@ -1219,10 +2087,27 @@ def api_oauth2_test():
         })
     return jsonify({"ok": False, "error": info}), 502
 
+@app.route('/api/clients')
+def api_clients():
+    """Connected stream clients with delivery, drop and write-latency stats (of every web worker on the frame bus)."""
+    return jsonify({'clients': _bus_peer.clients() if _bus_peer is not None else subscribers.list()})
+
+@app.route('/api/clients/<client_id>', methods=['DELETE'])
+def api_clients_disconnect(client_id):
+    """Disconnect one stream client (its socket is shut down, or it stops before its next frame)."""
+    kicked = _bus_peer.kick(client_id) if _bus_peer is not None else _kick_client(client_id)
+    if kicked is None:
+        return ({'error': 'the worker serving this client did not respond'}, 504)
+    if not kicked:
+        return ({'error': 'not found'}, 404)
+    return ({'ok': True, 'id': client_id}, 200)
+
 @app.route('/api/snapshot')
 def api_snapshot():
-    """Capture a snapshot of the current motion detection frame."""
-    frame_data = _motion_worker.get_latest()
+    """Capture a snapshot of the current motion detection frame (?cam=<id> for other cameras)."""
+    cam_id = request.args.get('cam')
+    worker = _get_pipeline(cam_id).motion_worker if cam_id else _motion_worker
+    frame_data = worker.snapshot_jpeg()
     if frame_data is None:
         return jsonify({"error": "No frame available"}), 503
 
@@ -1234,34 +2119,241 @@ def api_snapshot():
     resp.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
     return resp
 
-@app.route('/video_feed')
-def video_feed():
-    """Video streaming route - raw feed with no processing"""
-    resp = Response(generate_frames(),
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
+def _requested_profile() -> tuple[int, int, int] | None:
+    """Output profile (max_width, fps, quality) from ?profile=/w=/fps=/q=.
+
+    None means the default stream settings. Values are clamped like the
+    settings form and widths snap to a multiple of 16, which keeps the
+    number of distinct encoders small; a profile equal to the current
+    defaults shares the default broadcaster.
+    """
+    args = request.args
+    base: dict = {}
+    name = args.get('profile')
+    if name:
+        base = stream_profiles.get(name)
+        if base is None:
+            abort(404)
+    if not base and not any(k in args for k in ('w', 'fps', 'q')):
+        return None
+    default_fps = int(stream_config.get('raw_fps', RAW_TARGET_FPS))
+
+    def _arg(key: str, default: int) -> int:
+        try:
+            return int(args.get(key, base.get(key, default)))
+        except (TypeError, ValueError):
+            abort(400)
+
+    w = max(160, min(3840, _arg('w', OUTPUT_MAX_WIDTH)))
+    w -= w % 16
+    fps = max(1, min(60, _arg('fps', default_fps)))
+    q = max(30, min(95, _arg('q', JPEG_QUALITY)))
+    if (w, fps, q) == (OUTPUT_MAX_WIDTH, default_fps, JPEG_QUALITY):
+        return None
+    return w, fps, q
+
+
+def _connection_aborter():
+    """Callable that force-closes this request's client socket, if the server exposes it.
+
+    Lets a kicked stream client release its server thread even while a
+    write to it is blocked (gunicorn and the Werkzeug dev server both
+    publish the socket in the WSGI environ).
+    """
+    sock = request.environ.get('gunicorn.socket') or request.environ.get('werkzeug.socket')
+    if sock is None:
+        return None
+
+    def _abort():
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    return _abort
+
+
+def _stream_client() -> dict:
+    """Descriptive fields of the current stream request for /api/clients."""
+    return {
+        'remote': request.headers.get('X-Forwarded-For', request.remote_addr or '').split(',')[0].strip(),
+        'agent': request.headers.get('User-Agent', '')[:120],
+        'path': request.full_path.rstrip('?'),
+    }
+
+
+def _stream_response(pipe, kind: str):
+    client = _stream_client()
+    profile = _requested_profile()
+    if profile is not None and isinstance(pipe, _BusPipeline):
+        return ({'error': 'stream profiles are not served by web workers on the frame bus'}, 501)
+    stream = pipe.stream(kind, profile, client, _connection_aborter())
+    if stream is None:
+        return ({'error': 'too many stream profiles in use'}, 503)
+    resp = Response(stream, mimetype='multipart/x-mixed-replace; boundary=frame')
     resp.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0, no-transform'
     resp.headers['Pragma'] = 'no-cache'
     resp.headers['Expires'] = '0'
     resp.headers['X-Accel-Buffering'] = 'no'
     return resp
 
+
+@app.route('/video_feed')
+def video_feed():
+    """Video streaming route - raw feed with no processing (?w=&fps=&q= or ?profile=)"""
+    return _stream_response(_default_pipeline, 'raw')
+
 @app.route('/video_feed_motion')
 def video_feed_motion():
     """Video streaming route - motion detection overlay (alias)"""
-    resp = Response(generate_frames_with_detection(),
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
-    resp.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0, no-transform'
-    resp.headers['Pragma'] = 'no-cache'
-    resp.headers['Expires'] = '0'
-    resp.headers['X-Accel-Buffering'] = 'no'
-    return resp
+    return _stream_response(_default_pipeline, 'motion')
+
+
+@app.route('/cam/<cam_id>/video_feed')
+def cam_video_feed(cam_id):
+    """Raw feed for one camera of a multi-camera device"""
+    return _stream_response(_get_pipeline(cam_id), 'raw')
+
+@app.route('/cam/<cam_id>/video_feed_motion')
+def cam_video_feed_motion(cam_id):
+    """Motion overlay feed for one camera of a multi-camera device"""
+    return _stream_response(_get_pipeline(cam_id), 'motion')
+
+
+_STREAM_ENDPOINTS = ('video_feed', 'video_feed_motion', 'cam_video_feed', 'cam_video_feed_motion')
+
+
+def _resolve_stream(method: str, target: str, headers: list, peer: str):
+    """StreamServer resolver: the Flask routing and auth rules for a stream request.
+
+    Runs the request through a Flask request context, so session cookies,
+    the login check and ?profile/w/fps/q parsing behave exactly as on the
+    Flask stream routes.
+    """
+    with app.test_request_context(target, method=method, headers=headers, environ_base={'REMOTE_ADDR': peer}):
+        if request.endpoint not in _STREAM_ENDPOINTS:
+            raise StreamError(404, 'not found')
+        if not _auth_allowed():
+            raise StreamError(401, 'login required')
+        cam_id = (request.view_args or {}).get('cam_id')
+        pipe = _pipelines.get(cam_id) if cam_id else _default_pipeline
+        if pipe is None:
+            raise StreamError(404, 'unknown camera')
+        kind = 'motion' if request.endpoint.endswith('motion') else 'raw'
+        try:
+            profile = _requested_profile()
+        except HTTPException as e:
+            raise StreamError(e.code or 400, e.name)
+        if profile is not None and isinstance(pipe, _BusPipeline):
+            raise StreamError(501, 'stream profiles are not served by web workers on the frame bus')
+        opened = pipe.open_stream(kind, profile)
+        if opened is None:
+            raise StreamError(503, 'too many stream profiles in use')
+        return opened[0], opened[1], _stream_client()
+
+
+def _stream_server() -> StreamServer:
+    return StreamServer(_resolve_stream, port=STREAM_PORT, reuse_port=True, headers={
+        'Server': f'OpenSentry/{APP_VERSION}',
+        'X-OpenSentry-Version': str(APP_VERSION),
+        'X-OpenSentry-Device': str(DEVICE_ID or ''),
+    })
+
+
+def stream_server_main():
+    """Serve only the stream routes, from the asyncio front end."""
+    if not STREAM_PORT:
+        raise SystemExit('--stream-server needs OPENSENTRY_STREAM_PORT')
+    logger.info('Starting OpenSentry stream server on port %d...', STREAM_PORT)
+    for pipe in list(_pipelines.values()):
+        pipe.camera.start()
+    _ensure_hubs_started()
+    asyncio.run(_stream_server().serve_forever())
+
+
+def _reload_settings_loop(interval: float = 2.0) -> None:
+    """Capture daemon: apply settings that web workers saved to config.json."""
+    try:
+        last = os.path.getmtime(CONFIG_PATH)
+    except OSError:
+        last = 0.0
+    while True:
+        time.sleep(interval)
+        try:
+            mtime = os.path.getmtime(CONFIG_PATH)
+        except OSError:
+            continue
+        if mtime == last:
+            continue
+        last = mtime
+        cfg = _load_config(CONFIG_PATH) or {}
+        with settings_lock:
+            before = (dict(video_config), dict(stream_config))
+            for section, target in (('motion_detection', motion_detection_config), ('video', video_config),
+                                    ('stream', stream_config), ('snapshots', snapshot_config)):
+                if isinstance(cfg.get(section), dict):
+                    target.update(cfg[section])
+            changed = before != (video_config, stream_config)
+        if changed:
+            logger.info('Applying video/stream settings saved by a web worker')
+            _apply_video_stream_settings()
+
+
+def capture_daemon_main():
+    """Run capture, analysis and encoding only, publishing into the frame bus."""
+    if not FRAME_BUS:
+        raise SystemExit('--capture-daemon needs OPENSENTRY_FRAME_BUS')
+    logger.info("Starting OpenSentry capture daemon on frame bus '%s'...", FRAME_BUS)
+    channels = []
+    for cam_id, pipe in _pipelines.items():
+        pipe.camera.start()
+        pipe.ensure_hubs_started()
+        for kind, b in (('raw', pipe.raw_broadcaster), ('motion', pipe.motion_broadcaster)):
+            ch = BusChannel(channel_name(FRAME_BUS, cam_id, kind), create=True, slot_size=FRAME_BUS_SLOT_KB << 10)
+            BusPublisher(ch, b)
+            channels.append(ch)
+    meta = BusMeta(channel_name(FRAME_BUS, 'all', 'meta'), create=True)
+    channels.append(meta.channel)
+    # Web workers count the bytes they send into the peer table; the budget
+    # is measured on their total here and the operating point goes out in
+    # the meta, so workers apply the same fps factor the encoders use
+    peers = BusPeers(channel_name(FRAME_BUS, 'all', 'peers'), create=True)
+    channels.append(peers)
+    egress.total_getter = peers.egress_total
+
+    def _meta() -> dict:
+        peers.beat()
+        return {
+            'pid': os.getpid(),
+            'cameras': {
+                cam_id: {'running': bool(pipe.camera.running), 'seq': pipe.camera.seq, 'health': pipe.camera.health(),
+                         'analysis': pipe.motion_worker.analysis()}
+                for cam_id, pipe in _pipelines.items()
+            },
+            'egress': egress.snapshot(),
+        }
+    run_meta_publisher(meta, _meta)
+    threading.Thread(target=_reload_settings_loop, name='SettingsReload', daemon=True).start()
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    stop.wait()
+    logger.info('Capture daemon stopping')
+    for ch in channels:
+        ch.close()
 
 
 def main():
-    global APP_PORT
+    global APP_PORT, _stream_server_started
+    if CAPTURE_DAEMON:
+        capture_daemon_main()
+        return
+    if STREAM_SERVER:
+        stream_server_main()
+        return
     logger.info("Starting OpenSentry camera server...")
     logger.info("Starting camera stream...")
-    camera_stream.start()
+    for pipe in list(_pipelines.values()):
+        pipe.camera.start()
     # Choose a port (default 5000). If busy, try the next few ports.
     try:
         preferred = int(os.environ.get('OPENSENTRY_PORT', str(APP_PORT or 5000)))
@@ -1278,6 +2370,10 @@ def main():
         _start_mdns_advertiser()
     except Exception:
         pass
+    if STREAM_PORT:
+        _ensure_hubs_started()
+        _stream_server().start_in_thread()
+        _stream_server_started = True
     app.run(host='0.0.0.0', port=chosen, debug=False, threaded=True)
 
 
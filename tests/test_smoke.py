@@ -6,6 +6,8 @@ import pytest
 BASE = os.environ.get("BASE_URL", "http://127.0.0.1:5000")
 USER = os.environ.get("OPENSENTRY_USER", "admin")
 PASS = os.environ.get("OPENSENTRY_PASS", "admin")
+# asyncio stream server (OPENSENTRY_STREAM_PORT), e.g. http://127.0.0.1:5001
+STREAM_URL = os.environ.get("STREAM_URL", "")
 
 
 def test_health_ok_and_headers():
@@ -68,3 +70,75 @@ def test_video_feed_motion_stream_headers_and_chunk():
     chunk = next(r.iter_content(chunk_size=1024))
     assert b"--frame" in chunk or b"Content-Type: image/jpeg" in chunk
     r.close()
+
+
+def test_unknown_camera_route_404():
+    s = _login_session()
+    r = s.get(f"{BASE}/cam/does-not-exist/video_feed", timeout=5)
+    assert r.status_code == 404
+
+
+def test_video_feed_profile_shared_and_evicted():
+    s = _login_session()
+    token = os.environ.get("OPENSENTRY_API_TOKEN", "")
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    r = s.get(f"{BASE}/video_feed?w=320&fps=5&q=50", stream=True, timeout=10)
+    assert r.status_code == 200
+    assert r.headers.get("Content-Type", "").startswith("multipart/x-mixed-replace")
+    # Keep the iterator: dropping it mid-chunk makes urllib3 close the connection
+    parts = r.iter_content(chunk_size=1024)
+    chunk = next(parts)
+    assert b"--frame" in chunk or b"Content-Type: image/jpeg" in chunk
+    cams = requests.get(f"{BASE}/status", headers=headers, timeout=5).json()["cameras"]
+    profiles = [p for cam in cams.values() for p in cam["profiles"]]
+    assert {"kind": "raw", "w": 320, "fps": 5, "q": 50, "subscribers": 1} in profiles
+    r.close()
+    # Dropped once the server notices the client is gone
+    for _ in range(20):
+        cams = requests.get(f"{BASE}/status", headers=headers, timeout=5).json()["cameras"]
+        if not any(p["w"] == 320 for cam in cams.values() for p in cam["profiles"]):
+            break
+        time.sleep(0.25)
+    else:
+        pytest.fail("stream profile not evicted after its last client left")
+
+
+def test_api_clients_lists_and_kicks_stream_client():
+    s = _login_session()
+    r = s.get(f"{BASE}/video_feed", stream=True, timeout=10)
+    assert r.status_code == 200
+    # Keep the iterator: dropping it mid-chunk makes urllib3 close the connection
+    parts = r.iter_content(chunk_size=1024)
+    next(parts)
+    # A part counts as delivered once its write returns
+    for _ in range(20):
+        clients = s.get(f"{BASE}/api/clients", timeout=5).json()["clients"]
+        mine = [c for c in clients if c["path"] == "/video_feed" and c["delivered"] >= 1]
+        if mine:
+            break
+        time.sleep(0.25)
+    assert mine, clients
+    cid = mine[-1]["id"]  # newest: ours
+    assert s.delete(f"{BASE}/api/clients/{cid}", timeout=5).status_code == 200
+    assert s.delete(f"{BASE}/api/clients/nope", timeout=5).status_code == 404
+    r.close()
+    for _ in range(20):
+        ids = [c["id"] for c in s.get(f"{BASE}/api/clients", timeout=5).json()["clients"]]
+        if cid not in ids:
+            break
+        time.sleep(0.25)
+    else:
+        pytest.fail("kicked client still listed")
+
+
+@pytest.mark.skipif(not STREAM_URL, reason="STREAM_URL not set; stream server not under test")
+def test_stream_server_serves_feed_with_flask_session():
+    assert requests.get(f"{STREAM_URL}/video_feed", timeout=5).status_code == 401
+    s = _login_session()
+    assert s.get(f"{STREAM_URL}/nope", timeout=5).status_code == 404
+    r = s.get(f"{STREAM_URL}/video_feed", stream=True, timeout=10)
+    assert r.status_code == 200
+    assert r.headers.get("Content-Type", "").startswith("multipart/x-mixed-replace")
+    chunk = next(r.iter_content(chunk_size=1024))
+    assert b"--frame" in chunk or b"Content-Type: image/jpeg" in chunk
+    r.close()
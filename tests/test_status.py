@@ -9,6 +9,8 @@ import pytest
 
 BASE = os.environ.get("BASE_URL", "http://127.0.0.1:5000")
 TOKEN = os.environ.get("OPENSENTRY_API_TOKEN", "")
+USER = os.environ.get("OPENSENTRY_USER", "admin")
+PASS = os.environ.get("OPENSENTRY_PASS", "admin")
 
 
 def test_status_without_token_ok_when_no_token_configured():
@@ -45,3 +47,111 @@ def test_status_with_token_enforced_when_set():
     assert r2.status_code == 200, r2.text
     data = r2.json()
     assert data.get("auth_mode") == "token"
+
+
+def test_status_lists_cameras():
+    headers = {"Authorization": f"Bearer {TOKEN}"} if TOKEN else {}
+    r = requests.get(f"{BASE}/status", headers=headers, timeout=5)
+    assert r.status_code == 200, r.text
+    cams = r.json().get("cameras")
+    assert isinstance(cams, dict) and cams
+    for cam_id, cam in cams.items():
+        assert set(["name", "running", "has_frame", "routes"]).issubset(set(cam.keys()))
+        assert cam["routes"]["raw"] == f"/cam/{cam_id}/video_feed"
+
+
+def test_status_reports_camera_health():
+    headers = {"Authorization": f"Bearer {TOKEN}"} if TOKEN else {}
+    r = requests.get(f"{BASE}/status", headers=headers, timeout=5)
+    assert r.status_code == 200, r.text
+    cam = r.json()["camera"]
+    for key in ("state", "frame_age", "reconnects", "disconnects"):
+        assert key in cam
+    assert cam["state"] in ("starting", "streaming", "stalled", "waiting", "stopped")
+
+
+def test_status_reports_egress_operating_point():
+    headers = {"Authorization": f"Bearer {TOKEN}"} if TOKEN else {}
+    r = requests.get(f"{BASE}/status", headers=headers, timeout=5)
+    assert r.status_code == 200, r.text
+    egress = r.json()["egress"]
+    for key in ("budget_kbps", "rate_kbps", "quality_factor", "fps_factor", "jpeg_quality", "fps"):
+        assert key in egress
+    assert 0 < egress["quality_factor"] <= 1 and 0 < egress["fps_factor"] <= 1
+
+
+def test_status_reports_stream_demand():
+    headers = {"Authorization": f"Bearer {TOKEN}"} if TOKEN else {}
+    r = requests.get(f"{BASE}/status", headers=headers, timeout=5)
+    assert r.status_code == 200, r.text
+    for cam in r.json()["cameras"].values():
+        assert isinstance(cam["streaming"]["raw"], bool)
+        assert isinstance(cam["streaming"]["motion"], bool)
+
+
+def _status(headers):
+    r = requests.get(f"{BASE}/status", headers=headers, timeout=5)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _watch(path, secs):
+    """Keep a logged-in stream of `path` open for `secs` seconds in the background."""
+    s = requests.Session()
+    s.post(f"{BASE}/login", data={"username": USER, "password": PASS, "next": "/"}, timeout=5)
+
+    def run():
+        end = time.time() + secs
+        with s.get(f"{BASE}{path}", stream=True, timeout=10) as r:
+            for _ in r.iter_content(chunk_size=65536):
+                if time.time() > end:
+                    break
+
+    th = threading.Thread(target=run, daemon=True)
+    th.start()
+    return th
+
+
+def test_status_reports_analysis_cadence():
+    headers = {"Authorization": f"Bearer {TOKEN}"} if TOKEN else {}
+    viewer = _watch("/video_feed_motion", 15)
+    try:
+        for _ in range(4):
+            a0 = _status(headers)["cameras"]["default"]["analysis"]
+            time.sleep(3)
+            a1 = _status(headers)["cameras"]["default"]["analysis"]
+            captures, analysed = a1["captures"] - a0["captures"], a1["analysed"] - a0["analysed"]
+            if captures < 5:
+                pytest.skip("camera is not producing frames")
+            if a0["idle"] != a1["idle"]:
+                continue  # went idle or woke up mid-window; measure again
+            if a1["idle"]:
+                # Quiet scene: only idle_fps captures reach the detector
+                assert analysed * 2 < captures, (a0, a1)
+            else:
+                # Full rate: every capture past the fps cap is analysed
+                assert analysed >= captures - 1, (a0, a1)
+            return
+        pytest.fail("analysis kept switching between idle and full rate")
+    finally:
+        viewer.join()
+
+
+def test_status_reports_shared_frame_products():
+    headers = {"Authorization": f"Bearer {TOKEN}"} if TOKEN else {}
+    viewer = _watch("/video_feed", 4)
+    time.sleep(0.5)
+    st0 = _status(headers)
+    time.sleep(3)
+    st1 = _status(headers)
+    viewer.join()
+    d0, d1 = st0["camera"]["derived"], st1["camera"]["derived"]
+    a0, a1 = st0["cameras"]["default"]["analysis"], st1["cameras"]["default"]["analysis"]
+    captures = a1["captures"] - a0["captures"]
+    if captures < 5:
+        pytest.skip("camera is not producing frames")
+    computed, shared = d1["computed"] - d0["computed"], d1["shared"] - d0["shared"]
+    # The raw encoder and motion analysis work from the same per-capture
+    # products (output-size frame, thumbnail), so most captures reuse one
+    assert shared * 2 >= captures, (d0, d1, captures)
+    assert computed < 8 * captures, (d0, d1, captures)